@@ -4,11 +4,22 @@ Use nose2 to test the classes and functions found in the tttio package
 """
 
 import logging
+import logging.handlers
 import os
+import pickle
+import pstats
 import datetime
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy
 from nose2.tools import such
 import tttio
-from tttio import ai, boards, tttoe
+from tttio import ai, backends, bench, boards, logs, matches, metrics, players, policy, profiling, solver, symmetry, \
+    tttoe, workers
 
 logging.getLogger().setLevel(logging.INFO)
 logging.getLogger().removeHandler(tttio.consoleHandler)
@@ -54,6 +65,23 @@ with such.A('system running on linux, windows or osx, python version 2.7') as it
                     raise AssertionError()
             # otherwise the test passes
 
+        @it.should('only be imported once something graphical is used')
+        def test():
+            script = ("import sys\n"
+                      "import tttio.ai, tttio.boards, tttio.players\n"
+                      "assert 'pygame' not in sys.modules\n"
+                      "tttio.boards.TTTBoard().checkForWin((1, 1))\n"
+                      "tttio.players.TTTMinimaxPlayer('x')\n"
+                      "assert 'pygame' not in sys.modules and not tttio.gui.isLoaded()\n"
+                      "tttio.gui.pygame.Rect(0, 0, 1, 1)\n"
+                      "assert tttio.gui.isLoaded()\n")
+            folder = tempfile.mkdtemp()  # tttio logs to log.log in the working directory
+            try:
+                env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(tttio.__file__))))
+                assert subprocess.call([sys.executable, '-c', script], cwd=folder, env=env) == 0
+            finally:
+                shutil.rmtree(folder)
+
     with it.having('a properly working start menu instance'):
         @it.has_setup
         def setup():
@@ -166,4 +194,951 @@ with such.A('system running on linux, windows or osx, python version 2.7') as it
             logging.info("{} board checks done in {} ({} checks per second)".format(num_tests, finished, cpm))
 
 
+    with it.having('a TTTBitBoard'):
+        @it.should('give back the sBoard it was given and check wins and blocks like TTTBoard')
+        def test():
+            rand = random.Random(9)
+            moves = [(col, row) for col in range(1, 4) for row in range(1, 4)]
+            for x in range(2000):
+                sBoard = [[rand.choice('xo ') for col in range(3)] for row in range(3)]
+                board, bitBoard = boards.TTTBoard(), boards.TTTBitBoard()
+                board.sBoard = [list(row) for row in sBoard]
+                bitBoard.sBoard = sBoard
+                assert bitBoard.sBoard == board.sBoard == sBoard
+                for move in moves:
+                    assert bitBoard.checkForWin(move) == board.checkForWin(move)
+                    assert bitBoard.checkForWin(move, retInt=True) == board.checkForWin(move, retInt=True)
+                    assert bitBoard.checkForBlocks(move) == board.checkForBlocks(move)
+
+        @it.should('agree with TTTBoard on blocks, empty spaces and valid moves for random boards')
+        def test():
+            rand = random.Random(8)
+            for x in range(2000):
+                board, bitBoard = boards.TTTBoard(), boards.TTTBitBoard()
+                for y in range(rand.randint(0, 9)):
+                    move = (rand.randint(1, 3), rand.randint(1, 3))
+                    marker = rand.randint(0, 1)
+                    board.setPiece(move, marker)
+                    bitBoard.setPiece(move, marker)
+                    assert bitBoard.sBoard == board.sBoard
+                    assert bitBoard.checkForBlocks(move) == board.checkForBlocks(move)
+                    assert bitBoard.checkForWin(move, retInt=True) == board.checkForWin(move, retInt=True)
+                move = (rand.randint(1, 3), rand.randint(1, 3))
+                assert bitBoard.isValidMove(move) == board.isValidMove(move)
+                assert bitBoard.getEmptySpace() == board.getEmptySpace()
+
+    with it.having('symmetry tables'):
+        @it.should('give every rotation and reflection of a board the same canonical key')
+        def test():
+            rand = random.Random(11)
+            for x in range(500):
+                code = rand.randrange(symmetry.NUMCODES)
+                cells = symmetry.decodePosition(code)
+                keys = set()
+                for index, permutation in enumerate(symmetry.SYMMETRIES):
+                    transformed = symmetry.transformCode(code, index)
+                    assert symmetry.decodePosition(transformed) == [cells[space] for space in permutation]
+                    keys.add(symmetry.canonicalCode(transformed)[0])
+                    for space in range(9):
+                        moved = symmetry.canonicalMove(space, index)
+                        assert symmetry.decodePosition(transformed)[moved] == cells[space]
+                        assert symmetry.restoreMove(moved, index) == space
+                        assert symmetry.restoreMask(1 << moved, index) == 1 << space
+                canonical, index = symmetry.canonicalCode(code)
+                assert keys == set([canonical]) and symmetry.transformCode(code, index) == canonical
+
+                board = boards.TTTBitBoard()
+                board.sBoard = [[' xo'[piece] for piece in cells[row * 3:row * 3 + 3]] for row in range(3)]
+                assert board.getCode() == code and board.getCanonicalKey() == canonical
+
+    with it.having('a solved game tree'):
+        @it.has_setup
+        def setup():
+            it.oracle = solver.TTTOracle.load()
+
+        @it.has_teardown
+        def teardown():
+            del it.oracle
+
+        @it.should('hold every reachable position and agree with a fresh solve')
+        def test():
+            # 765 positions up to symmetry when x moves first and as many again when o does
+            assert len(it.oracle) == 765 * 2
+            values, moves = solver.solve()
+            assert (values == it.oracle.values).all() and (moves == it.oracle.moves).all()
+
+            # every one of the 5,478 positions of each game should get the best value of its moves
+            seen = set()
+
+            def visit(board, turn):
+                if (turn, board.getCode()) in seen:
+                    return
+                seen.add((turn, board.getCode()))
+                value = it.oracle.getValue(turn, board)
+                if solver.winner(solver.decodePosition(board.getCode())) != solver.EMPTY:
+                    assert value == solver.LOSS
+                    return
+
+                other = 'o' if turn == 'x' else 'x'
+                childValues = {}
+                for move in range(1, 10):
+                    if board.isValidMove(board.translateNumToPos(move)):
+                        child = boards.TTTBitBoard()
+                        child.xBits, child.oBits = board.xBits, board.oBits
+                        child.setPiece(board.translateNumToPos(move), turn)
+                        childValues[move] = -it.oracle.getValue(other, child)
+                        visit(child, other)
+                best = max(childValues.values()) if childValues else solver.DRAW
+                assert value == best
+                assert it.oracle.getBestMoves(turn, board) == sorted(move for move, childValue in
+                                                                     childValues.items() if childValue == best)
+
+            visit(boards.TTTBitBoard(), 'x')
+            assert len(seen) == 5478
+            visit(boards.TTTBitBoard(), 'o')
+            assert len(seen) == 5478 * 2
+
+        @it.should('never lose against every reply of the other player')
+        def test():
+            empty = [[' '] * 3 for x in range(3)]
+            assert it.oracle.getValue('x', empty) == solver.DRAW
+
+            def play(board, turn, oracleTurn):
+                winner = solver.winner(solver.decodePosition(solver.positionCode(board)))
+                assert winner != (solver.O if oracleTurn == 'x' else solver.X)
+                if winner != solver.EMPTY or board.getEmptySpace() is None:
+                    return
+                other = 'o' if turn == 'x' else 'x'
+                replies = [it.oracle.getMove(turn, board)] if turn == oracleTurn else \
+                    [pos for pos in range(1, 10) if board.isValidMove(board.translateNumToPos(pos))]
+                for move in replies:
+                    child = boards.TTTBitBoard()
+                    child.xBits, child.oBits = board.xBits, board.oBits
+                    child.setPiece(board.translateNumToPos(move), turn)
+                    play(child, other, oracleTurn)
+
+            for first in 'xo':
+                for oracleTurn in 'xo':
+                    play(boards.TTTBitBoard(), first, oracleTurn)
+
+    with it.having('a minimax search'):
+        @it.has_setup
+        def setup():
+            it.oracle = solver.TTTOracle.load()
+
+        @it.has_teardown
+        def teardown():
+            del it.oracle
+
+        @it.should('pick one of the best moves in every reachable position')
+        def test():
+            search = solver.TTTMinimax()
+            for player in range(2):
+                for code in range(solver.NUMCODES):
+                    if it.oracle.values[player, code] != solver.UNREACHABLE and it.oracle.moves[player, code]:
+                        move = search.getMove('xo'[player], [[' xo'[piece] for piece in row] for row in zip(
+                            *[iter(solver.decodePosition(code))] * 3)])
+                        assert it.oracle.moves[player, code] & (1 << (move - 1))
+            logging.info("Minimax searched {} nodes per second".format(search.nodesPerSecond()))
+
+        @it.should('stay within its node budget and work as a training opponent')
+        def test():
+            search = solver.TTTMinimax(maxNodes=20)
+            empty = [[' '] * 3 for x in range(3)]
+            assert search.getMove('x', empty) in range(1, 10)
+            assert search.nodes <= 21
+
+            trainer = ai.TTTrainer(4, tensor=True, evaluation='lockstep', opponent=solver.TTTMinimax(maxDepth=2))
+            trainer._evaluateOpponent()
+            assert (trainer.pop1.fitness != 0).any() and (trainer.pop2.fitness != 0).any()
+            fitness = trainer.opponent.fitness
+            trainer._evaluateOpponent()
+            assert trainer.opponent.fitness == fitness != 0
+
+        @it.should('end the game once it is over instead of scoring the win again')
+        def test():
+            class Search(solver.TTTMinimax):
+                def getMove(self, turn, sBoard):
+                    move = solver.TTTMinimax.getMove(self, turn, sBoard)
+                    self.moves.append((solver.winner(solver.decodePosition(solver.positionCode(sBoard))), move))
+                    return move
+
+            won = [['x', 'x', 'x'], ['o', 'o', ' '], [' ', ' ', ' ']]
+            assert solver.TTTMinimax().getMove('o', won) is None
+            assert solver.TTTMinimax().getMove('x', [['x', 'o', 'x'], ['x', 'o', 'o'], ['o', 'x', 'x']]) is None
+
+            wins = 0
+            for net in ai.TTTPopulation(20, rng=numpy.random.RandomState(6)).nets:
+                for first in [True, False]:
+                    search = Search()
+                    search.moves = []
+                    net.fitness = 0
+                    ai.calcFitness(net, search) if first else ai.calcFitness(search, net)
+                    # the search is asked for a move on a won board at most once, as the last move of the game
+                    over = [index for index, (winner, move) in enumerate(search.moves) if winner != solver.EMPTY]
+                    assert over in ([], [len(search.moves) - 1])
+                    assert all(search.moves[index][1] is None for index in over)
+                    wins += len(over)
+            assert wins > 0
+
+    with it.having('a neural net running in dense mode'):
+        @it.has_setup
+        def setup():
+            it.net = ai.TTTNeuralNet.load(ai.DEFAULT_AI_PATH)
+            it.inputs = [[0.01] + [0.001 if (x + y) % 3 == 0 else 0.01 for x in range(9)] for y in range(3)]
+
+        @it.has_teardown
+        def teardown():
+            del it.net
+            del it.inputs
+
+        @it.should('give the same output as feeding each neuron one at a time, even after being mutated')
+        def test():
+            for mutation in range(10):
+                for input_set in it.inputs:
+                    dense = it.net.feed(input_set)
+                    it.net.dense = False
+                    neurons = it.net.feed(input_set)
+                    it.net.dense = True
+                    logging.debug("Dense output: {}, neuron output: {}".format(dense, neurons))
+                    assert all(abs(a - b) < 1e-9 for a, b in zip(dense, neurons))
+                it.net.mutate()
+
+        @it.should('give the same output as feeding each neuron after a neuron is edited in place')
+        def test():
+            for edit in range(3):
+                it.net.feed(it.inputs[0])
+                it.net.hiddenLayer[edit].weights[edit] += 0.5
+                it.net.outputLayer[edit].bias -= 0.25
+                dense = it.net.feed(it.inputs[0])
+                it.net.dense = False
+                neurons = it.net.feed(it.inputs[0])
+                it.net.dense = True
+                assert all(abs(a - b) < 1e-9 for a, b in zip(dense, neurons))
+
+        @it.should('return the same moves from getMoves as from calling getMove on each board')
+        def test():
+            sBoards = [[['x', ' ', 'o'], [' ', 'x', ' '], [' ', ' ', ' ']],
+                       [[' ', ' ', ' '], [' ', ' ', ' '], [' ', ' ', ' ']],
+                       [['o', 'x', 'o'], ['x', ' ', 'x'], ['o', ' ', ' ']]]
+            turns = ['x', 'o', 'x']
+            moves = it.net.getMoves(turns, sBoards)
+            assert list(moves) == [it.net.getMove(turn, sBoard) for turn, sBoard in zip(turns, sBoards)]
+
+    with it.having('a neural net with a move cache'):
+        @it.should('return the same moves as without the cache and forget them when the net changes')
+        def test():
+            net = ai.TTTNeuralNet(moveCacheSize=4)
+            rand = random.Random(12)
+            boardList = [[[rand.choice('xo ') for col in range(3)] for row in range(3)] for x in range(6)]
+            for x in range(3):
+                for sBoard in boardList:
+                    for turn in ['x', 'o', 0, 1]:
+                        move = net.getMove(turn, sBoard)
+                        net.moveCacheSize = 0
+                        assert move == net.getMove(turn, sBoard)
+                        net.moveCacheSize = 4
+                assert len(net._moveCache) == 4
+                net.inputLayer[0].mutate()
+            assert net.cacheHits > 0 and net.cacheMisses > 0
+
+        @it.should('forget its moves when its own neurons are edited directly, and only then')
+        def test():
+            net, other = ai.TTTNeuralNet(moveCacheSize=4), ai.TTTNeuralNet(moveCacheSize=4)
+            sBoard = [['x', ' ', 'o'], [' ', ' ', ' '], [' ', ' ', ' ']]
+            net.getMove('x', sBoard)
+            other.getMove('x', sBoard)
+            for neuron in net.outputLayer:
+                neuron.bias = 0
+            net.outputLayer[5].bias = 100
+            assert net.getMove('x', sBoard) == 6
+            assert other.getMove('x', sBoard) == other.getMove('x', sBoard) and other.cacheHits == 2
+
+            net.outputLayer[5].weights[0] = -1000
+            net.outputLayer[5].bias = 0
+            net.outputLayer[8].weights[:] = [1000] * len(net.outputLayer[8].weights)
+            assert net.getMove('x', sBoard) == 9
+            assert net.cacheHits == 0
+
+        @it.should('not change the fitness scores of a generation')
+        def test():
+            trainer = ai.TTTrainer(6, evaluation='serial')
+            cached = ai.TTTrainer(6, evaluation='serial', moveCache=64)
+            cached.pop1.nets = [net.copy() for net in trainer.pop1.nets]
+            cached.pop2.nets = [net.copy() for net in trainer.pop2.nets]
+            trainer.playAll()
+            cached.playAll()
+            assert [net.fitness for net in trainer.pop1.nets + trainer.pop2.nets] == \
+                [net.fitness for net in cached.pop1.nets + cached.pop2.nets]
+            assert sum(net.cacheHits for net in cached.pop1.nets) > 0
+
+    with it.having('a tensor population'):
+        @it.has_setup
+        def setup():
+            it.population = ai.TTTPopulation(20, rng=numpy.random.RandomState(8))
+            # a few ties, which both backends have to keep in the same order
+            for net, fitness in zip(it.population.nets, [3, 1, 4, 1, 5, 9, 2, 6, 5, 3] * 2):
+                net.fitness = fitness
+
+        @it.has_teardown
+        def teardown():
+            del it.population
+
+        def tensorCopy(population, seed):
+            tensor = ai.TTTTensorPopulation(population.population, rng=numpy.random.RandomState(seed))
+            tensor.nets = population.nets
+            return tensor
+
+        def changedNeurons(before, after):
+            # (net, layer, neuron) of every neuron whose weights or bias are different
+            (weights1, biases1), (weights2, biases2) = before, after
+            return set((net, layer, neuron) for layer in range(3) for net, neuron in zip(*numpy.nonzero(
+                (weights1[layer] != weights2[layer]).any(axis=2) | (biases1[layer] != biases2[layer]))))
+
+        @it.should('sort and cut the same nets as the object population')
+        def test():
+            objects = ai.TTTPopulation(0, rng=numpy.random.RandomState(2))
+            objects.population = it.population.population
+            objects.nets = [net.copy() for net in it.population.nets]
+            tensor = tensorCopy(objects, 2)
+            for reverse in [False, True]:
+                objects.sort(reverse)
+                tensor.sort(reverse)
+                assert [net.fitness for net in objects.nets] == list(tensor.fitness)
+                for arrays, expected in zip(tensor.getTensors(), objects.getTensors()):
+                    assert all(numpy.array_equal(a, b) for a, b in zip(arrays, expected))
+            objects._cut()
+            tensor._cut()
+            assert objects.killed == tensor.killed and len(objects) == len(tensor)
+            for arrays, expected in zip(tensor.getTensors(), objects.getTensors()):
+                assert all(numpy.array_equal(a, b) for a, b in zip(arrays, expected))
+
+        @it.should('breed children that only swap a layer, neuron or weight between their parents, like the object '
+                   'population')
+        def test():
+            objects = ai.TTTPopulation(0, rng=numpy.random.RandomState(5))
+            objects.population = it.population.population
+            objects.nets = [net.copy() for net in it.population.nets]
+            tensor = tensorCopy(objects, 5)
+            parents = [[a.copy() for a in arrays] for arrays in tensor.getTensors()]
+            objects._breed()
+            tensor._breed()
+            assert objects.bred == tensor.bred > 0 and len(objects) == len(tensor)
+
+            size = len(it.population)
+            for pair in range(tensor.bred // 2):
+                parent1, parent2 = pair * 2, pair * 2 + 1
+                child1, child2 = size + pair, size + tensor.bred // 2 + pair
+                for arrays, before in zip(tensor.getTensors(), parents):
+                    for layer, start in zip(arrays, before):
+                        # swapping keeps every value, it only moves it to the other child
+                        assert numpy.array_equal(layer[child1] + layer[child2], start[parent1] + start[parent2])
+                        assert numpy.array_equal(layer[parent1], start[parent1])
+                changed = changedNeurons([[a[[parent1]] for a in arrays] for arrays in parents],
+                                         [[a[[child1]] for a in arrays] for arrays in tensor.getTensors()])
+                assert len(set(layer for net, layer, neuron in changed)) <= 1
+
+        @it.should('only mutate one neuron of the input or hidden layer of each net, like the object population')
+        def test():
+            for seed in range(5):
+                objects = ai.TTTPopulation(0, rng=numpy.random.RandomState(seed))
+                objects.population = it.population.population
+                objects.nets = [net.copy() for net in it.population.nets]
+                tensor = tensorCopy(objects, seed)
+                for population in [objects, tensor]:
+                    before = [[a.copy() for a in arrays] for arrays in population.getTensors()]
+                    population._mutate()
+                    changed = changedNeurons(before, population.getTensors())
+                    assert population.mutated == int(population.population * population.mutationRate)
+                    assert len(set(net for net, layer, neuron in changed)) == len(changed) <= population.mutated
+                    assert all(layer in (0, 1) for net, layer, neuron in changed)
+
+                indices = numpy.arange(len(tensor))
+                before = [[a.copy() for a in arrays] for arrays in tensor.getTensors()]
+                tensor._mutateNets(indices)
+                changed = changedNeurons(before, tensor.getTensors())
+                assert len(set(net for net, layer, neuron in changed)) == len(changed) < len(indices)
+                assert all(layer in (0, 1) for net, layer, neuron in changed)
+
+    with it.having('a compiled neural net'):
+        @it.has_setup
+        def setup():
+            it.net = ai.TTTNeuralNet.load(ai.DEFAULT_AI_PATH)
+            it.path = os.path.join(tempfile.mkdtemp(), 'ai.policy')
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(os.path.dirname(it.path))
+            del it.net
+
+        @it.should('play the same moves as the net on every board after being exported and loaded')
+        def test():
+            it.net.compile().export(it.path)
+            player = players.TTTAiPlayer('x', it.path)
+            assert isinstance(player.neuralNet, policy.TTTPolicyTable)
+            for code in range(0, symmetry.NUMCODES, 7):
+                cells = symmetry.decodePosition(code)
+                sBoard = [[' xo'[piece] for piece in cells[row * 3:row * 3 + 3]] for row in range(3)]
+                for turn in ['x', 'o', 0, 1]:
+                    assert player.neuralNet.getMove(turn, sBoard) == it.net.getMove(turn, sBoard)
+
+    with it.having('nets saved in the binary format'):
+        @it.has_setup
+        def setup():
+            it.folder = tempfile.mkdtemp()
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(it.folder)
+
+        @it.should('load back bit for bit, one net or a whole population at a time')
+        def test():
+            net = ai.TTTNeuralNet(fitness=12.5)
+            path = os.path.join(it.folder, 'net.bin')
+            net.exportBinary(path)
+            loaded = ai.TTTNeuralNet.load(path)
+            for original, copy in zip(*[sum(n.getArrays(), []) for n in [net, loaded]]):
+                assert (original == copy).all()
+            assert loaded.fitness == 12.5
+
+            for populationClass in [ai.TTTPopulation, ai.TTTTensorPopulation]:
+                population = populationClass(12)
+                population.addFitness(range(12))
+                path = os.path.join(it.folder, 'population.bin')
+                population.exportBinary(path)
+                loaded = populationClass.loadBinary(path)
+                assert len(loaded) == 12 and loaded.population == 12
+                for original, copy in zip(*[sum(p.getTensors(), []) for p in [population, loaded]]):
+                    assert (original == copy).all()
+                assert [n.fitness for n in loaded.nets] == range(12)
+                loaded.nextGen()
+
+    with it.having('a trainer with a seed'):
+        @it.should('train the same generations whatever the global random state is and however games are played')
+        def test():
+            def train(tensor, evaluation):
+                numpy.random.seed(numpy.random.randint(1000))
+                trainer = ai.TTTrainer(8, tensor=tensor, evaluation=evaluation, seed=7)
+                trainer.genStop = 3
+                trainer.train()
+                return [sum(population.getTensors(), []) + [[net.fitness for net in population.nets]]
+                        for population in trainer.populations]
+
+            for tensor, evaluations in [(True, ['lockstep', 'pool', 'shared', 'thread']), (False, ['serial', 'queue'])]:
+                results = [train(tensor, evaluation) for evaluation in evaluations]
+                for other in results[1:]:
+                    for population, otherPopulation in zip(results[0], other):
+                        for arrays, otherArrays in zip(population, otherPopulation):
+                            assert numpy.array_equal(arrays, otherArrays)
+
+        @it.should('give populations independent random streams')
+        def test():
+            trainer = ai.TTTrainer(4, tensor=True, evaluation='lockstep', seed=7)
+            assert not numpy.array_equal(trainer.pop1.weights[0], trainer.pop2.weights[0])
+            assert numpy.array_equal(trainer.pop1.weights[0], ai.TTTTensorPopulation(
+                4, ai.randomStream(7, 'population', 0)).weights[0])
+
+    with it.having('a trainer saving checkpoints'):
+        @it.has_setup
+        def setup():
+            it.folder = tempfile.mkdtemp()
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(it.folder)
+
+        @it.should('carry on from a checkpoint exactly like a run that never stopped')
+        def test():
+            def train(generations, tensor, evaluation, path=None):
+                numpy.random.seed(5)
+                trainer = ai.TTTrainer(6, tensor=tensor, evaluation=evaluation, checkpointPath=path,
+                                       checkpointInterval=2)
+                trainer.genStop = generations
+                trainer.train()
+                return trainer
+
+            for tensor, evaluation in [(True, 'lockstep'), (False, 'serial')]:
+                path = os.path.join(it.folder, 'checkpoint')
+                uninterrupted = train(5, tensor, evaluation)
+                train(3, tensor, evaluation, path)
+                assert not os.path.exists(path + '.tmp')
+                resumed = ai.TTTrainer.loadCheckpoint(path)
+                assert resumed.generation == 4
+                resumed.genStop = 5
+                resumed.train()
+
+                assert resumed.generation == uninterrupted.generation
+                assert resumed.highest.fitness == uninterrupted.highest.fitness
+                for population, other in zip(resumed.populations, uninterrupted.populations):
+                    for tensors, otherTensors in zip(sum(population.getTensors(), []), sum(other.getTensors(), [])):
+                        assert (tensors == otherTensors).all()
+                    assert [net.fitness for net in population.nets] == [net.fitness for net in other.nets]
+
+        @it.should('save the state from when the checkpoint was taken while training carries on')
+        def test():
+            path = os.path.join(it.folder, 'snapshot')
+            for tensor, evaluation in [(True, 'lockstep'), (False, 'serial')]:
+                trainer = ai.TTTrainer(6, tensor=tensor, evaluation=evaluation, opponent=solver.TTTMinimax(),
+                                       gameCache=True, checkpointPath=path, seed=2)
+                trainer.genStop = 2
+                trainer.train()
+                if not tensor:
+                    trainer.pop1.nets[0].dense = False
+                expected = [population.getTensors() for population in trainer.populations]
+                fitness = [[net.fitness for net in population.nets] for population in trainer.populations]
+                tableSize, cacheSize = len(trainer.opponent.table), len(trainer.gameCache)
+                trainer.checkpoint()
+                for population in trainer.populations:
+                    population.nextGen()
+                trainer.opponent.table.clear()
+                trainer.gameCache.outcomes.clear()
+                trainer.waitForCheckpoint()
+
+                resumed = ai.TTTrainer.loadCheckpoint(path)
+                for population, tensors, scores in zip(resumed.populations, expected, fitness):
+                    for array, other in zip(sum(population.getTensors(), []), sum(tensors, [])):
+                        assert (array == other).all()
+                    assert [net.fitness for net in population.nets] == scores
+                assert len(resumed.opponent.table) == tableSize and len(resumed.gameCache) == cacheSize
+                if not tensor:
+                    assert not resumed.pop1.nets[0].dense and resumed.pop1.nets[1].dense
+
+        @it.should('notice edits to unpickled nets in another process')
+        def test():
+            path = os.path.join(it.folder, 'edited')
+            trainer = ai.TTTrainer(4, evaluation='serial')
+            trainer.genStop = 2
+            trainer.train()
+            with open(path, 'wb') as f:
+                pickle.dump(trainer.pop1.nets[0], f, 2)
+            # the new process hands out versions from 0 again, up to the one the neuron was saved with
+            script = ("import pickle\n"
+                      "from tttio import ai\n"
+                      "net = pickle.load(open({!r}, 'rb'))\n"
+                      "neuron = net.inputLayer[0]\n"
+                      "inputs = [0.01] * 10\n"
+                      "net.feed(inputs)\n"
+                      "spare = ai.TTTNeuron(0)\n"
+                      "while ai.TTTNeuron.revision < neuron.version - 1:\n"
+                      "    spare.touch()\n"
+                      "neuron.weights[0] += 0.5\n"
+                      "dense = net.feed(inputs)\n"
+                      "net.dense = False\n"
+                      "assert all(abs(a - b) < 1e-9 for a, b in zip(dense, net.feed(inputs)))\n").format(path)
+            env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(tttio.__file__))))
+            assert subprocess.call([sys.executable, '-c', script], cwd=it.folder, env=env) == 0
+
+    with it.having('matchmaking strategies'):
+        @it.should('play every pair once with the round robin, the same as the evaluation methods')
+        def test():
+            trainer = ai.TTTrainer(5, tensor=True, evaluation='lockstep', seed=3)
+            pairs = matches.allPairs(5, 5)
+            deltas = matches.playLockstep(trainer.pop1.getTensors(), trainer.pop2.getTensors(), pairs)
+            expected = matches.reduceFitness(pairs, deltas, 5, 5)
+            assert matches.TTTRoundRobin().play(trainer, trainer.rng) == 25
+            for population, fitness in zip(trainer.populations, expected):
+                assert numpy.array_equal(population.fitness, fitness)
+
+        @it.should('play k games per net when sampling and one game per net each Swiss round')
+        def test():
+            for evaluation, tensor in [('lockstep', True), ('serial', False)]:
+                for matchmaker, games in [(matches.TTTSampled(3), 18), (matches.TTTSwiss(4), 24)]:
+                    trainer = ai.TTTrainer(6, tensor=tensor, evaluation=evaluation, seed=3, matchmaker=matchmaker)
+                    trainer.genStop = 2
+                    trainer.train()
+                    assert matchmaker.gamesPlayed == games * 2
+
+        @it.should('never pair the same nets twice in a Swiss tournament, even with populations of different sizes')
+        def test():
+            class Arena(object):
+                def __init__(self, size1, size2):
+                    self.size1, self.size2 = size1, size2
+                    self.games = []
+                    self.rng = numpy.random.RandomState(7)
+
+                def sizes(self):
+                    return self.size1, self.size2
+
+                def playPairs(self, pairs):
+                    self.games.extend(map(tuple, pairs))
+                    return self.rng.random_sample(self.size1), self.rng.random_sample(self.size2)
+
+            for size1, size2 in [(50, 50), (13, 9), (8, 11)]:
+                arena = Arena(size1, size2)
+                assert matches.TTTSwiss(8).play(arena, numpy.random.RandomState(3)) == max(size1, size2) * 8
+                assert len(arena.games) == len(set(arena.games)) == max(size1, size2) * 8
+                assert set(index for index, other in arena.games) == set(range(size1))
+                assert set(other for index, other in arena.games) == set(range(size2))
+
+        @it.should('have every net play the champions of past generations from the hall of fame')
+        def test():
+            matchmaker = matches.TTTHallOfFame(matches.TTTSampled(1), size=2)
+            trainer = ai.TTTrainer(4, tensor=True, evaluation='lockstep', seed=3, matchmaker=matchmaker)
+            trainer.genStop = 4
+            trainer.train()
+            # 4 games between the populations, then 16 for each champion from the second generation on
+            assert matchmaker.gamesPlayed == 4 * 4 + 16 * (1 + 2 + 2)
+            assert len(matchmaker.champions[1][0]) == 2
+            assert numpy.array_equal(matchmaker.champions[0][0][-1], trainer.highest.getArrays()[0][0])
+
+    with it.having('a trainer caching game outcomes'):
+        @it.should('train the same generations as without the cache while replaying fewer games')
+        def test():
+            def train(evaluation, gameCache):
+                trainer = ai.TTTrainer(8, tensor=True, evaluation=evaluation, seed=5, gameCache=gameCache)
+                trainer.genStop = 4
+                trainer.train()
+                return trainer, [sum(population.getTensors(), []) + [population.fitness]
+                                 for population in trainer.populations]
+
+            expected = train('lockstep', False)[1]
+            for evaluation in ['lockstep', 'shared']:
+                trainer, result = train(evaluation, True)
+                assert trainer.gameCache.hits > 0
+                assert len(trainer.gameCache) <= len(trainer.pop1) * len(trainer.pop2)
+                for population, expectedPopulation in zip(result, expected):
+                    for arrays, expectedArrays in zip(population, expectedPopulation):
+                        assert numpy.array_equal(arrays, expectedArrays)
+
+    with it.having('a trainer recording metrics'):
+        @it.has_setup
+        def setup():
+            it.folder = tempfile.mkdtemp()
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(it.folder)
+
+        @it.should('append one record for each generation as JSON lines or CSV')
+        def test():
+            for name, tensor, evaluation in [('metrics.jsonl', True, 'lockstep'), ('metrics.csv', False, 'queue')]:
+                path = os.path.join(it.folder, name)
+                trainer = ai.TTTrainer(20, tensor=tensor, evaluation=evaluation, seed=4, metricsPath=path)
+                trainer.genStop = 3
+                trainer.train()
+
+                records = metrics.read(path)
+                assert [record['generation'] for record in records] == [1, 2, 3]
+                assert records[-1] == dict(trainer.lastMetrics)
+                for record in records:
+                    assert record['games'] == record['population1'] * record['population2']
+                    assert record['forwardPasses'] >= record['games'] * 3
+                    assert record['evaluationTime'] + record['nextGenTime'] <= record['wallTime']
+                    assert record['fitness1Min'] <= record['fitness1Mean'] <= record['fitness1Max']
+                    assert record['bred1'] > 0 and record['mutated2'] > 0 and record['killed1'] > 0
+                    assert record['workers'] == (trainer.numWorkers if evaluation == 'queue' else 1)
+
+    with it.having('a trainer logging through a queue'):
+        @it.has_setup
+        def setup():
+            it.folder = tempfile.mkdtemp()
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(it.folder)
+
+        @it.should('write the records of every process through the listener and put the root logger back')
+        def test():
+            path = os.path.join(it.folder, 'train.log')
+            handler = logging.FileHandler(path)
+            handler.setFormatter(logging.Formatter('%(levelname)s %(process)d %(message)s'))
+            rootLogger = logging.getLogger()
+            rootLogger.addHandler(handler)
+            handlers, level = rootLogger.handlers[:], rootLogger.level
+            try:
+                trainer = ai.TTTrainer(4, tensor=True, evaluation='pool', numWorkers=2, seed=1, queueLogging=True)
+                trainer.genStop = 2
+                trainer.train()
+                assert rootLogger.handlers == handlers and rootLogger.level == level
+            finally:
+                rootLogger.removeHandler(handler)
+                handler.close()
+
+            with open(path) as f:
+                lines = f.read().splitlines()
+            assert all(line.split(' ')[0] in ('INFO', 'WARNING', 'ERROR') for line in lines)
+            processes = set(line.split(' ')[1] for line in lines if 'Pool worker ending' in line)
+            assert len(processes) == 2 and str(os.getpid()) not in processes
+            assert any('Training has completed' in line for line in lines)
+
+        @it.should('log to the current file after the listener rotated it')
+        def test():
+            path = os.path.join(it.folder, 'rotated.log')
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=200, backupCount=1)
+            rootLogger = logging.getLogger()
+            rootLogger.addHandler(handler)
+            try:
+                with logs.TTTLogListener():
+                    for x in range(20):
+                        logging.info("Record {} written by the listener".format(x))
+                logging.warning("Written after the listener stopped")
+            finally:
+                rootLogger.removeHandler(handler)
+                handler.close()
+
+            assert os.path.exists(path + '.1')
+            with open(path) as f:
+                text = f.read()
+            assert 'Record 19 written by the listener' in text and 'Written after the listener stopped' in text
+
+    with it.having('work split into chunks for the workers'):
+        @it.should('cover every game once, in chunks of the given size or enough for each worker to take a few')
+        def test():
+            for count, numWorkers, chunkSize in [(100, 3, None), (100, 3, 7), (5, 8, None), (0, 2, None)]:
+                chunks = workers.splitWork(count, numWorkers, chunkSize)
+                assert numpy.array_equal(numpy.concatenate(chunks + [numpy.arange(0)]), numpy.arange(count))
+                assert all(len(chunk) > 0 for chunk in chunks)
+                if chunkSize is not None:
+                    assert all(len(chunk) == chunkSize for chunk in chunks[:-1])
+                else:
+                    assert len(chunks) <= numWorkers * workers.CHUNKS_PER_WORKER
+
+        @it.should('play the same games with any chunk size and record how busy each worker was')
+        def test():
+            results = {}
+            for tensor, evaluation, chunkSize in [(True, 'lockstep', None), (True, 'pool', 2), (True, 'shared', 5),
+                                                  (True, 'thread', 4), (False, 'serial', None), (False, 'queue', 3)]:
+                trainer = ai.TTTrainer(5, tensor=tensor, evaluation=evaluation, numWorkers=3, seed=3,
+                                       chunkSize=chunkSize)
+                trainer.genStop = 2
+                results.setdefault(tensor, set()).add(float(trainer.train().fitness))
+
+                record = trainer.lastMetrics
+                if evaluation not in ('lockstep', 'serial'):
+                    assert sum(record['worker{}Games'.format(n)] for n in range(1, 4)) == record['games']
+                    assert all(record['worker{}Utilization'.format(n)] >= 0 for n in range(1, 4))
+                    assert record['utilization'] > 0
+                else:
+                    assert 'utilization' not in record
+            assert len(results[True]) == len(results[False]) == 1
+
+    with it.having('a thread pool'):
+        @it.should('play the same games as the lockstep engine and count their forward passes')
+        def test():
+            population1, population2 = ai.TTTTensorPopulation(6), ai.TTTTensorPopulation(5)
+            tensors1, tensors2 = population1.getTensors(), population2.getTensors()
+            pairs = matches.allPairs(6, 5)
+            passes = ai.TTTNeuralNet.forwardPasses
+            expected = matches.playLockstep(tensors1, tensors2, pairs)
+            lockstepPasses = ai.TTTNeuralNet.forwardPasses - passes
+
+            pool = workers.TTTThreadPool(3, chunkSize=4)
+            try:
+                assert pool.update(tensors1, tensors2) == 0
+                passes = ai.TTTNeuralNet.forwardPasses
+                assert numpy.array_equal(pool.play(pairs), expected)
+                assert ai.TTTNeuralNet.forwardPasses - passes == lockstepPasses
+                assert pool.gamesPlayed.sum() == len(pairs) and pool.playTime >= pool.busyTime.max()
+            finally:
+                pool.close()
+            assert not any(thread.is_alive() for thread in pool.threads)
+
+    with it.having('a shared memory pool'):
+        @it.should('only send back the result of each game when asked to')
+        def test():
+            population1, population2 = ai.TTTTensorPopulation(6), ai.TTTTensorPopulation(5)
+            tensors1, tensors2 = population1.getTensors(), population2.getTensors()
+            pairs = matches.allPairs(6, 5)
+            expected = matches.playLockstep(tensors1, tensors2, pairs)
+            gained = matches.reduceFitness(pairs, expected, 6, 5)
+
+            pool = workers.TTTSharedPool(6, 2, chunkSize=4)
+            try:
+                pool.load(tensors1, tensors2)
+                assert pool.play() is None
+                assert all(numpy.allclose(a, b) for a, b in zip(pool.fitness(), gained))
+                pool.load(tensors1, tensors2)
+                assert numpy.array_equal(pool.play(pairs, deltas=True), expected)
+                assert all(numpy.allclose(a, b) for a, b in zip(pool.fitness(), gained))
+            finally:
+                pool.close()
+
+    with it.having('a trainer profiling generations'):
+        @it.has_setup
+        def setup():
+            it.folder = tempfile.mkdtemp()
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(it.folder)
+
+        @it.should('merge the stats of every process into one report per profiled generation')
+        def test():
+            for tensor, evaluation, timer in [(False, 'queue', 'calcFitness'), (True, 'pool', 'playLockstep')]:
+                path = os.path.join(it.folder, evaluation)
+                trainer = ai.TTTrainer(4, tensor=tensor, evaluation=evaluation, numWorkers=2, seed=1,
+                                       profilePath=path, profileInterval=2)
+                trainer.genStop = 3
+                trainer.train()
+
+                assert sorted(name for name in os.listdir(it.folder) if name.startswith(evaluation)) == [
+                    evaluation + '.gen1.prof', evaluation + '.gen1.txt', evaluation + '.gen3.prof',
+                    evaluation + '.gen3.txt']
+                with open(path + '.gen1.txt') as f:
+                    report = f.read()
+                assert report.startswith('Profiled 3 process(es) and thread(s)')
+                assert timer in report and 'nextGen' in report
+                stats = pstats.Stats(path + '.gen1.prof')
+                assert any(function == '_trainGeneration' for filename, line, function in stats.stats)
+                assert not profiling.isProfiling()
+
+        @it.should('add up the time spent in timed blocks only while a profiler runs')
+        def test():
+            with profiling.timed('unprofiled'):
+                pass
+            with profiling.TTTProfiler(os.path.join(it.folder, 'blocks')) as profiler:
+                for x in range(3):
+                    with profiling.timed('block'):
+                        pass
+            assert profiler.timers.totals.keys() == ['block'] and profiler.timers.totals['block'][1] == 3
+            report = profiling.merge(os.path.join(it.folder, 'blocks'))
+            assert 'block' in report and 'unprofiled' not in report
+            assert sorted(name for name in os.listdir(it.folder) if name.startswith('blocks')) == ['blocks.prof',
+                                                                                                 'blocks.txt']
+
+    with it.having('the benchmark harness'):
+        @it.has_setup
+        def setup():
+            it.folder = tempfile.mkdtemp()
+
+        @it.has_teardown
+        def teardown():
+            shutil.rmtree(it.folder)
+
+        @it.should('save a report for every benchmark run that compares cleanly with itself')
+        def test():
+            path = os.path.join(it.folder, 'bench.json')
+            assert bench.main(['--only', 'board', 'nextGen', 'generation', '--repeat', '2', '--ops', '10', '--sizes',
+                               '4', '--evaluations', 'lockstep', '--generation-repeat', '1', '-o', path]) == 0
+            with open(path) as f:
+                report = json.load(f)
+            assert [result['name'] for result in report['results']] == [
+                'TTTBoard.checkForWin', 'TTTBoard.checkForBlocks', 'TTTBitBoard.checkForWin',
+                'TTTBitBoard.checkForBlocks', 'TTTPopulation.nextGen', 'TTTTensorPopulation.nextGen',
+                'TTTrainer.trainGeneration']
+            for result in report['results']:
+                assert 0 < result['min'] <= result['p50'] <= result['p99']
+            assert bench.compare(report, report)[1] == []
+            slower = json.loads(json.dumps(report))
+            slower['results'][0]['mean'] *= 2
+            assert bench.compare(report, slower)[1] == [bench._label(report['results'][0])]
+
+    with it.having('a lockstep match engine'):
+        @it.has_setup
+        def setup():
+            it.pops = [ai.TTTTensorPopulation(10), ai.TTTTensorPopulation(10)]
+            for pop in it.pops:  # larger weights make for longer and more varied games
+                pop.weights = [weights * 20 for weights in pop.weights]
+
+        @it.has_teardown
+        def teardown():
+            del it.pops
+
+        @it.should('give each net the same fitness as playing every game with calcFitness')
+        def test():
+            nets1, nets2 = [[net.copy() for net in pop.nets] for pop in it.pops]
+            for net1 in nets1:
+                for net2 in nets2:
+                    ai.calcFitness(net1, net2)
+
+            pairs = matches.allPairs(10, 10)
+            deltas = matches.playLockstep(it.pops[0].getTensors(), it.pops[1].getTensors(), pairs)
+            fitness1, fitness2 = matches.reduceFitness(pairs, deltas, 10, 10)
+            logging.debug("calcFitness: {} {}, lockstep: {} {}".format(nets1, nets2, fitness1, fitness2))
+            assert list(fitness1) == [net.fitness for net in nets1]
+            assert list(fitness2) == [net.fitness for net in nets2]
+
+    with it.having('an evaluation backend passed to a trainer'):
+        @it.should('be opened and closed by train and give the same generations as the backend named the same')
+        def test():
+            class Backend(backends.TTTSerialBackend):
+                calls = []
+
+                def open(self, pop1, pop2):
+                    self.calls.append('open')
+                    super(Backend, self).open(pop1, pop2)
+
+                def play(self, pairs=None):
+                    self.calls.append('play')
+                    return super(Backend, self).play(pairs)
+
+                def close(self):
+                    self.calls.append('close')
+                    super(Backend, self).close()
+
+            trainers = [ai.TTTrainer(5, tensor=True, evaluation=evaluation, seed=4)
+                        for evaluation in [Backend(lockstep=True), 'lockstep']]
+            for trainer in trainers:
+                trainer.genStop = 3
+                trainer.train()
+            assert Backend.calls == ['open', 'play', 'play', 'play', 'close']
+            assert trainers[0].evaluation == trainers[1].evaluation == 'lockstep'
+            for population, other in zip(*[trainer.populations for trainer in trainers]):
+                for arrays, otherArrays in zip(sum(population.getTensors(), []), sum(other.getTensors(), [])):
+                    assert numpy.array_equal(arrays, otherArrays)
+
+        @it.should('be made from each evaluation name')
+        def test():
+            for name in ai.TTTrainer.EVALUATIONS:
+                backend = backends.makeBackend(name, numWorkers=2)
+                assert str(backend) == name
+                assert backend.inWorkers == (name in ai.TTTrainer.WORKER_EVALUATIONS)
+            try:
+                ai.TTTrainer(2, evaluation='carrier pigeon')
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("An unknown evaluation name was accepted")
+
+    with it.having('a trainer playing its games in worker processes'):
+        @it.has_setup
+        def setup():
+            it.trainer = ai.TTTrainer(8)
+
+        @it.has_teardown
+        def teardown():
+            del it.trainer
+
+        @it.should('give each net the same fitness as playing every game serially')
+        def test():
+            serialBackend = backends.TTTSerialBackend()
+            serialBackend.open(it.trainer.pop1, it.trainer.pop2)
+            serialBackend.play()
+            serialBackend.close()
+            serial = [[net.fitness for net in pop.nets] for pop in it.trainer.populations]
+            for pop in it.trainer.populations:
+                for net in pop.nets:
+                    net.fitness = 0
+
+            it.trainer.playAll()
+            parallel = [[net.fitness for net in pop.nets] for pop in it.trainer.populations]
+            logging.debug("Serial fitness: {}, parallel fitness: {}".format(serial, parallel))
+            assert serial == parallel
+            assert any(fitness != 0 for fitness in serial[0] + serial[1])
+
+        @it.should('log the move cache hits of the workers, for nets of either population type')
+        def test():
+            records = []
+            handler = logging.Handler()
+            handler.emit = records.append
+            logger = logging.getLogger()
+            level = logger.level
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            try:
+                for trainer in [it.trainer, ai.TTTrainer(8, tensor=True)]:
+                    del records[:]
+                    trainer.backend.moveCache = 64
+                    try:
+                        trainer.playAll()
+                    finally:
+                        trainer.backend.moveCache = 0
+                    rates = [record.getMessage() for record in records
+                             if 'Move cache hit rate' in record.getMessage()]
+                    assert rates and not rates[0].startswith('Move cache hit rate: 0.0%')
+            finally:
+                logger.removeHandler(handler)
+                logger.setLevel(level)
+
+
 it.createTests(globals())
@@ -3,11 +3,9 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import sys
-import pygame
 import ai
 import boards
 import players
-import tttoe
 
 
 logFormat = logging.Formatter('%(asctime)s %(funcName)s (%(module)s): %(message)s')
@@ -25,9 +23,5 @@ rootLogger.addHandler(fileHandler)
 rootLogger.addHandler(consoleHandler)
 
 logging.debug("Logging initiated")
-result = pygame.init()
-logging.debug("Pygame initiated {}".format(result))
-if result[1] != 0:
-    logging.warning("WARNING: {} pygame module(s) unsuccessfully initiated (error: {})".format(result[1],
-                                                                                               pygame.get_error()))
+# pygame isn't imported here, see the gui module. Import tttoe for the game
 
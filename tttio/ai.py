@@ -11,12 +11,27 @@ generation begins. The workflow stops when the fitness score of the top percenta
 Logging config occurs in the __init__.py file included in this package
 """
 
+import numpy as np
 from numpy import random
 import math
 import os
+import time
 import multiprocessing as mp
 import logging
-from boards import TTTBoard
+import hashlib
+import pickle
+import copy
+import threading
+from collections import OrderedDict
+from boards import TTTBitBoard
+import backends
+import logs
+import matches
+import metrics
+import netfile
+import policy
+import profiling
+import workers
 
 
 _here = os.path.abspath(os.path.dirname(__file__))
@@ -32,29 +47,102 @@ BLOCKOPP = 10
 OVERLAPDOC = -40
 
 
+def _random(rng):
+    """
+    Returns rng, or numpy's global random module if rng is None
+    """
+
+    return random if rng is None else rng
+
+
+def randomStream(seed, *path):
+    """
+    Returns a numpy RandomState for the stream found at path (for example ('population', 0)) under seed. Every path
+    gets its own independent stream, and the same seed and path always give the same stream, no matter which process
+    asks for it.
+    """
+
+    key = '/'.join(str(part) for part in (seed, ) + path)
+    return random.RandomState(np.frombuffer(hashlib.sha256(key.encode('utf-8')).digest(), dtype='<u4'))
+
+
+def seedWorker(seed, index):
+    """
+    Seeds numpy's global random state in worker process index with its own stream under seed, so that nothing drawn
+    in a worker depends on the state it was forked with. Does nothing if seed is None.
+    """
+
+    if seed is not None:
+        random.set_state(randomStream(seed, 'worker', index).get_state())
+
+
+class _WeightList(list):
+    """
+    List holding the weights of a TTTNeuron, which touches the neuron whenever it is changed in place. Pickles as a
+    plain list.
+    """
+
+    def __init__(self, neuron, weights):
+        list.__init__(self, weights)
+        self.neuron = neuron
+
+    def __reduce__(self):
+        return list, (list(self), )
+
+
+def _touching(name):
+    """
+    Returns a version of the list method name that touches the neuron of the _WeightList after calling it
+    """
+
+    method = getattr(list, name)
+
+    def touching(self, *args):
+        result = method(self, *args)
+        self.neuron.touch()
+        return result
+
+    touching.__name__ = name
+    return touching
+
+
+for _name in ('__setitem__', '__delitem__', '__setslice__', '__delslice__', '__iadd__', '__imul__', 'append',
+              'extend', 'insert', 'pop', 'remove', 'reverse', 'sort'):
+    setattr(_WeightList, _name, _touching(_name))
+
+
 class TTTNeuron(object):
     """
     Representation of a sigmoid neuron.
+
+    Every change to a neuron's weights or bias (assigning them or editing the weights in place) gives the neuron a new
+    version, a number no other neuron has had. Nets use the versions of their neurons to know when to re-pack their
+    numpy arrays and empty their move caches, see TTTNeuralNet.version.
     """
 
-    def __init__(self, layer, num_inputs=10, weights=None, bias=None):
+    # last version given to a neuron. Nets only look at the versions of their neurons when this has changed
+    revision = 0
+
+    def __init__(self, layer, num_inputs=10, weights=None, bias=None, rng=None):
         """
         Create the neuron
         :param: layer: The layer this neuron is found in.
         :param num_inputs: Number of inputs this neuron will receive.
         :param weights: List of weights that will be used as this neurons weights. If None, weights will be generated
         :param bias: Value for the bias to specify. If None, weights will be generated
+        :param rng: numpy RandomState to generate the weights with. Defaults to numpy's global random state
         :return: None
         """
 
         self.layer = layer
         self.numInputs = num_inputs
+        self.version = 0
         self.weights = weights if weights is not None else []
         self.bias = bias if bias is not None else 0
         self.WEIGHTSRANGE = (-1, 1)
         self.BIASRANGE = (-7.5, 7.5)
         if weights is None and bias is None:
-            self.generate()
+            self.generate(rng)
 
     def __repr__(self):
         """
@@ -64,27 +152,74 @@ class TTTNeuron(object):
         return "<{};{};{}>".format(
             self.layer, self.bias, ','.join(["{:.2f}".format(i) for i in self.weights]))
 
-    def _genWeights(self):
+    def __setstate__(self, state):
+        """
+        Wraps the weights back into a _WeightList when unpickling. The revision counter starts from 0 in every process,
+        so it is moved past the neuron's version to keep the versions given out from now on new to this neuron.
+        """
+
+        self.__dict__.update(state)
+        self._weights = _WeightList(self, self._weights)
+        TTTNeuron.revision = max(TTTNeuron.revision, self.version)
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @weights.setter
+    def weights(self, weights):
+        self._weights = _WeightList(self, weights)
+        self.touch()
+
+    @property
+    def bias(self):
+        return self._bias
+
+    @bias.setter
+    def bias(self, bias):
+        self._bias = bias
+        self.touch()
+
+    def _genWeights(self, rng=None):
         """
         Generates and returns random weights of type double inside self.WEIGHTSRANGE, one for each input.
         """
 
-        return [float("{:0.3f}".format(random.uniform(*self.WEIGHTSRANGE))) for x in range(self.numInputs)]
+        return [float("{:0.3f}".format(_random(rng).uniform(*self.WEIGHTSRANGE))) for x in range(self.numInputs)]
 
-    def _genBias(self):
+    def _genBias(self, rng=None):
         """
         Generates and returns a random bias of type double inside self.BIASRANGE.
         """
 
-        return random.uniform(*self.BIASRANGE)
+        return _random(rng).uniform(*self.BIASRANGE)
 
-    def generate(self):
+    def generate(self, rng=None):
         """
         Initiates itself with random values.
+        :param rng: numpy RandomState to draw from. Defaults to numpy's global random state
         """
 
-        self.weights = self._genWeights()
-        self.bias = self._genBias()
+        self.weights = self._genWeights(rng)
+        self.bias = self._genBias(rng)
+
+    def touch(self):
+        """
+        Gives the neuron a new version, which makes the nets holding it re-pack their numpy arrays and empty their move
+        caches. Called whenever the weights or bias change, so it only needs to be called by hand after changing
+        something the neuron can't see, such as a weight list that was taken out of it and put back.
+        """
+
+        TTTNeuron.revision += 1
+        self.version = TTTNeuron.revision
+
+    @classmethod
+    def touchAll(cls):
+        """
+        Makes every net check the versions of its neurons again, to be called after moving neurons between nets
+        """
+
+        cls.revision += 1
 
     @staticmethod
     def _sigmoid(x):
@@ -109,7 +244,7 @@ class TTTNeuron(object):
 
         return self._sigmoid(sum)
 
-    def mutate(self):
+    def mutate(self, rng=None):
         """
         Mutates this neural network by selecting a random weight and doing one of the following:
         Replacing it with a new random value
@@ -120,41 +255,43 @@ class TTTNeuron(object):
          or swapping it out with another weight.
 
         While executing a selected task, there is a 50% chance that the task will also be done to the bias.
+        :param rng: numpy RandomState to draw from. Defaults to numpy's global random state
         :return: None
         """
 
-        randWeight = random.randint(0, len(self.weights))
-        randTask = random.randint(0, 6)
+        rng = _random(rng)
+        randWeight = rng.randint(0, len(self.weights))
+        randTask = rng.randint(0, 6)
 
         if randTask == 0:  # replace weight with random value
-            self.weights[randWeight] = random.uniform(*self.WEIGHTSRANGE)
-            if random.random() < 0.5:
-                self.bias = random.uniform(*self.BIASRANGE)
+            self.weights[randWeight] = rng.uniform(*self.WEIGHTSRANGE)
+            if rng.random_sample() < 0.5:
+                self.bias = rng.uniform(*self.BIASRANGE)
 
         elif randTask == 1:  # multiple by a random value between 0.5 and 1.5
-            self.weights[randWeight] *= random.uniform(0.5, 1.5)
-            if random.random() < 0.5:
-                self.bias *= random.uniform(0.5, 1.5)
+            self.weights[randWeight] *= rng.uniform(0.5, 1.5)
+            if rng.random_sample() < 0.5:
+                self.bias *= rng.uniform(0.5, 1.5)
 
         elif randTask == 2:  # add or subtract a random value between -1 and 1
-            self.weights[randWeight] += random.uniform(-1, 1)
-            if random.random() < 0.5:
-                self.bias += random.uniform(-1, 1)
+            self.weights[randWeight] += rng.uniform(-1, 1)
+            if rng.random_sample() < 0.5:
+                self.bias += rng.uniform(-1, 1)
 
         elif randTask == 3:  # change the polarity
             self.weights[randWeight] *= -1.0
-            if random.random() < 0.5:
+            if rng.random_sample() < 0.5:
                 self.bias *= -1.0
 
         elif randTask == 4:  # re-create itself
-            self._genWeights()
-            if random.random() < 0.5:
-                self._genBias()
+            self._genWeights(rng)
+            if rng.random_sample() < 0.5:
+                self._genBias(rng)
 
         else:  # swap two of the weights
             randWeight2 = randWeight
             while randWeight2 == randWeight:
-                randWeight2 = random.randint(0, len(self.weights))
+                randWeight2 = rng.randint(0, len(self.weights))
             weight = self.weights[randWeight]
             self.weights[randWeight] = self.weights[randWeight2]
             self.weights[randWeight2] = weight
@@ -164,28 +301,48 @@ class TTTNeuralNet(object):
     """
     Tic-Tac-Toe Neural network object. Has 10 input neurons (nine for each space on the board, one for whose turn
     it is), one hidden network containing nine neurons and nine output neurons.
+
+    By default the net runs in dense mode: the weights and biases of each layer are packed into numpy arrays and a
+    forward pass is three matrix multiplications. The TTTNeuron objects found in self.layers are still the source of
+    the weights, so mutating and breeding work on them like before and the arrays are re-packed when they change.
+
+    getMove can remember the moves it picked in a least recently used cache of up to moveCacheSize positions, which is
+    emptied whenever the weights of the net's own neurons change (see version). cacheHits and cacheMisses count how
+    often it was used.
     """
 
     pieceValues = [0.001, 0.01, 0]  # x, o, empty
+    # number of input sets fed through any net in this process, by feed, feedBatch and matches.feedNets
+    forwardPasses = 0
 
-    def __init__(self, layers=None, fitness=0):
+    def __init__(self, layers=None, fitness=0, dense=True, moveCacheSize=0, rng=None):
         """
         Create the neural net.
         :param layers: A nested array: [[Input Layer neurons], [Hidden Layer neurons], [Output Layer neurons]] that is
         used to specify layers containing neurons to use instead of creating random ones.
         :param fitness: Used to specify fitness to start out with
+        :param dense: If True, feed will use the packed numpy arrays instead of calling each neuron's feed method
+        :param moveCacheSize: Number of positions getMove remembers its move for. 0 turns the cache off
+        :param rng: numpy RandomState to create random neurons with. Defaults to numpy's global random state
         :return: None
         """
 
         self.NUMINPUT = 10
         self.NUMHIDDEN = 9
         self.NUMOUTPUT = 9
-        self.layers = layers if layers is not None else self.create()
+        self.layers = layers if layers is not None else self.create(rng)
         self.inputLayer, self.hiddenLayer, self.outputLayer = self.layers[:]
         self.fitness = fitness  # this is a placeholder for when it is in a population.
         self.mutateChances = [0.05,  # 5% chance of executing mutate task 1
                               47.55,  # 47.5% chance of executing mutate task 2
                               1]  # 47.5% chance of executing mutate task 3
+        self.dense = dense
+        # weights and biases of each layer as numpy arrays, see pack
+        self.weights = None
+        self.biases = None
+        self._initVersion()
+        self._packedVersion = None
+        self._initMoveCache(moveCacheSize)
 
     def __repr__(self):
         """
@@ -194,16 +351,65 @@ class TTTNeuralNet(object):
 
         return str(self.fitness)
 
+    def __getstate__(self):
+        """
+        Leaves the packed arrays out when pickling, they are re-packed from the neurons when needed.
+        """
+
+        state = self.__dict__.copy()
+        state['weights'] = state['biases'] = state['_packedVersion'] = None
+        state['_moveCache'] = state['_cacheVersion'] = None
+        state['_checkedRevision'] = state['_neuronVersions'] = None
+        return state
+
+    def _initVersion(self):
+        """
+        Sets up the state behind version
+        """
+
+        self._version = 0
+        self._checkedRevision = None  # TTTNeuron.revision when the versions of the neurons were last checked
+        self._neuronVersions = None
+
+    def _initMoveCache(self, moveCacheSize):
+        """
+        Sets up an empty move cache and its counters
+        """
+
+        self.moveCacheSize = moveCacheSize
+        self._moveCache = None
+        self._cacheVersion = None
+        self.cacheHits = 0
+        self.cacheMisses = 0
+
+    def version(self):
+        """
+        Returns a number that changes whenever a neuron of this net changes (see TTTNeuron.version) or is swapped for
+        another one. The versions of the neurons are only looked at when any neuron anywhere has changed, so calling
+        this costs next to nothing while nothing is being changed.
+        """
+
+        if self._checkedRevision != TTTNeuron.revision:
+            self._checkedRevision = TTTNeuron.revision
+            versions = tuple(neuron.version for layer in (self.inputLayer, self.hiddenLayer, self.outputLayer)
+                             for neuron in layer)
+            if versions != self._neuronVersions:
+                self._neuronVersions = versions
+                self._version += 1
+        return self._version
+
     @classmethod
     def load(cls, file_path):
         """
         Opens up the file found at file_path and reads its contents consisting of a stored TTTNeuralNet object
         in order to return a new TTTNeuralNet object. The file at file_path should be the result of the export function
-        found below.
+        found below, or of exportBinary.
         """
 
         if not os.path.exists(file_path):
             raise IOError("{} does not exist!".format(file_path))
+        elif netfile.isNetFile(file_path):
+            return cls.loadBinary(file_path)
         else:
             input_layer, hidden_layer, output_layer = [], [], []
             with open(file_path, 'r') as fp:
@@ -226,6 +432,23 @@ class TTTNeuralNet(object):
 
             return TTTNeuralNet(layers=[input_layer, hidden_layer, output_layer])
 
+    @classmethod
+    def fromArrays(cls, weights, biases, fitness=0, moveCacheSize=0):
+        """
+        Creates a new TTTNeuralNet whose neurons hold the given weights and biases.
+        :param weights: List of three arrays shaped (neurons, inputs), one for each layer (see pack)
+        :param biases: List of three arrays shaped (neurons, ), one for each layer
+        :param fitness: Used to specify fitness to start out with
+        :param moveCacheSize: Number of positions getMove remembers its move for, see TTTNeuralNet
+        """
+
+        layers = []
+        for name, layerWeights, layerBiases in zip(["input", "hidden", "output"], weights, biases):
+            layers.append([TTTNeuron(name, num_inputs=len(neuronWeights), weights=list(map(float, neuronWeights)),
+                                     bias=float(bias)) for neuronWeights, bias in zip(layerWeights, layerBiases)])
+
+        return cls(layers=layers, fitness=fitness, moveCacheSize=moveCacheSize)
+
     def export(self, file_path):
         """
         Creates a new txt file at file_path, replacing the existing file at that location if needed, containing the
@@ -237,21 +460,47 @@ class TTTNeuralNet(object):
                 for neuron in layer:
                     exportFile.write(neuron.__repr__() + "\n")
 
+    @classmethod
+    def loadBinary(cls, file_path, index=0):
+        """
+        Returns the net at index of a file written by exportBinary or TTTPopulation.exportBinary
+        """
+
+        weights, biases, fitness = netfile.read(file_path, mode='r')
+        return cls.fromArrays([w[index] for w in weights], [b[index] for b in biases], fitness=float(fitness[index]))
+
+    def exportBinary(self, file_path):
+        """
+        Saves the net in the binary format of the netfile module, which keeps the weights exactly as they are instead
+        of rounding them like export does.
+        """
+
+        weights, biases = self.getArrays()
+        netfile.write(file_path, [w[None] for w in weights], [b[None] for b in biases], [self.fitness])
+
     def copy(self):
         """
         Returns a new Neural Network that is exactly like this one
         """
 
-        return TTTNeuralNet(layers=[x for x in self.layers], fitness=self.fitness)
+        return TTTNeuralNet(layers=[x for x in self.layers], fitness=self.fitness, dense=self.dense,
+                            moveCacheSize=self.moveCacheSize)
+
+    def snapshot(self):
+        """
+        Returns a copy of the net's arrays that pickles as a TTTNeuralNet, see _NetSnapshot
+        """
+
+        return _NetSnapshot(self)
 
-    def create(self):
+    def create(self, rng=None):
         """
         Returns layers of neurons.
         """
 
-        return [[TTTNeuron("input") for x in range(self.NUMINPUT)],
-                [TTTNeuron("hidden") for y in range(self.NUMHIDDEN)],
-                [TTTNeuron("output", num_inputs=9) for z in range(self.NUMOUTPUT)]]
+        return [[TTTNeuron("input", rng=rng) for x in range(self.NUMINPUT)],
+                [TTTNeuron("hidden", rng=rng) for y in range(self.NUMHIDDEN)],
+                [TTTNeuron("output", num_inputs=9, rng=rng) for z in range(self.NUMOUTPUT)]]
 
     @staticmethod
     def _feedLayer(input_set, layer):
@@ -263,52 +512,180 @@ class TTTNeuralNet(object):
 
         return [layer[x].feed(input_set) for x in range(len(layer))]
 
+    @staticmethod
+    def _sigmoid(x):
+        """
+        Sends each value in the numpy array x through a logistic sigmoid function and returns the output
+        """
+
+        return 1 / (1 + np.exp(-x))
+
+    def pack(self):
+        """
+        Packs the weights and biases of the neurons in each layer into numpy arrays and stores them in self.weights
+        (arrays shaped (neurons, inputs)) and self.biases (arrays shaped (neurons, )).
+        :return: self.weights, self.biases
+        """
+
+        layers = [self.inputLayer, self.hiddenLayer, self.outputLayer]
+        self.weights = [np.array([neuron.weights for neuron in layer], dtype=float) for layer in layers]
+        self.biases = [np.array([neuron.bias for neuron in layer], dtype=float) for layer in layers]
+        self._packedVersion = self.version()
+        return self.weights, self.biases
+
+    def getArrays(self):
+        """
+        Returns self.weights and self.biases, re-packing them first if any of the net's neurons has changed since they
+        were packed.
+        """
+
+        if self._packedVersion != self.version():
+            self.pack()
+        return self.weights, self.biases
+
     def feed(self, input_set):
         """
         Takes in a list of 10 inputs to use (in order of <TURN><SQ1><SQ2>, etc.) and then returns the output.
         """
 
-        return self._feedLayer(self._feedLayer(self._feedLayer(input_set, self.inputLayer), self.hiddenLayer),
-                               self.outputLayer)
+        TTTNeuralNet.forwardPasses += 1
+        if not self.dense:
+            return self._feedLayer(self._feedLayer(self._feedLayer(input_set, self.inputLayer), self.hiddenLayer),
+                                   self.outputLayer)
+
+        output = np.asarray(input_set, dtype=float)
+        for weights, biases in zip(*self.getArrays()):
+            output = self._sigmoid(np.dot(weights, output) + biases)
+        return output
+
+    def feedBatch(self, input_sets):
+        """
+        Feeds many input sets through the net at once and returns the outputs as an (N, 9) numpy array.
+        :param input_sets: (N, 10) array (or list of lists) where each row is an input set as described in feed
+        """
+
+        input_sets = np.asarray(input_sets, dtype=float)
+        if input_sets.ndim != 2 or input_sets.shape[1] != self.NUMINPUT:
+            raise ValueError("Expected an (N, {}) array of inputs, got shape {}".format(self.NUMINPUT,
+                                                                                    input_sets.shape))
+
+        if not self.dense:
+            return np.array([self.feed(input_set) for input_set in input_sets])
+
+        TTTNeuralNet.forwardPasses += len(input_sets)
+        output = input_sets
+        for weights, biases in zip(*self.getArrays()):
+            output = self._sigmoid(np.dot(output, weights.T) + biases)
+        return output
+
+    @classmethod
+    def encodeBoards(cls, turns, boards):
+        """
+        Translates many boards into an (N, 10) array of input sets, the same way getMove does for a single board.
+        :param turns: List of whose turn it is for each board (x or o), or a single value to use for all of them
+        :param boards: List of TTTBoard objects or of string representations of tic tac toe boards
+        """
+
+        sBoards = [board.sBoard if hasattr(board, 'sBoard') else board for board in boards]
+        if np.isscalar(turns):
+            turns = [turns] * len(sBoards)
+        elif len(turns) != len(sBoards):
+            raise ValueError("Got {} turns for {} boards".format(len(turns), len(sBoards)))
+
+        input_sets = np.empty((len(sBoards), 10))
+        input_sets[:, 0] = [cls.pieceValues[0] if turn == 'x' else cls.pieceValues[1] for turn in turns]
+        if len(sBoards) > 0:
+            pieces = np.array([[b for a in sBoard for b in a] for sBoard in sBoards])
+            input_sets[:, 1:] = np.where(pieces == 'x', cls.pieceValues[0], cls.pieceValues[1])
+        return input_sets
 
     def getMove(self, turn, sBoard):
         """
         Translates the pieces on the sBoard to ints, feeds itself the input and then returns the position on the board
         in which it will move (in the 'int' notation, that is one of the positions on the board labeled 1-9)
         :param turn: x or o for who the current turn it is
-        :param sBoard: String representation of a tic tac toe board.
+        :param sBoard: String representation of a tic tac toe board, or a TTTBoard object
         """
 
+        if self.moveCacheSize:
+            version = self.version()
+            if self._moveCache is None or self._cacheVersion != version:
+                self._moveCache = OrderedDict()
+                self._cacheVersion = version
+            # empty spaces are fed to the net the same way as o's, so only the turn and the x's matter
+            key = policy.moveIndex(turn, sBoard)
+            if key in self._moveCache:
+                self.cacheHits += 1
+                move = self._moveCache.pop(key)
+                self._moveCache[key] = move
+                return move
+            self.cacheMisses += 1
+
+        if hasattr(sBoard, 'sBoard'):
+            sBoard = sBoard.sBoard
         input_set = [self.pieceValues[0] if turn == 'x' else self.pieceValues[1]]
         [input_set.extend([self.pieceValues[0] if b == 'x' else self.pieceValues[1] for b in a]) for a in sBoard]
+        move = int(np.argmax(self.feed(input_set))) + 1
+
+        if self.moveCacheSize:
+            self._moveCache[key] = move
+            if len(self._moveCache) > self.moveCacheSize:
+                self._moveCache.popitem(last=False)
+        return move
+
+    def getMoves(self, turns, boards):
+        """
+        Batched version of getMove. Returns a numpy array holding the move (1-9) the net would make on each board.
+        :param turns: List of whose turn it is for each board (x or o), or a single value to use for all of them.
+        Ignored if boards is already an array of input sets.
+        :param boards: List of TTTBoard objects or string representations of boards, or an (N, 10) array of input
+        sets made by encodeBoards
+        """
+
+        if isinstance(boards, np.ndarray):
+            input_sets = boards
+        else:
+            input_sets = self.encodeBoards(turns, boards)
 
-        output = self.feed(input_set)
-        highest = 0
-        for index, out in enumerate(output):
-            if out > output[highest]:
-                highest = index
-        return highest + 1
+        return np.argmax(self.feedBatch(input_sets), axis=1) + 1
 
-    def mutate(self):
+    def compile(self):
+        """
+        Runs the net on every input getMove can give it and returns the moves as a policy.TTTPolicyTable, which plays
+        exactly like the net without needing numpy or the neurons.
+        """
+
+        indices = np.arange(policy.SIZE)
+        input_sets = np.empty((policy.SIZE, 10))
+        input_sets[:, 0] = np.where(indices >= 512, self.pieceValues[0], self.pieceValues[1])
+        xSpaces = (indices[:, None] >> np.arange(9)) & 1
+        input_sets[:, 1:] = np.where(xSpaces == 1, self.pieceValues[0], self.pieceValues[1])
+        return policy.TTTPolicyTable(self.getMoves(None, input_sets).astype(np.uint8))
+
+    def mutate(self, rng=None):
         """
         Selects a random neuron in one of the layers and calls its mutate function.
+        :param rng: numpy RandomState to draw from. Defaults to numpy's global random state
         """
 
-        randLayer = random.randint(0, 2)
-        self.layers[randLayer][random.randint(0, len(self.layers[randLayer]))].mutate()
+        rng = _random(rng)
+        randLayer = rng.randint(0, 2)
+        self.layers[randLayer][rng.randint(0, len(self.layers[randLayer]))].mutate(rng)
 
-    def breed(self, nn):
+    def breed(self, nn, rng=None):
         """
         Breeds itself with the given neural network by doing one of the following:
         (1)Swap a single weight between two random neurons
         (2)Swap two neurons in one random layer
         (3)Swap all of the neurons in a random layer (has less of a change of occurring).
         :param nn: neural network to breed with.
+        :param rng: numpy RandomState to draw from. Defaults to numpy's global random state
         :return: Two new offspring/TTTNeuralNet objects
         """
 
-        randTask = random.uniform(0, 1)
-        randLayer = random.randint(0, 3)
+        rng = _random(rng)
+        randTask = rng.uniform(0, 1)
+        randLayer = rng.randint(0, 3)
         children = [TTTNeuralNet(layers=self.layers), TTTNeuralNet(layers=nn.layers)]
 
         if randTask <= self.mutateChances[0]:  # all the neurons in a layer being swapped
@@ -317,22 +694,150 @@ class TTTNeuralNet(object):
             children[1].layers[randLayer] = x
 
         elif randTask <= self.mutateChances[1]:  # 47.5% chance of two neurons swapping weights
-            randNeuron = random.randint(len(children[0].layers[randLayer]))
+            randNeuron = rng.randint(len(children[0].layers[randLayer]))
             x = children[0].layers[randLayer][randNeuron]
             children[0].layers[randLayer][randNeuron] = children[1].layers[randLayer][randNeuron]
             children[1].layers[randLayer][randNeuron] = x
 
         else:  # 47.5% chance of a two weights being swapped between two neurons
-            randNeuron = random.randint(len(children[0].layers[randLayer]))
-            randWeight = random.randint(len(children[0].layers[randLayer][randNeuron].weights))
+            randNeuron = rng.randint(len(children[0].layers[randLayer]))
+            randWeight = rng.randint(len(children[0].layers[randLayer][randNeuron].weights))
             x = children[0].layers[randLayer][randNeuron][randWeight]
             children[0].layers[randLayer][randNeuron].weights[randWeight] = \
                 children[1].layers[randLayer][randNeuron].weights[randWeight]
             children[1].layers[randLayer][randNeuron].weights[randWeight] = x
 
+        TTTNeuron.touchAll()
         return children
 
 
+def _netFromArrays(weights, biases, fitness, moveCacheSize=0):
+    """
+    Module level wrapper around TTTNeuralNet.fromArrays, as python 2's pickle is unable to pickle class methods.
+    """
+
+    return TTTNeuralNet.fromArrays(weights, biases, fitness=fitness, moveCacheSize=moveCacheSize)
+
+
+class _NetSnapshot(object):
+    """
+    Copy of the weights, biases and settings of a net, taken by TTTNeuralNet.snapshot. Copying the arrays is much
+    cheaper than pickling the net's neurons, which is left for when the snapshot itself is pickled: it unpickles as a
+    standalone TTTNeuralNet.
+    """
+
+    def __init__(self, net):
+        """
+        Copy the net
+        :param net: TTTNeuralNet or TTTNetView to copy
+        """
+
+        weights, biases = net.getArrays()
+        self.weights = [np.array(w, dtype=float) for w in weights]
+        self.biases = [np.array(b, dtype=float) for b in biases]
+        self.fitness = net.fitness
+        self.moveCacheSize = net.moveCacheSize
+        self.dense = net.dense
+
+    def __reduce__(self):
+        """
+        Pickles the snapshot as the TTTNeuralNet it was taken from
+        """
+
+        return _netFromArrays, (self.weights, self.biases, self.fitness, self.moveCacheSize), {'dense': self.dense}
+
+
+class TTTNetView(TTTNeuralNet):
+    """
+    Lightweight view of a single net inside of a TTTTensorPopulation. The weights are read straight out of the
+    population's arrays, so a view is only valid until the population is sorted, randomized or moves on to its next
+    generation. Pickling a view (or calling copy) gives a standalone TTTNeuralNet.
+    """
+
+    def __init__(self, population, index):
+        """
+        Create the view. TTTNeuralNet.__init__ is not called on purpose, as that would create neurons.
+        :param population: TTTTensorPopulation holding the net
+        :param index: Index of the net inside of the population
+        """
+
+        self.population = population
+        self.index = index
+        self.dense = True
+        self.NUMINPUT = 10
+        self.NUMHIDDEN = 9
+        self.NUMOUTPUT = 9
+        self._initMoveCache(0)
+
+    def version(self):
+        """
+        Returns the population's revision, which changes whenever its nets are changed or moved
+        """
+
+        return self.population.revision
+
+    def __reduce__(self):
+        """
+        Pickles the view as a standalone TTTNeuralNet instead of dragging the whole population along.
+        """
+
+        weights, biases = self.getArrays()
+        return _netFromArrays, ([w.copy() for w in weights], [b.copy() for b in biases], self.fitness,
+                                self.moveCacheSize)
+
+    @property
+    def fitness(self):
+        return self.population.fitness[self.index]
+
+    @fitness.setter
+    def fitness(self, value):
+        self.population.fitness[self.index] = value
+
+    @property
+    def layers(self):
+        """
+        Neurons holding a snapshot of this net's weights. Changing them does not change the population.
+        """
+
+        return self.copy().layers
+
+    def pack(self):
+        """
+        Returns the weights and biases of this net as views into the population's arrays.
+        """
+
+        return [w[self.index] for w in self.population.weights], [b[self.index] for b in self.population.biases]
+
+    def getArrays(self):
+        """
+        Same as pack, the arrays of a view never need re-packing.
+        """
+
+        return self.pack()
+
+    def copy(self):
+        """
+        Returns a standalone TTTNeuralNet that is exactly like this one
+        """
+
+        weights, biases = self.getArrays()
+        return TTTNeuralNet.fromArrays(weights, biases, fitness=self.fitness, moveCacheSize=self.moveCacheSize)
+
+    def mutate(self, rng=None):
+        """
+        Mutates this net inside of the population, drawing from the population's random stream (rng is ignored).
+        """
+
+        self.population._mutateNets(np.array([self.index]))
+
+    def breed(self, nn, rng=None):
+        """
+        Breeds a standalone copy of this net with nn, see TTTNeuralNet.breed
+        """
+
+        return self.copy().breed(nn, rng)
+
+
 def loadAI(path_to_net):
     """
     Copies path_to_net to ai.txt, so that it may be used in the game
@@ -356,16 +861,21 @@ class TTTPopulation(object):
     Represents a population of neural networks (WIP).
     """
 
-    def __init__(self, population):
+    def __init__(self, population, rng=None):
         """
         Create the population
+        :param rng: numpy RandomState the population draws all of its random numbers from. Defaults to numpy's global
+        random state
         """
 
         self.population = population
+        self.rng = rng
         self.mutationRate = 0.20
         self.killingRate = 0.3
         self.diminishRate = 0.01  # percentage the population decreases each generation
         self.breedingRate = (self.killingRate / 2) - self.diminishRate  # allows for the population to slowly die off
+        # number of nets killed, bred and mutated by the last call of nextGen
+        self.killed = self.bred = self.mutated = 0
 
         self.nets = []
         self.createNeuralNets()
@@ -375,7 +885,64 @@ class TTTPopulation(object):
         Creates the population of neural nets and stores them in self.nets
         """
 
-        self.nets = [TTTNeuralNet() for i in range(self.population)]
+        self.nets = [TTTNeuralNet(rng=self.rng) for i in range(self.population)]
+
+    def snapshot(self):
+        """
+        Returns a copy of the population that training can't change, for TTTrainer.checkpoint. The nets are replaced
+        by copies of their arrays (see TTTNeuralNet.snapshot).
+        """
+
+        population = copy.copy(self)
+        population.rng = copy.deepcopy(self.rng)
+        population.nets = [net.snapshot() for net in self.nets]
+        return population
+
+    def __len__(self):
+        """
+        Returns the number of nets currently in the population
+        """
+
+        return len(self.nets)
+
+    def getTensors(self):
+        """
+        Returns the weights and biases of every net stacked into arrays, one (P, neurons, inputs) weights array and
+        one (P, neurons) biases array per layer: ([weights, ...], [biases, ...])
+        """
+
+        arrays = [net.getArrays() for net in self.nets]
+        return [np.array([a[0][layer] for a in arrays]) for layer in range(3)], \
+            [np.array([a[1][layer] for a in arrays]) for layer in range(3)]
+
+    def addFitness(self, fitness):
+        """
+        Adds each value in fitness to the fitness of the net at the same index
+        """
+
+        for net, value in zip(self.nets, fitness):
+            net.fitness += value
+
+    def exportBinary(self, file_path):
+        """
+        Saves every net in the population to one file in the binary format of the netfile module.
+        """
+
+        weights, biases = self.getTensors()
+        netfile.write(file_path, weights, biases, [net.fitness for net in self.nets])
+
+    @classmethod
+    def loadBinary(cls, file_path):
+        """
+        Returns a population holding the nets saved in file_path by exportBinary.
+        """
+
+        weights, biases, fitness = netfile.read(file_path, mode='r')
+        population = cls(0)
+        population.population = len(fitness)
+        population.nets = [TTTNeuralNet.fromArrays([w[index] for w in weights], [b[index] for b in biases],
+                                                   fitness=float(fitness[index])) for index in range(len(fitness))]
+        return population
 
     def sort(self, reverse=True):
         """
@@ -384,29 +951,31 @@ class TTTPopulation(object):
         :param reverse: if False, will sort then nets in ascending order.
         """
 
-        self.nets = sorted(self.nets, reverse=reverse)
+        self.nets = sorted(self.nets, key=lambda net: net.fitness, reverse=reverse)
 
     def randomize(self):
         """
         Moves the neural networks into random positions
         """
 
-        random.shuffle(self.nets)
+        _random(self.rng).shuffle(self.nets)
 
     def _mutate(self):
         """
         Mutates (self.mutationRate)% of the population by calling a neural networks mutate function
         """
 
+        rng = _random(self.rng)
         mutateIndex = 0
         mutated = []
         for x in range(int(self.population * self.mutationRate)):
             while mutateIndex in mutated:
-                mutateIndex = random.randint(0, self.population)
+                mutateIndex = rng.randint(0, self.population)
             mutated.append(mutateIndex)
 
         for x in mutated:
-            self.nets[x].mutate()
+            self.nets[x].mutate(rng)
+        self.mutated = len(mutated)
 
     def _breed(self):
         """
@@ -414,8 +983,10 @@ class TTTPopulation(object):
         the neural networks to be sorted in descending order based on fitness
         """
 
+        size = len(self.nets)
         for x in range(0, int(self.population * self.breedingRate), 2):
-            self.nets.extend(self.nets[x].breed(self.nets[x + 1]))
+            self.nets.extend(self.nets[x].breed(self.nets[x + 1], self.rng))
+        self.bred = len(self.nets) - size
 
     def _cut(self):
         """
@@ -426,6 +997,7 @@ class TTTPopulation(object):
 
         for index in range(int(self.population * self.breedingRate)):
             del self.nets[len(self.nets) - 1]
+        self.killed = int(self.population * self.breedingRate)
 
     def nextGen(self):
         """
@@ -442,26 +1014,286 @@ class TTTPopulation(object):
         return fittest
 
 
+class TTTTensorPopulation(TTTPopulation):
+    """
+    Population backend that stores every net as slices of stacked numpy arrays instead of as TTTNeuralNet objects:
+    self.weights holds one (P, neurons, inputs) array and self.biases one (P, neurons) array per layer, and
+    self.fitness holds the fitness of each net. Sorting, cutting, breeding and mutating are done as array operations
+    and self.nets hands out TTTNetView objects.
+    """
+
+    SHAPES = ((10, 10), (9, 10), (9, 9))  # (neurons, inputs) of the input, hidden and output layers
+    WEIGHTSRANGE = (-1, 1)
+    BIASRANGE = (-7.5, 7.5)
+    breedChances = (0.05,  # 5% chance of a whole layer being swapped
+                    0.525)  # 47.5% chance of a neuron being swapped, otherwise a single weight is swapped
+    revision = 0  # bumped whenever the nets change or move, see TTTNetView.version
+
+    @property
+    def nets(self):
+        """
+        List of TTTNetView objects, one for each net in the population.
+        """
+
+        return [TTTNetView(self, index) for index in range(len(self.fitness))]
+
+    @nets.setter
+    def nets(self, nets):
+        """
+        Replaces the population with the weights and fitness of the given nets.
+        """
+
+        arrays = [net.getArrays() for net in nets]
+        self.weights = [np.array([a[0][layer] for a in arrays]).reshape((len(nets), ) + shape)
+                        for layer, shape in enumerate(self.SHAPES)]
+        self.biases = [np.array([a[1][layer] for a in arrays]).reshape((len(nets), shape[0]))
+                       for layer, shape in enumerate(self.SHAPES)]
+        self.fitness = np.array([net.fitness for net in nets], dtype=float)
+        self.revision += 1
+
+    def snapshot(self):
+        """
+        Returns a copy of the population that training can't change, for TTTrainer.checkpoint
+        """
+
+        population = copy.copy(self)
+        population.rng = copy.deepcopy(self.rng)
+        population.weights = [np.array(w) for w in self.weights]
+        population.biases = [np.array(b) for b in self.biases]
+        population.fitness = self.fitness.copy()
+        return population
+
+    def __len__(self):
+        """
+        Returns the number of nets currently in the population
+        """
+
+        return len(self.fitness)
+
+    def getTensors(self):
+        """
+        Returns the population's arrays, ([weights, ...], [biases, ...])
+        """
+
+        return self.weights, self.biases
+
+    def addFitness(self, fitness):
+        """
+        Adds each value in fitness to the fitness of the net at the same index
+        """
+
+        self.fitness += fitness
+
+    @classmethod
+    def loadBinary(cls, file_path):
+        """
+        Returns a population holding the nets saved in file_path by exportBinary. The population's arrays are mapped
+        straight from the file (copy on write), so nothing is read until it is used and changes stay in memory.
+        """
+
+        weights, biases, fitness = netfile.read(file_path)
+        population = cls(0)
+        population.population = len(fitness)
+        population.weights, population.biases, population.fitness = weights, biases, fitness
+        return population
+
+    def createNeuralNets(self):
+        """
+        Fills the population's arrays with random weights and biases.
+        """
+
+        rng = _random(self.rng)
+        self.weights = [np.round(rng.uniform(*self.WEIGHTSRANGE, size=(self.population, ) + shape), 3)
+                        for shape in self.SHAPES]
+        self.biases = [rng.uniform(*self.BIASRANGE, size=(self.population, shape[0])) for shape in self.SHAPES]
+        self.fitness = np.zeros(self.population)
+
+    def _take(self, indices):
+        """
+        Keeps only the nets found at indices, in that order.
+        """
+
+        self.weights = [w[indices] for w in self.weights]
+        self.biases = [b[indices] for b in self.biases]
+        self.fitness = self.fitness[indices]
+        self.revision += 1  # views now point at different nets
+
+    def sort(self, reverse=True):
+        """
+        Sorts the population based on fitness score highest to lowest. Nets with the same fitness keep their order, like
+        they do in TTTPopulation.sort.
+        :param reverse: if False, will sort then nets in ascending order.
+        """
+
+        self._take(np.argsort(-self.fitness if reverse else self.fitness, kind='mergesort'))
+
+    def randomize(self):
+        """
+        Moves the neural networks into random positions
+        """
+
+        rng = _random(self.rng)
+        self._take(rng.permutation(len(self)))
+
+    def _mutateNets(self, indices):
+        """
+        Mutates the nets found at indices the same way TTTNeuralNet.mutate does: a random weight of a random neuron in
+        the input or hidden layer (never the output layer) is replaced, scaled, shifted, flipped or swapped with another
+        weight. There is a 50% chance of the bias being changed the same way. One time in six the neuron is left as it
+        was, since TTTNeuron.mutate throws away the weights it generates to re-create the neuron. The random numbers are
+        drawn for all of the nets at once, so the nets aren't mutated the same way as a TTTPopulation with the same
+        seed would mutate them.
+        :param indices: numpy array of distinct indices of nets to mutate
+        """
+
+        rng = _random(self.rng)
+        layers = rng.randint(0, 2, size=len(indices))
+        for layer, (numNeurons, numInputs) in enumerate(self.SHAPES[:2]):
+            nets = indices[layers == layer]
+            count = len(nets)
+            weights, biases = self.weights[layer], self.biases[layer]
+            neurons = rng.randint(0, numNeurons, size=count)
+            inputs = rng.randint(0, numInputs, size=count)
+            tasks = rng.randint(0, 6, size=count)
+            withBias = rng.random_sample(count) < 0.5
+
+            task = tasks == 0  # replace weight with random value
+            weights[nets[task], neurons[task], inputs[task]] = rng.uniform(*self.WEIGHTSRANGE, size=task.sum())
+            bias = task & withBias
+            biases[nets[bias], neurons[bias]] = rng.uniform(*self.BIASRANGE, size=bias.sum())
+
+            task = tasks == 1  # multiple by a random value between 0.5 and 1.5
+            weights[nets[task], neurons[task], inputs[task]] *= rng.uniform(0.5, 1.5, size=task.sum())
+            bias = task & withBias
+            biases[nets[bias], neurons[bias]] *= rng.uniform(0.5, 1.5, size=bias.sum())
+
+            task = tasks == 2  # add or subtract a random value between -1 and 1
+            weights[nets[task], neurons[task], inputs[task]] += rng.uniform(-1, 1, size=task.sum())
+            bias = task & withBias
+            biases[nets[bias], neurons[bias]] += rng.uniform(-1, 1, size=bias.sum())
+
+            task = tasks == 3  # change the polarity
+            weights[nets[task], neurons[task], inputs[task]] *= -1.0
+            bias = task & withBias
+            biases[nets[bias], neurons[bias]] *= -1.0
+
+            # tasks == 4 would re-create the neuron, which leaves it unchanged in TTTNeuron.mutate
+
+            task = tasks == 5  # swap two of the weights
+            others = (inputs[task] + rng.randint(1, numInputs, size=task.sum())) % numInputs
+            swapped = weights[nets[task], neurons[task], inputs[task]]
+            weights[nets[task], neurons[task], inputs[task]] = weights[nets[task], neurons[task], others]
+            weights[nets[task], neurons[task], others] = swapped
+
+        self.revision += 1
+
+    def _mutate(self):
+        """
+        Mutates (self.mutationRate)% of the population
+        """
+
+        rng = _random(self.rng)
+        count = int(self.population * self.mutationRate)
+        indices = rng.permutation(min(self.population, len(self)))[:count]
+        self._mutateNets(indices)
+        self.mutated = len(indices)
+
+    def _breed(self):
+        """
+        Breeds the top (self.breedingRate)% of the population in pairs. Each pair adds two children to the end of the
+        population that are copies of the parents with either a whole layer (5%), a neuron (47.5%) or a single weight
+        (47.5%) swapped between them. Expects the neural networks to be sorted in descending order based on fitness
+        """
+
+        rng = _random(self.rng)
+        parents = np.arange(0, int(self.population * self.breedingRate), 2)
+        self.bred = len(parents) * 2
+        if len(parents) == 0:
+            return
+
+        children = [[w[parents].copy() for w in self.weights], [b[parents].copy() for b in self.biases]], \
+                   [[w[parents + 1].copy() for w in self.weights], [b[parents + 1].copy() for b in self.biases]]
+        tasks = rng.uniform(0, 1, size=len(parents))
+        layers = rng.randint(0, len(self.SHAPES), size=len(parents))
+
+        for layer, (numNeurons, numInputs) in enumerate(self.SHAPES):
+            (weights1, biases1), (weights2, biases2) = [[c[0][layer], c[1][layer]] for c in children]
+            inLayer = layers == layer
+
+            pairs = np.nonzero(inLayer & (tasks <= self.breedChances[0]))[0]  # whole layer
+            weights1[pairs], weights2[pairs] = weights2[pairs], weights1[pairs]
+            biases1[pairs], biases2[pairs] = biases2[pairs], biases1[pairs]
+
+            pairs = np.nonzero(inLayer & (tasks > self.breedChances[0]) & (tasks <= self.breedChances[1]))[0]
+            neurons = rng.randint(0, numNeurons, size=len(pairs))  # single neuron
+            weights1[pairs, neurons], weights2[pairs, neurons] = weights2[pairs, neurons], weights1[pairs, neurons]
+            biases1[pairs, neurons], biases2[pairs, neurons] = biases2[pairs, neurons], biases1[pairs, neurons]
+
+            pairs = np.nonzero(inLayer & (tasks > self.breedChances[1]))[0]
+            neurons = rng.randint(0, numNeurons, size=len(pairs))  # single weight
+            inputs = rng.randint(0, numInputs, size=len(pairs))
+            weights1[pairs, neurons, inputs], weights2[pairs, neurons, inputs] = \
+                weights2[pairs, neurons, inputs], weights1[pairs, neurons, inputs]
+
+        self.weights = [np.concatenate([w, c1, c2]) for w, c1, c2 in zip(self.weights, children[0][0],
+                                                                        children[1][0])]
+        self.biases = [np.concatenate([b, c1, c2]) for b, c1, c2 in zip(self.biases, children[0][1],
+                                                                       children[1][1])]
+        self.fitness = np.concatenate([self.fitness, np.zeros(len(parents) * 2)])
+        self.revision += 1
+
+    def _cut(self):
+        """
+        Kills the lower (self.killingRate)%. Expects the neural networks to be sorted into descending order based on
+        fitness
+        :return: None
+        """
+
+        size = len(self)
+        self._take(slice(0, len(self) - int(self.population * self.breedingRate)))
+        self.killed = size - len(self)
+
+    def nextGen(self):
+        """
+        Calls sort, _cut, _breed, and _mutate and then returns a standalone copy of the neural net with the highest
+        fitness
+        """
+
+        self.sort()
+        fittest = TTTNetView(self, 0).copy()
+        self._cut()
+        self._breed()
+        self._mutate()
+        self.fitness[:] = 0
+        return fittest
+
+
 def calcFitness(nn1, nn2):
     """
     Calculates the fitness of nn1 and nn2 by placing them against each other in a game of tic-tac-toe. Each
     neural network will have a chance to go first
     :param nn1: Neural network 1
-    :param nn2: Neural network 2
-    :return: The fitness scores for each neural network [fitness1, fitness2]
+    :param nn2: Neural network 2. Either one can also be an opponent with the same getMove method, such as
+    solver.TTTMinimax, that returns None to end the game once it is over
+    :return: The fitness each neural network gained (or lost) during the game [fitness1, fitness2]
     """
 
+    startFitness = [nn1.fitness, nn2.fitness]
     gameOver = False
     overlapCounter = 0  # if 2
     turn = 0  # 0 for x, 1 for o
     players = [nn1, nn2]
-    board = TTTBoard()
+    board = TTTBitBoard()
 
     while not gameOver and overlapCounter < 2:
         endTurn = False  # this will allow for the 'turn checker' to end turns, yet keep the turns cycling
         while not endTurn:
 
-            move = board.translateNumToPos(players[turn].getMove(turn, board.sBoard))
+            move = players[turn].getMove(turn, board)
+            if move is None:  # opponents like solver.TTTMinimax have no move to make once the game is over
+                gameOver = True
+                break
+            move = board.translateNumToPos(move)
 
             # check if move was valid, if not end turn, deduct points and add 1 to overlap counter
             if not board.isValidMove(move):
@@ -487,116 +1319,576 @@ def calcFitness(nn1, nn2):
                 players[int(not turn)].fitness += TIEGAME
                 gameOver = True
 
+    return [nn1.fitness - startFitness[0], nn2.fitness - startFitness[1]]
+
+
+def _writeAtomically(path, data):
+    """
+    Writes data to a temporary file next to path, flushes it to the disk and then renames it to path.
+    """
+
+    temporaryPath = path + '.tmp'
+    with open(temporaryPath, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    if os.name == 'nt' and os.path.exists(path):
+        os.remove(path)  # os.rename can't replace files on windows
+    os.rename(temporaryPath, path)
+    logging.debug("Checkpoint written to {}".format(path))
+
+
+def _writeCheckpoint(path, checkpoint):
+    """
+    Pickles checkpoint and writes it to path with _writeAtomically. Runs in TTTrainer's checkpoint writer thread.
+    """
+
+    _writeAtomically(path, pickle.dumps(checkpoint, 2))
+
+
+def _snapshot(value):
+    """
+    Returns a copy of value that the training run can't change while it is pickled in the checkpoint writer thread.
+    Objects that can be copied more cheaply than with copy.deepcopy have a snapshot method.
+    """
+
+    if hasattr(value, 'snapshot'):
+        return value.snapshot()
+    if isinstance(value, list):
+        return [_snapshot(item) for item in value]
+    return copy.deepcopy(value)
+
+
+def cacheCounts(nets):
+    """
+    Returns the move cache hits and misses of nets, (hits, misses). Nets found more than once are only counted once.
+    """
+
+    nets = dict((id(net), net) for net in nets).values()
+    return sum(net.cacheHits for net in nets), sum(net.cacheMisses for net in nets)
+
 
-def worker(queue):
+def cachingNets(population, moveCacheSize):
     """
-    Multiprocessing worker class that will take in a queue of nets and match them together
+    Returns the nets of population with their move cache size set to moveCacheSize and its counters reset
     """
 
+    nets = population.nets
+    for net in nets:
+        net.moveCacheSize = moveCacheSize
+        net.cacheHits = net.cacheMisses = 0
+    return nets
+
+
+def logCacheStats(hits, misses):
+    """
+    Logs how many of the moves made were found in the move caches of the nets, see cacheCounts
+    """
+
+    lookups = hits + misses
+    logging.info("Move cache hit rate: {:.1%} ({} of {} moves)".format(hits / float(max(lookups, 1)), hits, lookups))
+
+
+def worker(queue, results, seed=None, index=0, profilePrefix=None):
+    """
+    Multiprocessing worker class that will take chunks (lists of [index1, index2, net1, net2] items) from a queue
+    shared with the other workers and match the nets together until it gets None. The nets are copies, so the fitness
+    they earned is put into results as one array with a row of [index1, index2, fitness1, fitness2] for each game,
+    along with index, the number of forward passes made by the nets, the seconds spent playing and the move cache
+    (hits, misses) of the nets (see cacheCounts). seed and index are passed to seedWorker. If profilePrefix is given,
+    the worker is profiled and its stats are saved under it, see profiling.TTTProfiler.
+    """
+
+    profiler = profiling.TTTProfiler(profilePrefix) if profilePrefix is not None else None
+    if profiler is not None:
+        profiler.start()
+    seedWorker(seed, index)
     logging.info("Worker starting")
-    total = 0
-    while True:
-        try:
-            calcFitness(*queue.get(True, 0.1))
-            total += 1
-        except:  # queue is empty, raises error
-            break
-    logging.info("Worker ending, {} games played".format(total))
+    games = []
+    passes = TTTNeuralNet.forwardPasses
+    busy = 0.0
+    hits = misses = 0
+    for chunk in iter(queue.get, None):
+        start = time.time()
+        for index1, index2, net1, net2 in chunk:
+            with profiling.timed('calcFitness'):
+                games.append([index1, index2] + calcFitness(net1, net2))
+        busy += time.time() - start
+        # each chunk is unpickled into its own copies of the nets
+        chunkHits, chunkMisses = cacheCounts([net for game in chunk for net in game[2:]])
+        hits += chunkHits
+        misses += chunkMisses
+    results.put((index, np.array(games, dtype=float).reshape(-1, 4), TTTNeuralNet.forwardPasses - passes, busy,
+                 (hits, misses)))
+    if profiler is not None:
+        profiler.stop()
+    logging.info("Worker ending, {} games played".format(len(games)))
 
 
 class TTTrainer(object):
     """
     Trains two populations. Logging module must be imported or the global variable logging must be accounted for.
+
+    If checkpointPath is set, the whole state of the training run (both populations, the generation counters, the
+    best nets and numpy's random state) is saved there every checkpointInterval generations and once training ends.
+    TTTrainer.resume carries on from a checkpoint exactly as if the run had never stopped.
     """
 
-    def __init__(self, population):
+    # attributes saved in checkpoints
+    CHECKPOINTED = ('numPopulation', 'populations', 'backend', 'opponent', 'moveCache', 'genSameMax', 'genStop',
+                    'generation', 'gensSame', 'previousFitness', 'highest', 'checkpointPath', 'checkpointInterval',
+                    'seed', 'rng', 'matchmaker', 'gameCache', 'numWorkers', 'logLevel', 'queueLogging',
+                    'metricsPath', 'profilePath', 'profileInterval', 'chunkSize')
+    CHECKPOINT_VERSION = 11
+    # names of the evaluation backends (see backends.makeBackend), and those that play the games in workers (processes
+    # or threads, see numWorkers and chunkSize)
+    EVALUATIONS = ('queue', 'serial', 'lockstep', 'pool', 'shared', 'thread')
+    WORKER_EVALUATIONS = ('queue', 'pool', 'shared', 'thread')
+
+    def __init__(self, population, tensor=False, evaluation='queue', opponent=None, moveCache=0,
+                 checkpointPath=None, checkpointInterval=10, seed=None, matchmaker=None, gameCache=False,
+                 numWorkers=None, logLevel=logging.INFO, queueLogging=False, metricsPath=None, profilePath=None,
+                 profileInterval=1, chunkSize=None):
         """
         Create the training object
         :param population: amount of neural networks to create
+        :param tensor: If True, the populations will be TTTTensorPopulation objects instead of TTTPopulation objects
+        :param evaluation: How the games of a generation are played, a backends.TTTEvaluationBackend or the name of
+        one (see EVALUATIONS). 'queue' plays each game with calcFitness in worker processes, 'serial' plays each game
+        with calcFitness in this process, 'lockstep' plays all of them at once in this process with
+        matches.playLockstep and 'pool' splits them between the processes of a workers.TTTWorkerPool that lives for
+        the whole training run. 'shared' does the same with a workers.TTTSharedPool, which keeps the populations in
+        shared memory, and 'thread' with the threads of a workers.TTTThreadPool, which play in this process and only
+        run at the same time inside numpy. Backends made from a name are given numWorkers, chunkSize, moveCache and
+        the seed, a backend passed in keeps its own settings
+        :param opponent: Fixed strength opponent (such as a solver.TTTMinimax) that every net also plays each
+        generation, once going first and once going second. Must have the same getMove method as TTTNeuralNet and a
+        fitness attribute
+        :param moveCache: Size of the move cache each net is given for the games played with calcFitness ('queue' and
+        'serial' evaluation and the games against the opponent), see TTTNeuralNet. 0 turns it off
+        :param checkpointPath: File to save checkpoints to. If None, no checkpoints are saved
+        :param checkpointInterval: Number of generations between checkpoints
+        :param seed: If given, each population draws from its own random stream made from the seed (see randomStream)
+        instead of numpy's global random state, and every worker process gets a stream of its own. Games don't use any
+        random numbers, so runs with the same seed give the same generations no matter how (or by how many workers)
+        the games are played
+        :param matchmaker: Strategy that decides which nets play each other every generation, see
+        matches.TTTMatchmaker. Defaults to matches.TTTRoundRobin, which plays every net in one population against
+        every net in the other
+        :param gameCache: If True, the outcome of every game is kept in a matches.TTTGameCache, keyed by the digests
+        of both nets, and games between nets that haven't changed since they last played each other are not played
+        again. Nets that survive a generation without being bred or mutated keep their digests
+        :param numWorkers: Number of worker processes (or threads) used by the WORKER_EVALUATIONS evaluation methods.
+        Defaults to one for each cpu
+        :param chunkSize: Number of games the workers of the WORKER_EVALUATIONS evaluation methods take at a time
+        from the queue they share. Smaller chunks keep the workers evenly busy, larger ones cost less to send.
+        Defaults to workers.CHUNKS_PER_WORKER chunks for each worker, see workers.splitWork
+        :param logLevel: Level the root logger is set to while training, put back once train returns
+        :param queueLogging: If True, everything logged during train (including by worker processes) goes through a
+        queue to a single listener process that writes it, see logs.TTTLogListener
+        :param metricsPath: File to append a record of each generation's metrics to (see trainGeneration), as CSV if
+        the file name ends with .csv and as JSON lines otherwise. If None, the metrics are only kept in lastMetrics
+        :param profilePath: If given, generations are run under cProfile, in this process and in every worker process,
+        and the stats of all of them are merged into <profilePath>.gen<generation>.prof with a text report next to it
+        (see profiling.merge). If None, nothing is profiled
+        :param profileInterval: Number of generations between profiled generations, starting with the first one
         :param xValue: Int value for x to be inputted into the neural networks
         :param oValue: Int value for o to be inputted into the neural networks
         :param emptyValue: Int value for empty spaces to be inputted into the neural networks
         """
 
         self.numPopulation = population
-        self.populations = [TTTPopulation(self.numPopulation), TTTPopulation(self.numPopulation)]
+        self.seed = seed
+        streams = [None, None]
+        self.rng = None
+        if seed is not None:
+            streams = [randomStream(seed, 'population', index) for index in range(2)]
+            self.rng = randomStream(seed, 'trainer')
+        populationClass = TTTTensorPopulation if tensor else TTTPopulation
+        self.populations = [populationClass(self.numPopulation, streams[0]),
+                            populationClass(self.numPopulation, streams[1])]
         self.pop1, self.pop2 = self.populations[:]
+        self.opponent = opponent
+        self.moveCache = moveCache
+        self.matchmaker = matchmaker if matchmaker is not None else matches.TTTRoundRobin()
+        self.gameCache = matches.TTTGameCache() if gameCache else None
+        self.numWorkers = numWorkers if numWorkers is not None else mp.cpu_count()
+        self.chunkSize = chunkSize
+        if isinstance(evaluation, backends.TTTEvaluationBackend):
+            self.backend = evaluation
+        elif evaluation in self.EVALUATIONS:
+            self.backend = backends.makeBackend(evaluation, self.numWorkers, seed, chunkSize, moveCache)
+        else:
+            raise ValueError("Unknown evaluation method: {}".format(evaluation))
+        self.logLevel = logLevel
+        self.queueLogging = queueLogging
+        self.metricsPath = metricsPath
+        self.profilePath = profilePath
+        self.profileInterval = profileInterval
         # if the top fitness score hasn't changed in self.genSameMax generations, the testing is stopped
         self.genSameMax = 200
         # testing stops after genStop many generations has been reached
         self.genStop = 250
 
+        self.generation = 1
+        self.gensSame = 0
+        self.previousFitness = TTTNeuralNet(fitness=-500, rng=self.rng)
+        self.highest = None
+        self.checkpointPath = checkpointPath
+        self.checkpointInterval = checkpointInterval
+        self._writer = None  # thread writing the last checkpoint
+        self.lastMetrics = None  # metrics of the last generation, see trainGeneration
+
+    @classmethod
+    def loadCheckpoint(cls, path):
+        """
+        Returns a trainer holding the state saved in the checkpoint at path and sets numpy's random state back to what
+        it was when the checkpoint was taken. Call its train method to carry on training.
+        """
+
+        with open(path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        if checkpoint.get('version') != cls.CHECKPOINT_VERSION:
+            raise ValueError("{} is not a checkpoint this version of TTTrainer can load".format(path))
+
+        trainer = cls.__new__(cls)
+        trainer.__dict__.update(checkpoint['trainer'])
+        trainer.pop1, trainer.pop2 = trainer.populations[:]
+        trainer._writer = None
+        trainer.lastMetrics = None
+        random.set_state(checkpoint['randomState'])
+        logging.info("Loaded checkpoint {} at generation {}".format(path, trainer.generation))
+        return trainer
+
+    @classmethod
+    def resume(cls, path):
+        """
+        Carries on the training run saved in the checkpoint at path and returns the net with the highest fitness score,
+        like train.
+        """
+
+        return cls.loadCheckpoint(path).train()
+
+    @property
+    def evaluation(self):
+        """
+        Name of the trainer's evaluation backend
+        """
+
+        return str(self.backend)
+
+    def checkpoint(self):
+        """
+        Saves the state of the training run to self.checkpointPath. The state is copied right away (see _snapshot),
+        but pickling and writing it is left to a background thread so that the next generation doesn't have to wait
+        for either. Nets are copied as arrays instead of as neurons (see TTTNeuralNet.snapshot), so the copy is cheap:
+        about 5 ms for two populations of 200 nets against a TTTMinimax opponent, and about 70 ms for two tensor
+        populations of 1000 nets with a game cache, most of it spent copying the cache (pickling took 0.7 s and 26 s).
+        The writer thread still holds the GIL while it pickles, so training runs slower until it is done. The file is
+        written next to the old checkpoint and then renamed over it, so a crash never leaves a half written
+        checkpoint behind.
+        """
+
+        state = dict((name, _snapshot(getattr(self, name))) for name in self.CHECKPOINTED)
+        checkpoint = {'version': self.CHECKPOINT_VERSION, 'trainer': state, 'randomState': random.get_state()}
+        self.waitForCheckpoint()
+        self._writer = threading.Thread(target=_writeCheckpoint, args=(self.checkpointPath, checkpoint))
+        self._writer.start()
+
+    def waitForCheckpoint(self):
+        """
+        Blocks until the last checkpoint has been written
+        """
+
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def _addFitness(self, pairs, deltas):
+        """
+        Adds the fitness changes of the games played between pairs to the nets of both populations
+        :return: (pairs, deltas)
+        """
+
+        fitness1, fitness2 = matches.reduceFitness(pairs, deltas, len(self.pop1), len(self.pop2))
+        self.pop1.addFitness(fitness1)
+        self.pop2.addFitness(fitness2)
+        return pairs, deltas
+
+    def _evaluateOpponent(self):
+        """
+        Plays every net in both populations against self.opponent with calcFitness, once going first and once going
+        second. The opponent's fitness is reset first, so afterwards it holds what it scored this generation.
+        """
+
+        self.opponent.fitness = 0
+        nets = []
+        for population in self.populations:
+            nets.extend(cachingNets(population, self.moveCache))
+        for net in nets:
+            with profiling.timed('calcFitness'):
+                calcFitness(net, self.opponent)
+                calcFitness(self.opponent, net)
+        if self.moveCache:
+            logCacheStats(*cacheCounts(nets))
+
+    def sizes(self):
+        """
+        Returns the number of nets in each population, (size1, size2). Part of the arena used by matchmakers.
+        """
+
+        return len(self.pop1), len(self.pop2)
+
+    def playPairs(self, pairs=None):
+        """
+        Plays the pairs of nets with the trainer's evaluation backend (opening it first if it isn't open, see openPool)
+        and adds the results to their fitness. Part of the arena used by matchmakers, see matches.TTTMatchmaker.
+        :param pairs: (M, 2) array of the indices of the nets in self.pop1 and self.pop2 that should play each other.
+        Defaults to every net in self.pop1 against every net in self.pop2
+        :return: Fitness gained by the nets of each population, (fitness1, fitness2)
+        """
+
+        self.openPool()
+        if self.gameCache is None:
+            return self.backend.playFitness(pairs)
+        pairs, deltas = self._evaluateCached(pairs)
+        return matches.reduceFitness(pairs, deltas, len(self.pop1), len(self.pop2))
+
+    def _evaluateCached(self, pairs=None):
+        """
+        Looks the pairs up in self.gameCache, adds the fitness of the games found there to the nets and only plays the
+        rest, which are then added to the cache. Games are deterministic, so a pair of nets that hasn't changed since
+        it last played always plays the same game.
+        :return: (pairs, deltas), see backends.TTTEvaluationBackend.play
+        """
+
+        if pairs is None:
+            pairs = matches.allPairs(len(self.pop1), len(self.pop2))
+        digests1, digests2 = [matches.netDigests(population.getTensors()) for population in self.populations]
+        keys = [(digests1[index1], digests2[index2]) for index1, index2 in pairs]
+        deltas, found = self.gameCache.lookup(keys)
+        self._addFitness(pairs[found], deltas[found])
+
+        played, playedDeltas = pairs[:0], deltas[:0]
+        if not found.all():
+            played, playedDeltas = self.backend.play(pairs[~found])
+        self.gameCache.store([(digests1[index1], digests2[index2]) for index1, index2 in played], playedDeltas)
+        logging.info("Played {} games, {} more were found in the game cache".format(len(played), found.sum()))
+        return np.concatenate([pairs[found], played]), np.concatenate([deltas[found], playedDeltas])
+
+    def playAll(self):
+        """
+        Plays every net in self.pop1 against every net in self.pop2, see playPairs
+        """
+
+        return self.playPairs()
+
+    def playAgainst(self, tensors):
+        """
+        Plays every net in both populations against every net in tensors with the lockstep engine in this process, once
+        going first and once going second, and adds the fitness they earn to them. Part of the arena used by
+        matchmakers.
+        :param tensors: (weights, biases) of the nets to play against, see TTTPopulation.getTensors
+        :return: Fitness gained by the nets of each population, (fitness1, fitness2)
+        """
+
+        others = len(tensors[1][0])
+        gains = []
+        for population in self.populations:
+            size = len(population)
+            ownTensors = population.getTensors()
+            first = matches.allPairs(size, others)
+            second = matches.allPairs(others, size)
+            gained = matches.reduceFitness(first, matches.playLockstep(ownTensors, tensors, first), size, others)[0]
+            gained += matches.reduceFitness(second, matches.playLockstep(tensors, ownTensors, second), others,
+                                            size)[1]
+            population.addFitness(gained)
+            gains.append(gained)
+        return gains
+
+    def openPool(self):
+        """
+        Opens the evaluation backend with both populations, which starts the worker pool of the 'pool', 'shared' and
+        'thread' evaluation methods. Called by train (and by playPairs if the backend isn't open yet), so it only needs
+        to be called directly to start the pool before calling trainGeneration without train. closePool should then be
+        called once done.
+        """
+
+        if not self.backend.isOpen():
+            self.backend.open(self.pop1, self.pop2)
+
+    def closePool(self):
+        """
+        Closes the evaluation backend, stopping its worker pool if it has one
+        """
+
+        if self.backend.isOpen():
+            self.backend.close()
+
+    def _forwardPasses(self):
+        """
+        Returns the number of forward passes made so far by the nets of this process and by the trainer's workers
+        """
+
+        return TTTNeuralNet.forwardPasses + self.backend.forwardPasses()
+
+    def trainGeneration(self):
+        """
+        Plays, scores and breeds one generation of both populations and returns the net with the highest fitness score
+        of the generation. The evaluation backend is opened if it isn't open yet, see openPool.
+
+        The generation's metrics are kept in self.lastMetrics (and appended to self.metricsPath if it is set): the
+        seconds spent on the whole generation, on playing games and on nextGen, the number of games played, games per
+        second (overall and per worker), forward passes made by the nets, the size and min/mean/max fitness of each
+        population before breeding and the number of nets nextGen killed, bred and mutated in each population. The
+        backends that play in workers (see backends.TTTEvaluationBackend.inWorkers) also record the games each worker
+        played and its utilization,
+        the share of the time spent waiting for the workers that it spent playing (and the mean over the workers).
+
+        If self.profilePath is set, every self.profileInterval-th generation is profiled, see TTTrainer.
+        """
+
+        generation = self.generation
+        if self.profilePath is None or (generation - 1) % self.profileInterval != 0:
+            return self._trainGeneration()
+
+        prefix = '{}.gen{}'.format(self.profilePath, generation)
+        logging.info("Profiling generation {}".format(generation))
+        self.backend.profile(prefix)
+        profiler = profiling.TTTProfiler(prefix)
+        profiler.start()
+        try:
+            return self._trainGeneration()
+        finally:
+            profiler.stop()
+            self.backend.profile(None)  # saves the workers' stats
+            profiling.merge(prefix)
+            logging.info("Profile of generation {} saved to {}.prof, report in {}.txt".format(generation, prefix,
+                                                                                               prefix))
+
+    def _trainGeneration(self):
+        """
+        Runs a generation for trainGeneration
+        """
+
+        start = time.time()
+        logging.info("Starting generation {}".format(self.generation))
+
+        logging.info("Randomizing populations")
+        self.pop1.randomize()
+        self.pop2.randomize()
+
+        logging.info("Matching neural networks together with {}".format(self.matchmaker))
+        evaluationStart = time.time()
+        passes = self._forwardPasses()
+        workerStats = self.backend.workerStats()
+        games = self.matchmaker.play(self, _random(self.rng))
+        logging.info("{} games played ({} in total)".format(games, self.matchmaker.gamesPlayed))
+        if self.opponent is not None:
+            logging.info("Matching neural networks against {}".format(self.opponent))
+            self._evaluateOpponent()
+            games += len(self.pop1) * 2 + len(self.pop2) * 2
+        passes = self._forwardPasses() - passes
+        busyTime, gamesPlayed, playTime = [now - before for now, before in zip(self.backend.workerStats(), workerStats)]
+        evaluationTime = time.time() - evaluationStart
+        fitness = [np.array([net.fitness for net in population.nets], dtype=float) for population in self.populations]
+
+        logging.info("Fitness calculations complete. Ending generation.")
+        nextGenStart = time.time()
+        with profiling.timed('nextGen'):
+            fittest1 = self.pop1.nextGen()  # pcmr
+            fittest2 = self.pop2.nextGen()
+        nextGenTime = time.time() - nextGenStart
+
+        self.highest = fittest1 if fittest1.fitness > fittest2.fitness else fittest2
+        self.matchmaker.endGeneration(self.highest)
+        if self.gameCache is not None:
+            self.gameCache.prune(*[matches.netDigests(population.getTensors()) for population in self.populations])
+        logging.info("Highest fitness of the generation: {}".format(self.highest))
+        if self.highest.fitness == self.previousFitness.fitness:
+            self.gensSame += 1
+            logging.info("Fitness score is the same and now has been for {} generations".format(self.gensSame))
+            self.previousFitness = self.highest.copy()
+        else:
+            logging.info("Fittest score has changed from {} to {}.".format(self.previousFitness, self.highest))
+            self.previousFitness = self.highest.copy()
+            self.gensSame = 0
+
+        numWorkers = self.backend.numWorkers if self.backend.inWorkers else 1
+        gamesPerSecond = games / max(evaluationTime, 1e-9)
+        record = OrderedDict([('generation', self.generation), ('time', time.time()),
+                              ('wallTime', time.time() - start), ('evaluationTime', evaluationTime),
+                              ('nextGenTime', nextGenTime), ('games', games), ('gamesPerSecond', gamesPerSecond),
+                              ('workers', numWorkers), ('gamesPerSecondPerWorker', gamesPerSecond / numWorkers),
+                              ('forwardPasses', passes), ('highest', float(self.highest.fitness))])
+        for number, (population, scores) in enumerate(zip(self.populations, fitness), 1):
+            record['population{}'.format(number)] = len(scores)
+            for name, function in [('Min', np.min), ('Mean', np.mean), ('Max', np.max)]:
+                record['fitness{}{}'.format(number, name)] = float(function(scores)) if len(scores) else None
+            for name in ['killed', 'bred', 'mutated']:
+                record['{}{}'.format(name, number)] = getattr(population, name)
+        if self.backend.inWorkers:
+            # share of the time spent waiting for the workers that each of them spent playing
+            utilization = busyTime / max(playTime, 1e-9)
+            record['utilization'] = float(utilization.mean())
+            for number, (busy, played) in enumerate(zip(utilization, gamesPlayed), 1):
+                record['worker{}Utilization'.format(number)] = float(busy)
+                record['worker{}Games'.format(number)] = int(played)
+            logging.info("Worker utilization: {} (games played: {})".format(
+                ' '.join('{:.0%}'.format(busy) for busy in utilization), ' '.join(str(n) for n in gamesPlayed)))
+        self.lastMetrics = record
+        if self.metricsPath is not None:
+            metrics.append(self.metricsPath, record)
+        logging.info("Generation took {:.3f}s ({:.3f}s playing {} games, {:.3f}s in nextGen)".format(
+            record['wallTime'], evaluationTime, games, nextGenTime))
+
+        self.generation += 1
+        return self.highest
+
     def train(self):
         """
         Trains the neural networks and returns the one with the highest fitness score.
         """
 
+        rootLogger = logging.getLogger()
+        level = rootLogger.level
+        listener = logs.TTTLogListener(self.logLevel) if self.queueLogging else None
+        if listener is not None:
+            listener.start()
+        else:
+            rootLogger.setLevel(self.logLevel)
+        try:
+            return self._train()
+        finally:
+            if listener is not None:
+                listener.stop()
+            rootLogger.setLevel(level)
+
+    def _train(self):
+        """
+        Runs the generations of train
+        """
+
         logging.info("Starting training")
 
-        generation = 1
-        gensSame = 0
-        previousFitness = TTTNeuralNet(fitness=-500)
-        highest = None
-
-        logging.info("Note: {} workers will be used- 1 for each cpu)".format(mp.cpu_count()))
-        queues = [mp.Queue() for x in range(mp.cpu_count())]
-        # holds indices for self.numPopulation that splits the pop into equal amounts based on how many cpus are
-        # available (exmaple: if 4 cpus are available then it could look like this: [[0, 4], [4, 8], [8, 12], [12, 16]])
-        ranges = []
-        for x in range(mp.cpu_count()):
-            ranges.append([int(self.numPopulation * (x / float(mp.cpu_count()))), int(
-                                self.numPopulation * ((x + 1) / float(mp.cpu_count())))])
-
-        while gensSame < self.genSameMax and generation <= self.genStop:
-            logging.info("Starting generation {}".format(generation))
-
-            logging.info("Randomizing populations")
-            self.pop1.randomize()
-            self.pop2.randomize()
-
-            # matches every single net against one another.
-            logging.info("Matching neural networks together")
-            logging.debug("Filling queues with info")
-            for queue in range(len(queues)):
-                for net1 in self.pop1.nets[ranges[queue][0]:ranges[queue][1]]:
-                    for net2 in self.pop2.nets:
-                        queues[queue].put([net1, net2])
-
-            logging.debug("Starting processes")
-            processes = []
-            for index in range(mp.cpu_count()):
-                process = mp.Process(target=worker, args=(queues[index], ))
-                process.start()
-                processes.append(process)
-
-            logging.debug("Waiting for calculations to complete...")
-            for num, process in enumerate(processes):
-                process.join()  # makes sure each process is finished before moving on
-
-            logging.info("Fitness calculations complete. Ending generation.")
-            fittest1 = self.pop1.nextGen()  # pcmr
-            fittest2 = self.pop2.nextGen()
+        self.openPool()
+        try:
+            while self.gensSame < self.genSameMax and self.generation <= self.genStop:
+                self.trainGeneration()
 
-            highest = fittest1 if fittest1.fitness > fittest2.fitness else fittest2
-            logging.info("Highest fitness of the generation: {}".format(highest))
-            if highest.fitness == previousFitness.fitness:
-                gensSame += 1
-                logging.info("Fitness score is the same and now has been for {} generations".format(gensSame))
-                previousFitness = highest.copy()
-            else:
-                logging.info("Fittest score has changed from {} to {}.".format(previousFitness, highest))
-                previousFitness = highest.copy()
-                gensSame = 0
-            generation += 1
+                if self.checkpointPath is not None and (self.generation - 1) % self.checkpointInterval == 0:
+                    self.checkpoint()
+
+            if self.checkpointPath is not None:
+                self.checkpoint()
+        finally:
+            self.closePool()
+            self.waitForCheckpoint()
 
-        if generation >= self.genStop:
+        if self.generation >= self.genStop:
             logging.info("Training has completed because the number of generations has exceeded the max")
         else:
             logging.info("Training has completed because the highest fitness score hasn't changed in {} "
                          "generations".format(self.genSameMax))
 
-        # close down the queues
-        for queue in queues:
-            queue.close()
-
-        return highest
+        return self.highest
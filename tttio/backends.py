@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+"""
+Module with the evaluation backends TTTrainer plays the games of each generation with. A backend is opened with the
+trainer's two populations when training starts, is asked to play pairs of their nets (as many times per generation as
+the matchmaker wants) and is closed once training ends:
+
+    backend.open(pop1, pop2)
+    pairs, deltas = backend.play(pairs)  # adds the fitness of each game to the nets
+    backend.close()
+
+TTTSerialBackend plays in the trainer's process, one game after another with calcFitness or all at once with the
+lockstep engine. TTTQueueBackend starts new worker processes every time it plays and sends them copies of the nets.
+TTTProcessBackend keeps a workers.TTTWorkerPool or workers.TTTSharedPool running while it is open, and
+TTTThreadBackend a workers.TTTThreadPool. TTTrainer(evaluation=...) takes a backend or one of the names in
+ai.TTTrainer.EVALUATIONS, see makeBackend.
+"""
+
+import logging
+import multiprocessing as mp
+import time
+import numpy as np
+import ai
+import matches
+import profiling
+import workers
+
+
+class TTTEvaluationBackend(object):
+    """
+    Base evaluation backend, which plays in the trainer's process. Subclasses must overwrite play.
+    """
+
+    name = None  # evaluation name TTTrainer reports for the backend
+    inWorkers = False  # True if the games are played by workers, whose utilization the trainer records
+
+    def __init__(self, numWorkers=1, moveCache=0):
+        """
+        Create the backend
+        :param numWorkers: Number of workers (processes or threads) the games are split between
+        :param moveCache: Size of the move cache each net is given for the games played with calcFitness, see
+        ai.TTTNeuralNet. 0 turns it off
+        """
+
+        self.numWorkers = numWorkers
+        self.moveCache = moveCache
+        self.profilePrefix = None  # prefix the workers are profiling under, see profile
+        self.pop1 = self.pop2 = None
+
+    def __str__(self):
+        """
+        Returns the name of the backend
+        """
+
+        return self.name or type(self).__name__
+
+    def __getstate__(self):
+        """
+        Leaves out the populations (and whatever else only lives while the backend is open, see _closedState), so a
+        pickled backend is always closed.
+        """
+
+        return self._closedState(self.__dict__.copy())
+
+    def _closedState(self, state):
+        """
+        Returns state (a copy of the backend's __dict__) with everything that only lives while it is open reset
+        """
+
+        state['pop1'] = state['pop2'] = None
+        return state
+
+    def isOpen(self):
+        """
+        Returns True if open has been called since the backend was made or last closed
+        """
+
+        return self.pop1 is not None
+
+    def open(self, pop1, pop2):
+        """
+        Gets the backend ready to play games between the nets of pop1 and pop2 until close is called.
+        """
+
+        self.pop1, self.pop2 = pop1, pop2
+
+    def play(self, pairs=None):
+        """
+        'Abstract' method that plays the pairs and adds the fitness of each game to the nets. Should be overwritten.
+        :param pairs: (M, 2) array of the indices of the nets in pop1 and pop2 that should play each other. Defaults to
+        every net in pop1 against every net in pop2
+        :return: (pairs, deltas), the pairs that were played (in any order) and an (M, 2) array of the fitness
+        changes of each game, see matches.playLockstep
+        """
+
+        raise NotImplementedError("{} does not implement play".format(type(self).__name__))
+
+    def playFitness(self, pairs=None):
+        """
+        Plays the pairs like play, but only returns the fitness gained by the nets of each population,
+        (fitness1, fitness2). Backends that can add the fitness up without the result of each game overwrite this.
+        """
+
+        pairs, deltas = self.play(pairs)
+        return matches.reduceFitness(pairs, deltas, len(self.pop1), len(self.pop2))
+
+    def profile(self, prefix):
+        """
+        Profiles the workers under prefix from now on (see profiling.TTTProfiler), or stops profiling them and saves
+        their stats if prefix is None. Games played in this process are profiled by the trainer.
+        """
+
+        self.profilePrefix = prefix
+
+    def forwardPasses(self):
+        """
+        Returns the number of forward passes the nets made outside of this process, which TTTNeuralNet.forwardPasses
+        doesn't count
+        """
+
+        return 0
+
+    def workerStats(self):
+        """
+        Returns the seconds each worker spent playing, the games each of them played and the seconds spent waiting for
+        them so far
+        """
+
+        return np.zeros(self.numWorkers), np.zeros(self.numWorkers, dtype=int), 0.0
+
+    def close(self):
+        """
+        Stops whatever the backend started in open
+        """
+
+        self.pop1 = self.pop2 = None
+
+    def _allPairs(self, pairs):
+        """
+        Returns pairs, or every net in pop1 against every net in pop2 if it is None
+        """
+
+        return pairs if pairs is not None else matches.allPairs(len(self.pop1), len(self.pop2))
+
+    def _addFitness(self, pairs, deltas):
+        """
+        Adds the fitness changes of the games played between pairs to the nets of both populations
+        :return: (pairs, deltas)
+        """
+
+        fitness1, fitness2 = matches.reduceFitness(pairs, deltas, len(self.pop1), len(self.pop2))
+        self.pop1.addFitness(fitness1)
+        self.pop2.addFitness(fitness2)
+        return pairs, deltas
+
+    def _logCacheStats(self, hits, misses):
+        """
+        Logs the move cache hit rate if the nets were given a move cache, see ai.logCacheStats
+        """
+
+        if self.moveCache:
+            ai.logCacheStats(hits, misses)
+
+
+class TTTSerialBackend(TTTEvaluationBackend):
+    """
+    Plays every game in the trainer's process, one after another with calcFitness ('serial') or all of them at once
+    with matches.playLockstep ('lockstep').
+    """
+
+    def __init__(self, lockstep=False, moveCache=0):
+        """
+        Create the backend
+        :param lockstep: If True, the games are played with the lockstep engine, which is much faster with
+        ai.TTTTensorPopulation populations
+        :param moveCache: Size of the move cache each net is given for the games played with calcFitness
+        """
+
+        super(TTTSerialBackend, self).__init__(moveCache=moveCache)
+        self.lockstep = lockstep
+
+    @property
+    def name(self):
+        return 'lockstep' if self.lockstep else 'serial'
+
+    def play(self, pairs=None):
+        pairs = self._allPairs(pairs)
+        if self.lockstep:
+            with profiling.timed('playLockstep'):
+                deltas = matches.playLockstep(self.pop1.getTensors(), self.pop2.getTensors(), pairs)
+            logging.debug("{} games played".format(len(pairs)))
+            return self._addFitness(pairs, deltas)
+
+        nets1, nets2 = ai.cachingNets(self.pop1, self.moveCache), ai.cachingNets(self.pop2, self.moveCache)
+        # calcFitness adds the fitness to the nets itself
+        deltas = []
+        for index1, index2 in pairs:
+            with profiling.timed('calcFitness'):
+                deltas.append(ai.calcFitness(nets1[index1], nets2[index2]))
+        self._logCacheStats(*ai.cacheCounts(nets1 + nets2))
+        return pairs, np.array(deltas, dtype=float).reshape(-1, 2)
+
+
+class TTTQueueBackend(TTTEvaluationBackend):
+    """
+    Puts copies of the pairs of nets into a queue every time it plays and starts new worker processes (see ai.worker)
+    that play them out with calcFitness and send back the fitness the copies earned.
+    """
+
+    name = 'queue'
+    inWorkers = True
+
+    def __init__(self, numWorkers=None, seed=None, chunkSize=None, moveCache=0):
+        """
+        Create the backend
+        :param numWorkers: Number of worker processes to start. Defaults to one for each cpu
+        :param seed: Seed to give each worker its own random stream from, see ai.seedWorker
+        :param chunkSize: Number of games the workers take from the queue at a time, see workers.splitWork
+        :param moveCache: Size of the move cache each net is given
+        """
+
+        super(TTTQueueBackend, self).__init__(numWorkers if numWorkers is not None else mp.cpu_count(), moveCache)
+        self.seed = seed
+        self.chunkSize = chunkSize
+        self.passes = 0  # forward passes made by the workers
+        self.busyTime, self.gamesPlayed, self.playTime = super(TTTQueueBackend, self).workerStats()
+
+    def play(self, pairs=None):
+        pairs = self._allPairs(pairs)
+        logging.debug("Note: {} workers will be used".format(self.numWorkers))
+        queue = mp.Queue()
+        # splits the pairs into chunks, which each worker takes from the queue whenever it is done with the last one
+        chunks = workers.splitWork(len(pairs), self.numWorkers, self.chunkSize)
+
+        logging.debug("Filling queue with info")
+        nets1, nets2 = ai.cachingNets(self.pop1, self.moveCache), ai.cachingNets(self.pop2, self.moveCache)
+        with profiling.timed('fillQueues'):
+            for chunk in chunks:
+                queue.put([[index1, index2, nets1[index1], nets2[index2]] for index1, index2 in pairs[chunk]])
+            for x in range(self.numWorkers):
+                queue.put(None)  # tells a worker that there are no more games
+
+        logging.debug("Starting processes")
+        start = time.time()
+        results = mp.Queue()
+        processes = []
+        for index in range(self.numWorkers):
+            process = mp.Process(target=ai.worker, args=(queue, results, self.seed, index, self.profilePrefix))
+            process.start()
+            processes.append(process)
+
+        logging.debug("Waiting for calculations to complete...")
+        # results need to be read before joining, otherwise a worker can block while flushing them
+        workerResults = [results.get() for process in processes]
+        games = np.concatenate([result[1] for result in workerResults])
+        hits = misses = 0
+        for index, workerGames, passes, busy, cached in workerResults:
+            self.passes += passes
+            self.busyTime[index] += busy
+            self.gamesPlayed[index] += len(workerGames)
+            hits += cached[0]
+            misses += cached[1]
+        self._logCacheStats(hits, misses)
+        for num, process in enumerate(processes):
+            process.join()  # makes sure each process is finished before moving on
+        self.playTime += time.time() - start
+        queue.close()
+        results.close()
+
+        return self._addFitness(games[:, :2].astype(int), games[:, 2:])
+
+    def forwardPasses(self):
+        return self.passes
+
+    def workerStats(self):
+        return self.busyTime.copy(), self.gamesPlayed.copy(), self.playTime
+
+
+class _TTTPoolBackend(TTTEvaluationBackend):
+    """
+    Base for the backends that keep a pool from the workers module running while they are open. Subclasses must
+    overwrite _startPool.
+    """
+
+    inWorkers = True
+
+    def __init__(self, numWorkers=None, chunkSize=None):
+        """
+        Create the backend
+        :param numWorkers: Number of workers in the pool. Defaults to one for each cpu
+        :param chunkSize: Number of games the workers take from the shared queue at a time, see workers.splitWork
+        """
+
+        super(_TTTPoolBackend, self).__init__(numWorkers if numWorkers is not None else mp.cpu_count())
+        self.chunkSize = chunkSize
+        self.pool = None
+
+    def _closedState(self, state):
+        state = super(_TTTPoolBackend, self)._closedState(state)
+        state['pool'] = None
+        return state
+
+    def _startPool(self):
+        """
+        'Abstract' method that starts and returns the pool. Should be overwritten.
+        """
+
+        raise NotImplementedError("{} does not implement _startPool".format(type(self).__name__))
+
+    def open(self, pop1, pop2):
+        super(_TTTPoolBackend, self).open(pop1, pop2)
+        if self.pool is None:
+            self.pool = self._startPool()
+            if self.profilePrefix is not None:
+                self.pool.profile(self.profilePrefix)
+
+    def play(self, pairs=None):
+        """
+        Sends the nets that changed since the last call to the pool, has its workers play the pairs and adds the
+        results to the fitness of the nets.
+        """
+
+        sent = self.pool.update(self.pop1.getTensors(), self.pop2.getTensors())
+        logging.debug("Sent {} changed nets to the pool".format(sent))
+        pairs = self._allPairs(pairs)
+        return self._addFitness(pairs, self.pool.play(pairs))
+
+    def profile(self, prefix):
+        super(_TTTPoolBackend, self).profile(prefix)
+        if self.pool is not None:
+            self.pool.profile(prefix)
+
+    def forwardPasses(self):
+        return self.pool.forwardPasses if self.pool is not None else 0
+
+    def workerStats(self):
+        if self.pool is None:
+            return super(_TTTPoolBackend, self).workerStats()
+        return self.pool.busyTime.copy(), self.pool.gamesPlayed.copy(), self.pool.playTime
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        super(_TTTPoolBackend, self).close()
+
+
+class TTTProcessBackend(_TTTPoolBackend):
+    """
+    Plays the games in the processes of a workers.TTTWorkerPool ('pool'), which are only sent the nets that changed,
+    or of a workers.TTTSharedPool ('shared'), which keeps both populations in shared memory. The pool is started by
+    open and lives until close.
+    """
+
+    def __init__(self, numWorkers=None, seed=None, chunkSize=None, shared=False):
+        """
+        Create the backend
+        :param numWorkers: Number of worker processes. Defaults to one for each cpu
+        :param seed: Seed to give each worker its own random stream from, see ai.seedWorker
+        :param chunkSize: Number of games the workers take from the shared queue at a time, see workers.splitWork
+        :param shared: If True, the pool is a workers.TTTSharedPool instead of a workers.TTTWorkerPool
+        """
+
+        super(TTTProcessBackend, self).__init__(numWorkers, chunkSize)
+        self.seed = seed
+        self.shared = shared
+
+    @property
+    def name(self):
+        return 'shared' if self.shared else 'pool'
+
+    def _startPool(self):
+        if self.shared:
+            return workers.TTTSharedPool(max(len(self.pop1), len(self.pop2)) * 2, self.numWorkers, seed=self.seed,
+                                         chunkSize=self.chunkSize)
+        return workers.TTTWorkerPool(self.numWorkers, seed=self.seed, chunkSize=self.chunkSize)
+
+    def play(self, pairs=None):
+        """
+        Plays the pairs like _TTTPoolBackend.play. The shared pool is given a copy of both populations instead and its
+        workers add the fitness they wrote to the shared memory to the nets.
+        """
+
+        if not self.shared:
+            return super(TTTProcessBackend, self).play(pairs)
+        return self._playShared(pairs, True)[:2]
+
+    def playFitness(self, pairs=None):
+        if not self.shared:
+            return super(TTTProcessBackend, self).playFitness(pairs)
+        # the workers already add up the fitness of each net in the shared memory, so the games aren't sent back
+        return self._playShared(pairs, False)[2]
+
+    def _playShared(self, pairs, deltas):
+        """
+        Copies both populations into the shared memory of the pool, has its workers play the pairs and adds the
+        fitness they wrote to the shared memory to the nets.
+        :param deltas: If False, the workers don't send back the fitness changes of each game and None is returned in
+        their place
+        :return: (pairs, deltas, (fitness1, fitness2))
+        """
+
+        self.pool.load(self.pop1.getTensors(), self.pop2.getTensors())
+        deltas = self.pool.play(pairs, deltas)
+        fitness = tuple(self.pool.fitness())
+        self.pop1.addFitness(fitness[0])
+        self.pop2.addFitness(fitness[1])
+        return self._allPairs(pairs), deltas, fitness
+
+
+class TTTThreadBackend(_TTTPoolBackend):
+    """
+    Plays the games in the threads of a workers.TTTThreadPool, started by open and stopped by close.
+    """
+
+    name = 'thread'
+
+    def _startPool(self):
+        return workers.TTTThreadPool(self.numWorkers, chunkSize=self.chunkSize)
+
+
+def makeBackend(name, numWorkers=None, seed=None, chunkSize=None, moveCache=0):
+    """
+    Returns the backend for one of the evaluation names in ai.TTTrainer.EVALUATIONS. numWorkers, seed and chunkSize
+    are only used by the backends that play in workers, and moveCache by the ones that play with calcFitness.
+    """
+
+    if name in ('serial', 'lockstep'):
+        return TTTSerialBackend(name == 'lockstep', moveCache)
+    elif name == 'queue':
+        return TTTQueueBackend(numWorkers, seed, chunkSize, moveCache)
+    elif name in ('pool', 'shared'):
+        return TTTProcessBackend(numWorkers, seed, chunkSize, shared=name == 'shared')
+    elif name == 'thread':
+        return TTTThreadBackend(numWorkers, chunkSize)
+    raise ValueError("Unknown evaluation method: {}".format(name))
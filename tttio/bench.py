@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""
+Module for benchmarking the hot paths of training: TTTNeuron.feed, TTTNeuralNet.getMove, checkForWin and
+checkForBlocks of both board classes, one calcFitness game, one TTTPopulation.nextGen and one TTTrainer generation at
+several population sizes and worker counts. Run it from the command line:
+
+    python -m tttio.bench --output before.json
+    python -m tttio.bench --output after.json --only board calcFitness
+    python -m tttio.bench --compare before.json after.json
+
+Every benchmark is timed repeat times and reports the mean, median (p50) and 99th percentile time of one operation
+along with the number of operations per second. The results are printed and saved as JSON, together with the commit
+and the versions of python and numpy they were measured with, so that runs from different commits can be compared.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from collections import OrderedDict
+import numpy as np
+import ai
+import boards
+
+
+FORMAT_VERSION = 1
+DEFAULT_SIZES = (10, 30)
+DEFAULT_EVALUATIONS = ('lockstep', 'serial', 'queue', 'pool', 'shared', 'thread')
+# evaluation methods that use worker processes or threads, which are benchmarked with every worker count
+WORKER_EVALUATIONS = ai.TTTrainer.WORKER_EVALUATIONS
+
+
+def measure(func, repeat, setup=None):
+    """
+    Times func repeat times.
+    :param func: Function to time. Called with the value returned by setup, or without arguments if setup is None
+    :param setup: Function called (untimed) before each run of func, for benchmarks that change what they run on
+    :return: List of the seconds each run took
+    """
+
+    times = []
+    for x in range(repeat):
+        args = (setup(), ) if setup is not None else ()
+        start = timeit.default_timer()
+        func(*args)
+        times.append(timeit.default_timer() - start)
+    return times
+
+
+def summarize(name, params, times, ops=1):
+    """
+    Returns the result of a benchmark as a dict that can be saved as JSON.
+    :param name: Name of what was timed
+    :param params: Dict of the settings the benchmark was run with
+    :param times: Seconds each run took, see measure
+    :param ops: Number of operations (calls, games, generations) done by each run
+    """
+
+    perOp = np.array(times) / float(ops)
+    return OrderedDict([('name', name), ('params', params), ('runs', len(times)), ('ops', ops),
+                        ('mean', float(perOp.mean())), ('p50', float(np.percentile(perOp, 50))),
+                        ('p99', float(np.percentile(perOp, 99))), ('min', float(perOp.min())),
+                        ('throughput', float(ops / np.mean(times)))])
+
+
+def randomBoards(count, rng, boardClass=boards.TTTBoard):
+    """
+    Returns a list of count (board, lastMove) tuples, each board holding 1-9 random pieces and lastMove being the
+    position of the last one placed
+    """
+
+    result = []
+    for x in range(count):
+        board = boardClass()
+        spaces = rng.permutation(9)[:rng.randint(1, 10)] + 1
+        for number, space in enumerate(spaces):
+            board.setPiece(board.translateNumToPos(space), number % 2)
+        result.append((board, board.translateNumToPos(spaces[-1])))
+    return result
+
+
+def benchNeuron(options, rng):
+    """
+    Times TTTNeuron.feed on random inputs
+    """
+
+    neuron = ai.TTTNeuron(0, rng=rng)
+    inputs = [list(rng.random_sample(neuron.numInputs) * 10) for x in range(options.ops)]
+
+    def run():
+        for inputSet in inputs:
+            neuron.feed(inputSet)
+
+    return [summarize('TTTNeuron.feed', {}, measure(run, options.repeat), len(inputs))]
+
+
+def benchGetMove(options, rng):
+    """
+    Times TTTNeuralNet.getMove on random boards, with the net running in dense mode and neuron by neuron
+    """
+
+    positions = randomBoards(options.ops, rng, boards.TTTBitBoard)
+    results = []
+    for dense in [True, False]:
+        net = ai.TTTNeuralNet(dense=dense, rng=rng)
+
+        def run():
+            for number, (board, lastMove) in enumerate(positions):
+                net.getMove('x' if number % 2 else 'o', board)
+
+        results.append(summarize('TTTNeuralNet.getMove', {'dense': dense}, measure(run, options.repeat),
+                                 len(positions)))
+    return results
+
+
+def benchBoard(options, rng):
+    """
+    Times checkForWin and checkForBlocks of TTTBoard and TTTBitBoard on random boards
+    """
+
+    results = []
+    for boardClass in [boards.TTTBoard, boards.TTTBitBoard]:
+        positions = randomBoards(options.ops, rng, boardClass)
+        for method in ['checkForWin', 'checkForBlocks']:
+            calls = [(getattr(board, method), lastMove) for board, lastMove in positions]
+
+            def run():
+                for call, lastMove in calls:
+                    call(lastMove)
+
+            results.append(summarize('{}.{}'.format(boardClass.__name__, method), {}, measure(run, options.repeat),
+                                     len(calls)))
+    return results
+
+
+def benchCalcFitness(options, rng):
+    """
+    Times single calcFitness games between random nets
+    """
+
+    pairs = [(ai.TTTNeuralNet(rng=rng), ai.TTTNeuralNet(rng=rng)) for x in range(max(options.ops // 100, 1))]
+
+    def run():
+        for net1, net2 in pairs:
+            ai.calcFitness(net1, net2)
+
+    return [summarize('calcFitness', {}, measure(run, options.repeat), len(pairs))]
+
+
+def benchNextGen(options, rng):
+    """
+    Times TTTPopulation.nextGen and TTTTensorPopulation.nextGen at each population size, on populations with random
+    fitness scores
+    """
+
+    results = []
+    for populationClass in [ai.TTTPopulation, ai.TTTTensorPopulation]:
+        for size in options.sizes:
+            population = populationClass(size, rng)
+
+            def setup():
+                copy = populationClass(0, rng)
+                copy.nets = [net.copy() for net in population.nets]
+                copy.addFitness(rng.randint(-300, 300, size))
+                return copy
+
+            results.append(summarize('{}.nextGen'.format(populationClass.__name__), {'population': size},
+                                     measure(lambda copy: copy.nextGen(), options.repeat, setup)))
+    return results
+
+
+def benchGeneration(options, rng):
+    """
+    Times TTTrainer.trainGeneration for each population size and evaluation method, and each worker count for the
+    evaluation methods that use workers. Every run starts from a new trainer made with the same seed, so all
+    of them time the same generation.
+    """
+
+    results = []
+    for size in options.sizes:
+        for evaluation in options.evaluations:
+            tensor = evaluation not in ('serial', 'queue')
+            for numWorkers in (options.workers if evaluation in WORKER_EVALUATIONS else [None]):
+                times = []
+                for run in range(options.generationRepeat):
+                    trainer = ai.TTTrainer(size, tensor=tensor, evaluation=evaluation, seed=options.seed,
+                                           numWorkers=numWorkers)
+                    trainer.openPool()
+                    try:
+                        times.extend(measure(trainer.trainGeneration, 1))
+                    finally:
+                        trainer.closePool()
+
+                params = OrderedDict([('population', size), ('evaluation', evaluation), ('tensor', tensor)])
+                if numWorkers is not None:
+                    params['workers'] = numWorkers
+                results.append(summarize('TTTrainer.trainGeneration', params, times))
+    return results
+
+
+BENCHMARKS = OrderedDict([('neuron', benchNeuron), ('getMove', benchGetMove), ('board', benchBoard),
+                          ('calcFitness', benchCalcFitness), ('nextGen', benchNextGen),
+                          ('generation', benchGeneration)])
+
+
+def _commit():
+    """
+    Returns the git commit the package is checked out at, or None if it isn't in a git repository
+    """
+
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                           stderr=devnull).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    """
+    Runs the benchmarks selected by options (see parseArgs) and returns the report that is saved as JSON
+    """
+
+    results = []
+    for name in options.only:
+        print("Running benchmark {}".format(name))
+        # every benchmark gets its own stream, so the inputs of one don't depend on which others were run
+        results.extend(BENCHMARKS[name](options, ai.randomStream(options.seed, 'bench', name)))
+
+    meta = OrderedDict([('version', FORMAT_VERSION), ('commit', _commit()),
+                        ('time', time.strftime('%Y-%m-%dT%H:%M:%S')), ('python', platform.python_version()),
+                        ('numpy', np.__version__), ('platform', platform.platform()), ('cpus', mp.cpu_count()),
+                        ('repeat', options.repeat), ('seed', options.seed)])
+    return OrderedDict([('meta', meta), ('results', results)])
+
+
+def _label(result):
+    """
+    Returns the name and params of a result as one string, which identifies the same benchmark across reports
+    """
+
+    params = ', '.join('{}={}'.format(key, value) for key, value in sorted(result['params'].items()))
+    return '{}({})'.format(result['name'], params)
+
+
+def formatReport(report):
+    """
+    Returns the results of a report as a table
+    """
+
+    width = max([len('benchmark')] + [len(_label(result)) for result in report['results']])
+    lines = ['{:<{}} {:>11} {:>11} {:>11} {:>12}'.format('benchmark', width, 'mean (us)', 'p50 (us)', 'p99 (us)',
+                                                        'ops/s')]
+    for result in report['results']:
+        lines.append('{:<{}} {:>11.2f} {:>11.2f} {:>11.2f} {:>12.1f}'.format(
+            _label(result), width, result['mean'] * 1e6, result['p50'] * 1e6, result['p99'] * 1e6,
+            result['throughput']))
+    return '\n'.join(lines)
+
+
+def compare(old, new, threshold=1.1):
+    """
+    Compares the mean times of the benchmarks found in both reports.
+    :param threshold: Ratio of new to old mean time above which a benchmark counts as a regression
+    :return: Table of the ratios, and a list of the labels of the benchmarks that regressed
+    """
+
+    oldResults = dict((_label(result), result) for result in old['results'])
+    width = max([len('benchmark')] + [len(_label(result)) for result in new['results']])
+    lines = ['{:<{}} {:>11} {:>11} {:>7}'.format('benchmark', width, 'old (us)', 'new (us)', 'ratio')]
+    regressions = []
+    for result in new['results']:
+        label = _label(result)
+        if label not in oldResults:
+            continue
+        ratio = result['mean'] / oldResults[label]['mean']
+        lines.append('{:<{}} {:>11.2f} {:>11.2f} {:>7.2f}{}'.format(label, width, oldResults[label]['mean'] * 1e6,
+                                                                    result['mean'] * 1e6, ratio,
+                                                                    ' *' if ratio > threshold else ''))
+        if ratio > threshold:
+            regressions.append(label)
+    return '\n'.join(lines), regressions
+
+
+def parseArgs(args=None):
+    """
+    Parses the command line arguments of the benchmark harness
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m tttio.bench', description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=20, help="times each benchmark is run (default: 20)")
+    parser.add_argument('--ops', type=int, default=1000,
+                        help="calls made in each run of the neuron, getMove and board benchmarks, and 100 times the "
+                             "games played in each run of calcFitness (default: 1000)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="population sizes for nextGen and generation (default: 10 30)")
+    parser.add_argument('--evaluations', nargs='+', choices=DEFAULT_EVALUATIONS, default=list(DEFAULT_EVALUATIONS),
+                        help="TTTrainer evaluation methods to time generations with (default: all)")
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted(set([1, mp.cpu_count()])),
+                        help="worker counts for the queue, pool, shared and thread evaluation methods (default: 1 "
+                             "and the number of cpus)")
+    parser.add_argument('--generation-repeat', dest='generationRepeat', type=int, default=3,
+                        help="generations timed for each setting of the generation benchmark (default: 3)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the nets and boards benchmarked (default: 0)")
+    parser.add_argument('--output', '-o', default='bench.json', help="file to save the results to (default: "
+                                                                     "bench.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two saved reports instead of running the benchmarks")
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help="with --compare, ratio of new to old mean time that counts as a regression "
+                             "(default: 1.1)")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """
+    Command line entry point. Returns 1 if --compare found a regression, 0 otherwise
+    """
+
+    options = parseArgs(args)
+
+    if options.compare:
+        reports = []
+        for path in options.compare:
+            with open(path) as f:
+                reports.append(json.load(f))
+        table, regressions = compare(reports[0], reports[1], options.threshold)
+        print(table)
+        if regressions:
+            print("{} benchmark(s) got slower by more than {:.0%}".format(len(regressions), options.threshold - 1))
+            return 1
+        return 0
+
+    rootLogger = logging.getLogger()
+    level = rootLogger.level
+    rootLogger.setLevel(logging.WARNING)  # the trainer logs every step of a generation
+    try:
+        report = run(options)
+    finally:
+        rootLogger.setLevel(level)
+    print(formatReport(report))
+    with open(options.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Results saved to {}".format(options.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,7 +10,8 @@ Coordinates are written as (col, row). These boards can be easily define indepen
 controlled by calling their methods.
 """
 
-import pygame
+from gui import pygame
+import symmetry
 
 
 class TTTBoard(object):
@@ -71,6 +72,20 @@ class TTTBoard(object):
 
         return [[a for a in b] for b in self.sBoard]
 
+    def getCode(self):
+        """
+        Returns the base 3 code of the board, see symmetry.positionCode
+        """
+
+        return symmetry.positionCode(self)
+
+    def getCanonicalKey(self):
+        """
+        Returns the canonical code of the board, which is the same for all of its rotations and reflections
+        """
+
+        return symmetry.canonicalKey(self)
+
     def printBoard(self):
         """
         Prints out the string representation of the board
@@ -198,6 +213,182 @@ class TTTBoard(object):
         return None, None
 
 
+def _spaceBit(pos):
+    """
+    Returns the bit used for the space at pos ((col, row)) by TTTBitBoard
+    """
+
+    return 1 << ((pos[1] - 1) * 3 + pos[0] - 1)
+
+
+def _lineMask(positions):
+    """
+    Returns the bits of all the spaces in positions OR'ed together
+    """
+
+    return sum(_spaceBit(pos) for pos in positions)
+
+
+def _blockedPatterns(mask):
+    """
+    Runs TTTBoard._checkBlockedCR on every way the three spaces in mask can be filled and returns
+    {piece: set of (x bits, o bits) that count as a block} for each piece that can be found at the last move.
+    """
+
+    bits = [bit for bit in [1 << i for i in range(9)] if bit & mask]
+    blocked = {'x': set(), 'o': set(), ' ': set()}
+    for pattern in range(27):
+        pieces = [' xo'[(pattern // 3 ** i) % 3] for i in range(3)]
+        xBits = sum(bit for bit, piece in zip(bits, pieces) if piece == 'x')
+        oBits = sum(bit for bit, piece in zip(bits, pieces) if piece == 'o')
+        for piece in blocked:
+            if TTTBoard._checkBlockedCR.__func__(None, ''.join(pieces), piece):
+                blocked[piece].add((xBits, oBits))
+    return dict((piece, frozenset(patterns)) for piece, patterns in blocked.items())
+
+
+def _firstEmpty(taken):
+    """
+    Returns the (col, row) of the first space that isn't in taken (bits of the spaces with a piece), or None if the
+    board is full
+    """
+
+    for i in range(9):
+        if not taken & (1 << i):
+            return i % 3 + 1, i // 3 + 1
+
+
+class TTTBitBoard(TTTBoard):
+    """
+    Drop in replacement for TTTBoard that stores the board as two 9 bit ints (one for the x's and one for the o's) and
+    checks for wins, blocks and empty spaces with precomputed masks instead of building strings. Space (col, row) is
+    stored in bit (row - 1) * 3 + col - 1. sBoard is built from the bits each time it is read, so the board should be
+    changed with setPiece (or by assigning a whole new sBoard) rather than by editing sBoard in place. Only x's and o's
+    can be stored, anything else is treated as an empty space.
+    """
+
+    # masks of the row and the column each space is in (indexed by bit number), and of both diagonals
+    ROWMASKS = [_lineMask([(col, row) for col in range(1, 4)]) for row in range(1, 4) for x in range(3)]
+    COLMASKS = [_lineMask([(col, row) for row in range(1, 4)]) for y in range(3) for col in range(1, 4)]
+    DIAGLR = _lineMask([(i, i) for i in range(1, 4)])
+    DIAGRL = _lineMask([(4 - i, i) for i in range(1, 4)])
+    # checkForBlocks reads its right to left diagonal with getPiece((3 - i, i)), which wraps around to (3, 3)
+    BLOCKDIAGRL = _lineMask([(2, 1), (1, 2), (3, 3)])
+    FULL = (1 << 9) - 1
+    # {mask: {piece: set of (x bits, o bits)}} for every line checked by checkForBlocks
+    BLOCKED = dict((mask, _blockedPatterns(mask)) for mask in set(ROWMASKS + COLMASKS + [DIAGLR, BLOCKDIAGRL]))
+    # (col, row) of the first empty space for every combination of taken spaces, see getEmptySpace
+    FIRSTEMPTY = [_firstEmpty(taken) for taken in range(1 << 9)]
+
+    @property
+    def sBoard(self):
+        """
+        String representation of the board ([ROW:[col], ROW:[col], ROW:[col]]), built from the bits.
+        """
+
+        return [[self.getPiece((col, row)) for col in range(1, 4)] for row in range(1, 4)]
+
+    @sBoard.setter
+    def sBoard(self, sBoard):
+        """
+        Sets the bits to match the given string representation of a board
+        """
+
+        self.xBits = 0
+        self.oBits = 0
+        for row, pieces in enumerate(sBoard):
+            for col, piece in enumerate(pieces):
+                self.setPiece((col + 1, row + 1), piece)
+
+    def copyBoard(self):
+        """
+        Returns a copy of self.sBoard
+        """
+
+        return self.sBoard
+
+    def getEmptySpace(self):
+        """
+        Returns an empty space found on the board. Returns None if there is none
+        """
+
+        return self.FIRSTEMPTY[self.xBits | self.oBits]
+
+    def getPiece(self, pos):
+        """
+        Returns the piece found in the given position
+        """
+
+        bit = _spaceBit(pos)
+        if self.xBits & bit:
+            return 'x'
+        elif self.oBits & bit:
+            return 'o'
+        return ' '
+
+    def isValidMove(self, pos):
+        """
+        Returns True if the move at pos is valid (aka if the space at pos is empty) and False if it isn't
+        """
+
+        return not (self.xBits | self.oBits) & _spaceBit(pos)
+
+    def setPiece(self, pos, marker):
+        """
+        Sets the marker for a certain position. If marker is 0, defaults to x, 1 defaults to o
+        :return: None
+        """
+
+        if marker == 1:
+            marker = 'x'
+        elif marker == 0:
+            marker = 'o'
+
+        bit = _spaceBit(pos)
+        self.xBits &= ~bit
+        self.oBits &= ~bit
+        if marker == 'x':
+            self.xBits |= bit
+        elif marker == 'o':
+            self.oBits |= bit
+
+    def checkForBlocks(self, lastMove):
+        """
+        Checks if lastMove blocks any opponents and returns True if it does and False if it doesn't
+        :param lastMove: The last move that was placed on the board, ([col, row]).
+        """
+
+        space = (lastMove[1] - 1) * 3 + lastMove[0] - 1
+        piece = self.getPiece(lastMove)
+        for mask in (self.ROWMASKS[space], self.COLMASKS[space], self.DIAGLR, self.BLOCKDIAGRL):
+            if (self.xBits & mask, self.oBits & mask) in self.BLOCKED[mask][piece]:
+                return True
+
+    def checkForWin(self, lastMove, retInt=False):
+        """
+        Checks to see if there is a three in a row somewhere
+        :param lastMove: The last move that was placed on the board, ([col, row]). Increases efficiency
+        :param retInt: if True will return 1 if x wins, 0 if o wins and 2 if a tie
+        :return: 'x' if x has won, 'o' if o has won, 't', if there is a tie, if else then None
+        """
+
+        # check for tie
+        if self.moves == self.MAXMOVESTIE:
+            return ('t', 'na') if retInt is False else 2
+
+        col = lastMove[0]
+        row = lastMove[1]
+        space = (row - 1) * 3 + col - 1
+        for mask, line in ((self.ROWMASKS[space], 'row:{}'.format(row)), (self.COLMASKS[space], 'col:{}'.format(col)),
+                           (self.DIAGLR, 'd:lr'), (self.DIAGRL, 'd:rl')):
+            if self.xBits & mask == mask:
+                return ('x', line) if retInt is False else 0
+            elif self.oBits & mask == mask:
+                return ('o', line) if retInt is False else 1
+
+        return None, None
+
+
 class TTTGraphicalBoard(TTTBoard):
     """
     Graphical wrapper for the TTTBoard class. Draws x's, o's and a cursor on a window using pygame. The window's default
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Module that keeps pygame from being imported until something graphical needs it, so that the AI, board and training
+code can be used on machines without pygame or a display (and without paying for SDL's start up). The boards and
+players modules use this module's pygame object in place of the pygame module: the first time one of its attributes is
+looked up, pygame is imported and initialized. The tttoe module is all graphics, so it loads pygame as soon as it is
+imported.
+"""
+
+import logging
+
+
+_pygame = None
+
+
+def load():
+    """
+    Imports and initializes pygame the first time it is called and returns the pygame module
+    """
+
+    global _pygame
+    if _pygame is None:
+        try:
+            import pygame
+        except ImportError, e:
+            raise ImportError("pygame is needed for the graphical parts of tttio ({})".format(e))
+
+        result = pygame.init()
+        logging.debug("Pygame initiated {}".format(result))
+        if result[1] != 0:
+            logging.warning("WARNING: {} pygame module(s) unsuccessfully initiated (error: {})".format(
+                result[1], pygame.get_error()))
+        _pygame = pygame
+    return _pygame
+
+
+def isLoaded():
+    """
+    Returns True if pygame has been imported and initialized by load
+    """
+
+    return _pygame is not None
+
+
+class _LazyPygame(object):
+    """
+    Stands in for the pygame module, calling load the first time one of its attributes is looked up
+    """
+
+    def __getattr__(self, name):
+        return getattr(load(), name)
+
+
+pygame = _LazyPygame()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Module for logging from many processes without them writing to the same files at once. A TTTLogListener takes the
+handlers off the root logger and hands them to a single listener process, and puts a TTTQueueHandler on the root logger
+in their place. Logging a message then only formats it and puts it into a multiprocessing queue, which never waits
+on the disk or on other processes. Worker processes started while the listener runs inherit the queue handler, so
+every record of a training run ends up in the same log files, one whole record at a time.
+
+Python 2.7's logging module has no QueueHandler or QueueListener, so this module has its own.
+"""
+
+import logging
+import multiprocessing as mp
+import os
+import signal
+import threading
+
+
+class TTTQueueHandler(logging.Handler):
+    """
+    Logging handler that puts records into a queue instead of writing them anywhere
+    """
+
+    def __init__(self, queue):
+        """
+        Create the handler
+        :param queue: multiprocessing.Queue to put the records into
+        """
+
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def prepare(self, record):
+        """
+        Returns a copy of record that can be pickled: the message is formatted with its args and any exception is
+        turned into text, since neither args nor tracebacks can always be pickled
+        """
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        prepared.exc_info = None
+        return prepared
+
+    def emit(self, record):
+        """
+        Puts the record into the queue without waiting
+        """
+
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+def _listen(queue, handlers, process=True):
+    """
+    Loop run by the listener. Hands every record read from queue to the handlers whose level it meets, until it gets
+    None.
+    :param process: True if the loop runs in its own process, which then leaves Ctrl+C to the process that started it
+    """
+
+    if process:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for record in iter(queue.get, None):
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+    for handler in handlers:
+        handler.flush()
+
+
+def _reopen(handler):
+    """
+    Closes the file of a logging.FileHandler (or a subclass such as RotatingFileHandler) and opens it again for
+    appending, so that the handler writes to the file found at its path again
+    """
+
+    handler.acquire()
+    try:
+        if handler.stream is not None:
+            handler.flush()
+            handler.stream.close()
+        handler.mode = 'a'  # the listener has written to the file since, opening it with 'w' would wipe that out
+        handler.stream = handler._open()
+    finally:
+        handler.release()
+
+
+class TTTLogListener(object):
+    """
+    Sends everything logged to the root logger (by this process and the processes it starts) through a queue to a
+    listener process, which writes it with the root logger's handlers. Use it as a context manager or call start and
+    stop. The listener is forked, so that it can use the handlers as they are; on platforms without fork it is a
+    thread of this process instead.
+    """
+
+    def __init__(self, level=logging.INFO, handlers=None):
+        """
+        Create the listener
+        :param level: Level to set the root logger to while the listener runs
+        :param handlers: Handlers for the listener to write records with. Defaults to the handlers of the root logger
+        """
+
+        self.level = level
+        self.handlers = handlers
+        self.queue = None
+        self.listener = None
+        self._saved = None  # root logger's handlers and level from before start
+        self._listening = None  # handlers the listener writes with
+
+    def start(self):
+        """
+        Starts the listener and swaps the root logger's handlers for a TTTQueueHandler
+        """
+
+        rootLogger = logging.getLogger()
+        self._saved = (rootLogger.handlers[:], rootLogger.level)
+        handlers = self.handlers if self.handlers is not None else rootLogger.handlers[:]
+        self._listening = handlers
+
+        self.queue = mp.Queue()
+        if hasattr(os, 'fork'):
+            self.listener = mp.Process(target=_listen, args=(self.queue, handlers))
+        else:
+            self.listener = threading.Thread(target=_listen, args=(self.queue, handlers, False))
+        self.listener.daemon = True
+        self.listener.start()
+
+        for handler in rootLogger.handlers[:]:
+            rootLogger.removeHandler(handler)
+        rootLogger.addHandler(TTTQueueHandler(self.queue))
+        rootLogger.setLevel(self.level)
+
+    def stop(self):
+        """
+        Puts the root logger's handlers back and waits for the listener to write everything that was logged. The
+        files of the listener's file handlers are then reopened in this process, as the listener may have rotated
+        them, which would leave this process's handlers writing to the old files.
+        """
+
+        if self.listener is None:
+            return
+
+        rootLogger = logging.getLogger()
+        handlers, level = self._saved
+        for handler in rootLogger.handlers[:]:
+            rootLogger.removeHandler(handler)
+        for handler in handlers:
+            rootLogger.addHandler(handler)
+        rootLogger.setLevel(level)
+
+        self.queue.put(None)
+        self.listener.join()
+        self.queue.close()
+        self.listener = None
+        for handler in self._listening:
+            if isinstance(handler, logging.FileHandler):
+                _reopen(handler)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
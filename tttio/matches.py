@@ -0,0 +1,482 @@
+#!/usr/bin/env python
+"""
+Module for playing many games of tic-tac-toe between neural nets at once. Instead of playing one game after another
+with calcFitness, the lockstep engine keeps every game of a generation in one (M, 9) array and advances all of them by
+one move at a time, feeding every net that has to move in one batched forward pass.
+
+The games follow the same rules as calcFitness in the ai module (including its quirks, so that the fitness scores
+come out the same): a player keeps moving until it picks a space that is taken, which costs it OVERLAPDOC, hands the
+turn over and overwrites the space with the other player's piece. Games end on an invalid move once a game has been
+won or once two invalid moves have been made. Board cells are stored as EMPTY, X or O, the first net (turn 0) places
+o's and the second (turn 1) places x's, like TTTBoard.setPiece.
+
+The module also holds the matchmaking strategies TTTrainer can use to decide which games are played each generation.
+A strategy's play method is given an arena (the trainer) with three methods, each of which plays games, adds the
+fitness earned to the nets and returns the fitness gained by the nets of each population, (fitness1, fitness2):
+playAll() plays every net in the first population against every net in the second, playPairs(pairs) plays an (M, 2)
+array of net indices and playAgainst(tensors) has every net of both populations play every net in tensors (see
+TTTPopulation.getTensors), going first and second.
+"""
+
+import copy
+import hashlib
+import threading
+import numpy as np
+import ai
+
+
+EMPTY = 0
+X = 1
+O = 2
+
+# indices into a flattened board of the lines checked by TTTBoard.checkForWin and TTTBoard.checkForBlocks
+ROWS = np.array([[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+COLS = ROWS.T.copy()
+DIAGLR = np.array([0, 4, 8])
+DIAGRL = np.array([2, 4, 6])
+# checkForBlocks reads its right-to-left diagonal with getPiece((3 - i, i)), which ends up on these spaces
+BLOCKDIAGRL = np.array([1, 3, 8])
+
+# games are fed to the nets in chunks of this many boards, which keeps the gathered weight arrays small
+CHUNK = 8192
+# guards TTTNeuralNet.forwardPasses, since feedNets is called by the threads of a workers.TTTThreadPool
+_passesLock = threading.Lock()
+
+
+def allPairs(size1, size2):
+    """
+    Returns an (size1 * size2, 2) array pairing every net in one population with every net in the other
+    """
+
+    return np.column_stack([np.repeat(np.arange(size1), size2), np.tile(np.arange(size2), size1)])
+
+
+def reduceFitness(pairs, deltas, size1, size2):
+    """
+    Adds up the fitness each net earned over all of its games.
+    :param pairs: (M, 2) array of net indices, as passed to playLockstep
+    :param deltas: (M, 2) array of fitness changes, as returned by playLockstep
+    :return: Fitness changes for the nets of each population, (fitness1, fitness2)
+    """
+
+    return np.bincount(pairs[:, 0], deltas[:, 0], minlength=size1), \
+        np.bincount(pairs[:, 1], deltas[:, 1], minlength=size2)
+
+
+def netDigests(tensors):
+    """
+    Returns a list holding a digest of the weights and biases of each net, which can be used to tell if a net changed.
+    :param tensors: (weights, biases) of a population, see TTTPopulation.getTensors
+    """
+
+    weights, biases = tensors
+    rows = np.concatenate([np.reshape(a, (len(a), -1)) for a in list(weights) + list(biases)], axis=1)
+    return [hashlib.md5(row.tobytes()).digest() for row in rows]
+
+
+def encodeCells(cells):
+    """
+    Translates an (N, 9) array of board cells into the (N, 10) input sets that TTTNeuralNet.getMove would build for
+    them when it is called by calcFitness (with an int turn).
+    """
+
+    xValue, oValue = ai.TTTNeuralNet.pieceValues[:2]
+    input_sets = np.empty((len(cells), 10))
+    input_sets[:, 0] = oValue
+    input_sets[:, 1:] = np.where(cells == X, xValue, oValue)
+    return input_sets
+
+
+def feedNets(tensors, nets, input_sets):
+    """
+    Feeds each input set to its own net.
+    :param tensors: (weights, biases) of a population, as returned by TTTPopulation.getTensors
+    :param nets: Array holding the index of the net to feed each input set to
+    :param input_sets: (N, 10) array of input sets
+    :return: (N, 9) array of outputs
+    """
+
+    weights, biases = tensors
+    with _passesLock:
+        ai.TTTNeuralNet.forwardPasses += len(input_sets)
+    outputs = np.empty((len(input_sets), weights[-1].shape[1]))
+    for start in range(0, len(input_sets), CHUNK):
+        chunk = slice(start, start + CHUNK)
+        output = input_sets[chunk]
+        for layerWeights, layerBiases in zip(weights, biases):
+            output = np.einsum('kij,kj->ki', layerWeights[nets[chunk]], output) + layerBiases[nets[chunk]]
+            output = 1 / (1 + np.exp(-output))
+        outputs[chunk] = output
+    return outputs
+
+
+def _lines(moves, diagRL):
+    """
+    Returns an (N, 4, 3) array holding the row, column and both diagonals to check for each move.
+    """
+
+    count = len(moves)
+    return np.stack([ROWS[moves // 3], COLS[moves % 3], np.broadcast_to(DIAGLR, (count, 3)),
+                     np.broadcast_to(diagRL, (count, 3))], axis=1)
+
+
+def checkForWins(cells, moves):
+    """
+    Vectorized version of TTTBoard.checkForWin(move, retInt=True) for boards that are never tied (see module doc).
+    :param cells: (N, 9) array of board cells
+    :param moves: Array of the space (0-8) of the last move on each board
+    :return: Array holding 0 if x won, 1 if o won and -1 if nobody has won each board
+    """
+
+    pieces = cells[np.arange(len(cells))[:, None, None], _lines(moves, DIAGRL)]
+    status = np.where((pieces == X).all(axis=2), 0, np.where((pieces == O).all(axis=2), 1, -1))
+    # checkForWin returns on the first line (row, column, left-right then right-left diagonal) that is a win
+    first = np.argmax(status >= 0, axis=1)
+    return status[np.arange(len(cells)), first]
+
+
+def checkForBlocks(cells, moves):
+    """
+    Vectorized version of TTTBoard.checkForBlocks, returns a boolean array.
+    :param cells: (N, 9) array of board cells
+    :param moves: Array of the space (0-8) of the last move on each board
+    """
+
+    rows = np.arange(len(cells))
+    pieces = cells[rows[:, None, None], _lines(moves, BLOCKDIAGRL)]
+    isX = pieces == X
+    isO = pieces == O
+    adjacentX = (isX[:, :, 0] & isX[:, :, 1]) | (isX[:, :, 1] & isX[:, :, 2])
+    # TTTBoard._checkBlockedCR always looks for x's to block, even when x was the one who moved
+    blockedByX = adjacentX
+    blockedByO = (adjacentX & (isO[:, :, 0] | isO[:, :, 2])) | (isX[:, :, 0] & isO[:, :, 1] & isX[:, :, 2])
+    placedX = cells[rows, moves] == X
+    return np.where(placedX[:, None], blockedByX, blockedByO).any(axis=1)
+
+
+def playLockstep(tensors1, tensors2, pairs):
+    """
+    Plays a game for every pair of nets, advancing all of them one move at a time. Gives the same fitness changes as
+    calling calcFitness on each pair.
+    :param tensors1: (weights, biases) of the nets that move first (turn 0), see TTTPopulation.getTensors
+    :param tensors2: (weights, biases) of the nets that move second (turn 1)
+    :param pairs: (M, 2) array where each row holds the index of a net in tensors1 and a net in tensors2
+    :return: (M, 2) array of the fitness each net gained or lost in each game
+    """
+
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    count = len(pairs)
+    cells = np.zeros((count, 9), dtype=np.int8)
+    turn = np.zeros(count, dtype=int)
+    overlaps = np.zeros(count, dtype=int)
+    gameOver = np.zeros(count, dtype=bool)
+    deltas = np.zeros((count, 2))
+
+    active = np.arange(count)
+    while len(active) > 0:
+        moves = np.empty(len(active), dtype=int)
+        for player, tensors in enumerate([tensors1, tensors2]):
+            moving = turn[active] == player
+            games = active[moving]
+            outputs = feedNets(tensors, pairs[games, player], encodeCells(cells[games]))
+            moves[moving] = np.argmax(outputs, axis=1)
+
+        # invalid moves cost the player, end its turn and the move is then played by the other player
+        invalid = cells[active, moves] != EMPTY
+        games = active[invalid]
+        deltas[games, turn[games]] += ai.OVERLAPDOC
+        overlaps[games] += 1
+        turn[games] = 1 - turn[games]
+
+        players = turn[active]
+        cells[active, moves] = np.where(players == 1, X, O)
+
+        blocks = checkForBlocks(cells[active], moves)
+        deltas[active[blocks], players[blocks]] += ai.BLOCKOPP
+
+        won = checkForWins(cells[active], moves) == players
+        deltas[active[won], players[won]] += ai.GAMEWIN
+        deltas[active[won], 1 - players[won]] += ai.GAMELOSS
+        gameOver[active[won]] = True
+
+        finished = invalid & (gameOver[active] | (overlaps[active] >= 2))
+        active = active[~finished]
+
+    return deltas
+
+
+class TTTGameCache(object):
+    """
+    Holds the outcome of games between nets, keyed by (digest1, digest2), the digests of the net that went first and
+    the net that went second (see netDigests). Games are deterministic, so the outcome of a game only has to be
+    calculated once for as long as both nets stay unchanged.
+    """
+
+    def __init__(self):
+        """
+        Create the cache
+        """
+
+        self.outcomes = {}  # (digest1, digest2): (fitness1, fitness2)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def snapshot(self):
+        """
+        Returns a copy of the cache with its own outcomes, for TTTrainer.checkpoint
+        """
+
+        cache = copy.copy(self)
+        cache.outcomes = dict(self.outcomes)
+        return cache
+
+    def lookup(self, keys):
+        """
+        Looks up the outcome of a list of games.
+        :param keys: (digest1, digest2) of each game
+        :return: (M, 2) array of the fitness changes of each game (zeros for games that weren't found) and an array
+        of M bools which are True for the games that were found
+        """
+
+        deltas = np.zeros((len(keys), 2))
+        found = np.zeros(len(keys), dtype=bool)
+        for index, key in enumerate(keys):
+            outcome = self.outcomes.get(key)
+            if outcome is not None:
+                deltas[index] = outcome
+                found[index] = True
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return deltas, found
+
+    def store(self, keys, deltas):
+        """
+        Adds the outcome of games to the cache
+        :param keys: (digest1, digest2) of each game
+        :param deltas: (M, 2) array of the fitness changes of each game
+        """
+
+        for key, outcome in zip(keys, deltas):
+            self.outcomes[key] = tuple(outcome)
+
+    def prune(self, digests1, digests2):
+        """
+        Forgets every game that involved a net that is no longer in the populations, which keeps the cache from
+        growing past size1 * size2 games
+        :param digests1: Digests of the nets in the first population
+        :param digests2: Digests of the nets in the second population
+        """
+
+        living1, living2 = set(digests1), set(digests2)
+        self.outcomes = dict((key, outcome) for key, outcome in self.outcomes.items()
+                             if key[0] in living1 and key[1] in living2)
+
+
+class TTTMatchmaker(object):
+    """
+    Base matchmaking strategy. Subclasses must overwrite _play.
+    """
+
+    def __init__(self):
+        """
+        Create the strategy
+        """
+
+        self.gamesPlayed = 0  # over every generation so far
+
+    def __str__(self):
+        """
+        Returns the name of the strategy
+        """
+
+        return type(self).__name__
+
+    def play(self, arena, rng):
+        """
+        Plays a generation's games in the arena (see module doc).
+        :param rng: numpy RandomState (or numpy's random module) to draw from
+        :return: Number of games played
+        """
+
+        games = self._play(arena, rng)
+        self.gamesPlayed += games
+        return games
+
+    def _play(self, arena, rng):
+        """
+        'Abstract' method that plays the games and returns how many were played. Should be overwritten.
+        """
+
+        raise NotImplementedError("{} does not implement _play".format(type(self).__name__))
+
+    def endGeneration(self, fittest):
+        """
+        Called by the trainer with the fittest net once each generation is over. Does nothing by default.
+        """
+
+        pass
+
+
+class TTTRoundRobin(TTTMatchmaker):
+    """
+    Every net in the first population plays every net in the second, P * P games per generation.
+    """
+
+    def _play(self, arena, rng):
+        gained1, gained2 = arena.playAll()
+        return len(gained1) * len(gained2)
+
+
+def _randomPairs(size1, size2, rng):
+    """
+    Returns an (min(size1, size2), 2) array pairing a random net of the first population with a random net of the
+    second, using each net at most once
+    """
+
+    count = min(size1, size2)
+    return np.column_stack([rng.permutation(size1)[:count], rng.permutation(size2)[:count]])
+
+
+class TTTSampled(TTTMatchmaker):
+    """
+    Plays k rounds of games between randomly paired nets, so each net plays about k games per generation instead of P.
+    """
+
+    def __init__(self, k=10):
+        """
+        Create the strategy
+        :param k: Number of games each net plays
+        """
+
+        super(TTTSampled, self).__init__()
+        self.k = k
+
+    def _play(self, arena, rng):
+        size1, size2 = arena.sizes()
+        if min(size1, size2) == 0:
+            return 0
+        pairs = np.concatenate([_randomPairs(size1, size2, rng) for x in range(self.k)])
+        arena.playPairs(pairs)
+        return len(pairs)
+
+
+class TTTSwiss(TTTMatchmaker):
+    """
+    Swiss-style tournament: the first round pairs nets at random, after that each round pairs every net with the
+    nearest ranked net of the other population (by the fitness they have earned so far this generation) that it hasn't
+    played yet. Strong nets end up playing strong nets, which separates them better than random opponents would for the
+    same number of games. No pair of nets plays twice unless there are more rounds than nets in the smaller population.
+    If the populations differ in size, the pairings of each round wrap around the smaller one, so some of its nets play
+    twice in that round and every net of the larger one still plays once.
+    """
+
+    def __init__(self, rounds=8):
+        """
+        Create the strategy
+        :param rounds: Number of rounds to play, each net of the larger population plays one game per round
+        """
+
+        super(TTTSwiss, self).__init__()
+        self.rounds = rounds
+
+    def _play(self, arena, rng):
+        size1, size2 = arena.sizes()
+        if min(size1, size2) == 0:
+            return 0
+
+        scores1, scores2 = np.zeros(size1), np.zeros(size2)
+        played = np.zeros((size1, size2), dtype=bool)
+        ranks1, ranks2 = rng.permutation(size1), rng.permutation(size2)
+        for round in range(self.rounds):
+            pairs = self._pair(ranks1, ranks2, played)
+            played[pairs[:, 0], pairs[:, 1]] = True
+            gained1, gained2 = arena.playPairs(pairs)
+            scores1 += gained1
+            scores2 += gained2
+            # ties are broken at random so that equal nets don't keep getting paired the same way
+            ranks1 = np.lexsort((rng.random_sample(size1), -scores1))
+            ranks2 = np.lexsort((rng.random_sample(size2), -scores2))
+        return max(size1, size2) * self.rounds
+
+    @staticmethod
+    def _pair(ranks1, ranks2, played):
+        """
+        Pairs the nets for a round. Going from the best net of the larger population to the worst, each one is paired
+        with the nearest ranked net of the other population that it hasn't played and that hasn't been paired yet this
+        round. Once every net of the smaller population has been paired, they can all be paired again. If there is no
+        such net, one that has already been paired this round is used, and only if every net has been played already
+        is a pair played again.
+        :param ranks1: Indices of the nets of the first population, from the best to the worst
+        :param ranks2: Indices of the nets of the second population, from the best to the worst
+        :param played: (size1, size2) array, True for the pairs of nets that have already played each other
+        :return: (max(size1, size2), 2) array of the pairs of nets
+        """
+
+        swapped = len(ranks1) < len(ranks2)
+        if swapped:
+            ranks1, ranks2, played = ranks2, ranks1, played.T
+        size1, size2 = len(ranks1), len(ranks2)
+        free = np.ones(size2, dtype=bool)  # nets of the smaller population not paired yet this round, by rank
+        pairs = []
+        for rank, net in enumerate(ranks1):
+            if not free.any():
+                free[:] = True
+            # the rank the net would have in the smaller population
+            distance = np.abs(np.arange(size2) - rank * size2 / float(size1))
+            unplayed = ~played[net, ranks2]
+            for allowed in (free & unplayed, unplayed, free):
+                if allowed.any():
+                    break
+            opponent = np.flatnonzero(allowed)[np.argmin(distance[allowed])]
+            free[opponent] = False
+            pairs.append((net, ranks2[opponent]))
+        pairs = np.array(pairs, dtype=int).reshape(-1, 2)
+        return pairs[:, ::-1] if swapped else pairs
+
+
+class TTTHallOfFame(TTTMatchmaker):
+    """
+    Plays the games of another strategy and then has every net of both populations play the fittest nets of the last
+    few generations, going first and second. Keeps nets from forgetting how to beat opponents that have died out.
+    """
+
+    def __init__(self, matchmaker=None, size=10):
+        """
+        Create the strategy
+        :param matchmaker: Strategy to play the games between the populations with. Defaults to TTTRoundRobin
+        :param size: Number of past champions to keep
+        """
+
+        super(TTTHallOfFame, self).__init__()
+        self.matchmaker = matchmaker if matchmaker is not None else TTTRoundRobin()
+        self.size = size
+        self.champions = None  # (weights, biases) of the champions, see TTTPopulation.getTensors
+
+    def __str__(self):
+        return "{}({})".format(type(self).__name__, self.matchmaker)
+
+    def _play(self, arena, rng):
+        games = self.matchmaker.play(arena, rng)
+        if self.champions is not None:
+            size1, size2 = arena.sizes()
+            arena.playAgainst(self.champions)
+            games += (size1 + size2) * len(self.champions[1][0]) * 2
+        return games
+
+    def endGeneration(self, fittest):
+        """
+        Adds the fittest net of the generation to the hall of fame, replacing the oldest champion if it is full
+        """
+
+        weights, biases = fittest.getArrays()
+        if self.champions is None:
+            self.champions = [[w[None] for w in weights], [b[None] for b in biases]]
+        else:
+            self.champions = [[np.concatenate([old, new[None]])[-self.size:]
+                               for old, new in zip(self.champions[part], arrays)]
+                              for part, arrays in enumerate([weights, biases])]
+        self.matchmaker.endGeneration(fittest)
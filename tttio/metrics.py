@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Module for saving the metrics TTTrainer records for each generation (see TTTrainer.trainGeneration), so that where the
+time of a generation goes and how training scales can be charted without scraping the logs. Records are appended to a
+file one generation at a time, as CSV if the file name ends with .csv and as JSON lines (one JSON object per line)
+otherwise. Appending means a run resumed from a checkpoint carries on in the same file.
+"""
+
+import csv
+import json
+import os
+
+
+def isCSV(file_path):
+    """
+    Returns True if records are saved to file_path as CSV rather than as JSON lines
+    """
+
+    return file_path.lower().endswith('.csv')
+
+
+def append(file_path, record):
+    """
+    Appends a record to the end of file_path, creating the file (and, for CSV, writing the header) if needed
+    :param record: Dict of the metrics to save. For CSV, every record saved to a file should have the same keys, in the
+    same order
+    """
+
+    if isCSV(file_path):
+        newFile = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+        with open(file_path, 'ab') as f:
+            writer = csv.DictWriter(f, fieldnames=list(record))
+            if newFile:
+                writer.writeheader()
+            writer.writerow(record)
+    else:
+        with open(file_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def _number(value):
+    """
+    Turns a CSV field back into an int or a float if it holds one
+    """
+
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value if value != '' else None
+
+
+def read(file_path):
+    """
+    Returns a list of the records saved to file_path by append
+    """
+
+    with open(file_path, 'rb' if isCSV(file_path) else 'r') as f:
+        if isCSV(file_path):
+            return [dict((key, _number(value)) for key, value in row.items()) for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Module for saving neural nets in a binary format that can be loaded with numpy.memmap, without parsing anything. Unlike
+the text format written by TTTNeuralNet.export, weights are stored as they are (float64), so nets round trip bit for
+bit, and a single file can hold a whole population.
+
+A file starts with a header: MAGIC, the format version, the number of nets and the number of layers (all uint32),
+followed by the (neurons, inputs) of each layer and padding up to a multiple of 8 bytes. After that comes one
+contiguous little endian float64 block for each layer's weights (nets, neurons, inputs), one for each layer's biases
+(nets, neurons) and one holding the fitness of each net.
+"""
+
+import struct
+import numpy as np
+
+
+MAGIC = b'TTTNETS\x00'
+VERSION = 1
+DTYPE = np.dtype('<f8')
+_HEADER = struct.Struct('<8sIII')
+_SHAPE = struct.Struct('<II')
+
+
+def _headerSize(numLayers):
+    """
+    Returns the size of the header of a file holding nets with numLayers layers, padded to a multiple of 8 bytes
+    """
+
+    size = _HEADER.size + _SHAPE.size * numLayers
+    return size + -size % 8
+
+
+def isNetFile(file_path):
+    """
+    Returns True if the file at file_path starts like a file written by write
+    """
+
+    with open(file_path, 'rb') as fp:
+        return fp.read(len(MAGIC)) == MAGIC
+
+
+def write(file_path, weights, biases, fitness):
+    """
+    Saves nets to file_path, replacing the existing file at that location if needed
+    :param weights: List of (nets, neurons, inputs) arrays, one for each layer (see TTTPopulation.getTensors)
+    :param biases: List of (nets, neurons) arrays, one for each layer
+    :param fitness: Fitness of each net
+    """
+
+    count = len(fitness)
+    shapes = [np.shape(layer)[1:] for layer in weights]
+    header = _HEADER.pack(MAGIC, VERSION, count, len(shapes)) + b''.join(_SHAPE.pack(*shape) for shape in shapes)
+    with open(file_path, 'wb') as fp:
+        fp.write(header + b'\x00' * (_headerSize(len(shapes)) - len(header)))
+        for block in list(weights) + list(biases) + [fitness]:
+            np.ascontiguousarray(block, dtype=DTYPE).tofile(fp)
+
+
+def read(file_path, mode='c'):
+    """
+    Maps the nets saved in file_path into memory.
+    :param mode: numpy.memmap mode. The default ('c') is copy on write: the arrays can be changed, but the changes are
+    not written to the file. Use 'r' for read only arrays or 'r+' to write changes back to the file
+    :return: (weights, biases, fitness) laid out like the arguments of write
+    """
+
+    with open(file_path, 'rb') as fp:
+        magic, version, count, numLayers = _HEADER.unpack(fp.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("{} is not a binary net file".format(file_path))
+        if version != VERSION:
+            raise ValueError("{} is version {} of the binary net format, only version {} is supported".format(
+                file_path, version, VERSION))
+        shapes = [_SHAPE.unpack(fp.read(_SHAPE.size)) for layer in range(numLayers)]
+
+    blocks = [(count, ) + shape for shape in shapes] + [(count, shape[0]) for shape in shapes] + [(count, )]
+    offset = _headerSize(numLayers)
+    arrays = []
+    for shape in blocks:
+        if count == 0:
+            arrays.append(np.empty(shape, dtype=DTYPE))
+        else:
+            arrays.append(np.memmap(file_path, dtype=DTYPE, mode=mode, offset=offset, shape=shape))
+        offset += int(np.prod(shape)) * DTYPE.itemsize
+
+    return arrays[:numLayers], arrays[numLayers:numLayers * 2], arrays[-1]
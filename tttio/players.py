@@ -6,9 +6,12 @@ only defined by the game classes
 
 import datetime
 import logging
+import os
 import socket
-import pygame
+from gui import pygame
 import ai
+import policy
+import solver
 
 
 class TTTPlayer(object):
@@ -177,7 +180,9 @@ class TTTAiPlayer(TTTPlayer):
     def __init__(self, game_piece, neural_net, default=False):
         """
         Create the ai player
-        :param neural_net: Path to an exported neural net to be used as the brains of the A.I.
+        :param neural_net: Path to an exported neural net to be used as the brains of the A.I. Can also be the path
+        to an exported policy table made by TTTNeuralNet.compile, which is loaded instead of the net's weights, or an
+        object with the getMove method of TTTNeuralNet, which is used as it is
         :param default: Load the default neural net that comes with this package found at data/ai_default.txt. If
         this argument is True then the neural_net argument will be ignored
         """
@@ -185,16 +190,28 @@ class TTTAiPlayer(TTTPlayer):
         super(TTTAiPlayer, self).__init__(game_piece)
         if default:
             self.neuralNet = ai.TTTNeuralNet.load(ai.DEFAULT_AI_PATH)
+        elif not isinstance(neural_net, basestring):
+            self.neuralNet = neural_net
+        elif os.path.exists(neural_net) and policy.isPolicyFile(neural_net):
+            self.neuralNet = policy.TTTPolicyTable.load(neural_net)
         else:
             self.neuralNet = ai.TTTNeuralNet.load(neural_net)
 
-    def getMove(self, timeout=60):
+    def chooseMove(self):
         """
         Gets the necessary input from the board then calls the TTTNeuralNet's getMove function, passing said input
+        :return: The chosen move in the 'int' notation (1-9)
+        """
+
+        return self.neuralNet.getMove(self.game.turn, self.game.board.sBoard)
+
+    def getMove(self, timeout=60):
+        """
+        Plays the move returned by chooseMove
         :param timeout: Added to match signature of method in parent class
         """
 
-        move = self.game.board.translateNumToPos(self.neuralNet.getMove(self.game.turn, self.game.board.sBoard))
+        move = self.game.board.translateNumToPos(self.chooseMove())
         self.playPiece(move)
         self.game.board.cursorPos = self.game.board.getEmptySpace()
         if self.game.board.cursorPos is not None:
@@ -206,6 +223,34 @@ class TTTAiPlayer(TTTPlayer):
         return move
 
 
+class TTTMinimaxPlayer(TTTAiPlayer):
+    """
+    A.I. TTT player that picks its moves with an alpha-beta search (solver.TTTMinimax) instead of a neural net.
+    """
+
+    def __init__(self, game_piece, max_depth=None, max_nodes=None):
+        """
+        Create the minimax player
+        :param max_depth: How many moves ahead to search. Defaults to searching to the end of the game, which makes
+        the player unbeatable
+        :param max_nodes: Largest number of positions to search for each move. Defaults to no limit
+        """
+
+        super(TTTMinimaxPlayer, self).__init__(game_piece, solver.TTTMinimax(max_depth, max_nodes))
+        self.search = self.neuralNet
+
+    def chooseMove(self):
+        """
+        Searches the board for the best move
+        :return: The chosen move in the 'int' notation (1-9)
+        """
+
+        move = self.search.getMove(self.game.turn, self.game.board.sBoard)
+        logging.debug("Minimax searched {} nodes ({} nodes per second)".format(self.search.nodes,
+                                                                              self.search.nodesPerSecond()))
+        return move
+
+
 # this is here for when the multiplayer will be properly added
 class _TTTLanHumanPlayer(TTTHumanPlayer):
     """
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Module containing compiled neural nets. TTTNeuralNet.getMove feeds empty spaces to the net the same way as o's, so the
+move a net makes only depends on whose turn it is and where the x's are. That makes 1,024 different inputs, which
+covers every position of every game. TTTNeuralNet.compile runs the net on all of them once and stores the moves in a
+TTTPolicyTable. Looking up a move in the table is a single index into a byte array, and neither numpy nor the net's
+neurons are needed to play with it.
+
+Tables are saved as MAGIC, a version byte and then one byte (the move, 1-9) for each input, see moveIndex.
+"""
+
+
+MAGIC = b'TTTPOLICY'
+VERSION = 1
+SIZE = 2 * 2 ** 9
+
+
+def moveIndex(turn, sBoard):
+    """
+    Returns the index of a position's move in a policy table: 512 if it is x's turn (0 for o's or an int turn, like
+    TTTNeuralNet.getMove) plus a 9 bit mask of the spaces holding an x
+    :param turn: x or o for who the current turn it is
+    :param sBoard: String representation of a tic tac toe board, or a TTTBoard object
+    """
+
+    if hasattr(sBoard, 'xBits'):
+        xBits = sBoard.xBits
+    else:
+        if hasattr(sBoard, 'sBoard'):
+            sBoard = sBoard.sBoard
+        xBits = sum(1 << i for i, piece in enumerate(b for a in sBoard for b in a) if piece == 'x')
+    return (512 if turn == 'x' else 0) + xBits
+
+
+def isPolicyFile(file_path):
+    """
+    Returns True if the file at file_path starts like an exported TTTPolicyTable
+    """
+
+    with open(file_path, 'rb') as fp:
+        return fp.read(len(MAGIC)) == MAGIC
+
+
+class TTTPolicyTable(object):
+    """
+    Lookup table holding the move a compiled TTTNeuralNet makes for every input it can be given. Has the same getMove
+    method as TTTNeuralNet, so it can be used in its place when playing.
+    """
+
+    def __init__(self, moves):
+        """
+        Create the table. Use TTTNeuralNet.compile or TTTPolicyTable.load instead of calling this directly.
+        :param moves: SIZE moves (1-9), ordered by moveIndex
+        """
+
+        self.moves = bytearray(moves)
+        if len(self.moves) != SIZE:
+            raise ValueError("A policy table needs {} moves, got {}".format(SIZE, len(self.moves)))
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Loads a table saved by export
+        """
+
+        with open(file_path, 'rb') as fp:
+            content = fp.read()
+
+        if content[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a policy table".format(file_path))
+        version = bytearray(content[len(MAGIC):len(MAGIC) + 1])
+        if not version or version[0] != VERSION:
+            raise ValueError("{} holds a policy table of an unsupported version".format(file_path))
+        return cls(content[len(MAGIC) + 1:])
+
+    def export(self, file_path):
+        """
+        Saves the table to file_path, replacing the existing file at that location if needed
+        """
+
+        with open(file_path, 'wb') as exportFile:
+            exportFile.write(MAGIC + bytes(bytearray([VERSION])) + bytes(self.moves))
+
+    def getMove(self, turn, sBoard):
+        """
+        Returns the move the compiled net makes in the 'int' notation (1-9), see TTTNeuralNet.getMove
+        :param turn: x or o for who the current turn it is
+        :param sBoard: String representation of a tic tac toe board, or a TTTBoard object
+        """
+
+        return self.moves[moveIndex(turn, sBoard)]
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+Module for profiling training and the game without editing the code being profiled. A TTTProfiler runs cProfile in one
+process, along with a set of timers that add up the time spent in the blocks of code wrapped in timed (calcFitness,
+nextGen, filling the worker queues...). When it stops, it saves both next to each other under a prefix and process id.
+TTTrainer profiles each generation like this in its own process and in every worker process (or thread), and merge
+then combines the stats of all of them into one report per generation. cProfile only sees the thread it was started
+in, so each thread has a profiler and timers of its own.
+
+timed costs a function call and a check when no profiler is running, so it is kept out of the innermost loops.
+"""
+
+import cProfile
+import glob
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from StringIO import StringIO
+
+
+_running = threading.local()  # timers attribute holds the timers of the profiler running in the thread
+
+
+class TTTTimers(object):
+    """
+    Adds up the time spent in named blocks of code and the number of times each one ran
+    """
+
+    def __init__(self):
+        """
+        Create the timers
+        """
+
+        self.totals = {}  # name: [seconds, count]
+
+    def add(self, name, seconds, count=1):
+        """
+        Adds seconds spent over count runs of the block name
+        """
+
+        total = self.totals.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += count
+
+    @contextmanager
+    def time(self, name):
+        """
+        Context manager that adds the time spent inside of it to name
+        """
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start)
+
+    def merge(self, totals):
+        """
+        Adds the totals of other timers (a TTTTimers object or its totals dict) to these ones
+        """
+
+        for name, (seconds, count) in getattr(totals, 'totals', totals).items():
+            self.add(name, seconds, count)
+
+    def report(self):
+        """
+        Returns the timers as a table, the block with the most time spent in it first
+        """
+
+        lines = ['{:<20} {:>12} {:>10} {:>12}'.format('timer', 'total (s)', 'count', 'mean (us)')]
+        for name, (seconds, count) in sorted(self.totals.items(), key=lambda item: -item[1][0]):
+            lines.append('{:<20} {:>12.4f} {:>10} {:>12.2f}'.format(name, seconds, count,
+                                                                  seconds / max(count, 1) * 1e6))
+        return '\n'.join(lines)
+
+
+class _NoTimer(object):
+    """
+    Context manager that does nothing, returned by timed when no profiler is running
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOTIMER = _NoTimer()
+
+
+def timed(name):
+    """
+    Returns a context manager that adds the time spent inside of it to the timer name of the profiler running in this
+    thread, or does nothing if there isn't one
+    """
+
+    timers = getattr(_running, 'timers', None)
+    return timers.time(name) if timers is not None else _NOTIMER
+
+
+def isProfiling():
+    """
+    Returns True if a TTTProfiler is running in this thread
+    """
+
+    return getattr(_running, 'timers', None) is not None
+
+
+class TTTProfiler(object):
+    """
+    Runs cProfile and the timers of this thread between start and stop (or inside of a with statement), then saves
+    their stats to <prefix>.<pid>.prof and <prefix>.<pid>.timers (<prefix>.<pid>.<thread name>.* outside of the main
+    thread), where merge finds them.
+    """
+
+    def __init__(self, prefix):
+        """
+        Create the profiler
+        :param prefix: Path (without an extension) to save the stats to
+        """
+
+        self.prefix = prefix
+        self.profile = None
+        self.timers = None
+
+    def start(self):
+        """
+        Starts profiling this thread
+        """
+
+        self.timers = _running.timers = TTTTimers()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """
+        Stops profiling and saves the stats
+        """
+
+        self.profile.disable()
+        _running.timers = None
+        partPath = '{}.{}'.format(self.prefix, os.getpid())
+        if threading.current_thread().name != 'MainThread':
+            partPath += '.' + threading.current_thread().name
+        self.profile.dump_stats(partPath + '.prof')
+        with open(partPath + '.timers', 'w') as f:
+            json.dump(self.timers.totals, f)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def merge(prefix, top=25):
+    """
+    Merges the stats saved by every process (and thread) profiled under prefix into <prefix>.prof (which can be loaded
+    with pstats) and writes a report to <prefix>.txt: the merged timers followed by the top functions by cumulative
+    time. The files saved by each process are removed.
+    :param top: Number of functions to list in the report
+    :return: Text of the report
+    """
+
+    profiles = sorted(glob.glob(prefix + '.*.prof'))
+    timers = TTTTimers()
+    for path in glob.glob(prefix + '.*.timers'):
+        with open(path) as f:
+            timers.merge(json.load(f))
+        os.remove(path)
+
+    report = StringIO()
+    report.write("Profiled {} process(es) and thread(s)\n\n{}\n\n".format(len(profiles), timers.report()))
+    if profiles:
+        stats = pstats.Stats(profiles[0], stream=report)
+        for path in profiles[1:]:
+            stats.add(path)
+        stats.dump_stats(prefix + '.prof')
+        stats.sort_stats('cumulative').print_stats(top)
+        for path in profiles:
+            os.remove(path)
+
+    with open(prefix + '.txt', 'w') as f:
+        f.write(report.getvalue())
+    return report.getvalue()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""
+Module containing the solved game of tic-tac-toe. Every position that can come up in a game (5,478 when x moves first,
+and the same number again when o does) is enumerated once and the minimax value and best moves of each are stored in a
+table. Only the canonical version of each position is kept (765 for each player to move first, see the symmetry
+module), so looking up a perfect move never has to search. The table is cached on disk next to the default A.I.
+(data/game_tree.npz) and is only rebuilt if that file is missing or out of date.
+
+Positions are identified by their base 3 codes (see symmetry.positionCode). Values are from the point of view of the
+player whose turn it is: WIN, DRAW or LOSS with perfect play from both sides.
+"""
+
+import os
+import copy
+import logging
+import time
+import numpy as np
+from symmetry import EMPTY, X, O, NUMCODES, POW3, positionCode, decodePosition, canonicalCode, canonicalMove, \
+    restoreMove, restoreMask
+
+
+_here = os.path.abspath(os.path.dirname(__file__))
+GAME_TREE_PATH = os.path.join(_here, os.path.join(os.path.join('..', 'data'), 'game_tree.npz'))
+# bump when the layout of the cached table changes so that old caches get rebuilt
+GAME_TREE_VERSION = 2
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+UNREACHABLE = -2  # value of positions that can't come up in a game
+
+LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+# first move (1-9) in every 9 bit move mask
+FIRSTMOVES = [next((i + 1 for i in range(9) if bits & (1 << i)), None) for bits in range(1 << 9)]
+# lines going through each space
+SPACELINES = [[line for line in LINES if space in line] for space in range(9)]
+
+
+def playerIndex(turn):
+    """
+    Returns 0 if it is x's turn and 1 if it is o's. turn can be 'x' or 'o', or 1 for x and 0 for o like
+    TTTBoard.setPiece
+    """
+
+    if turn == 'x' or turn == 1:
+        return 0
+    elif turn == 'o' or turn == 0:
+        return 1
+    raise ValueError("Invalid turn: {}. Turn should be either 'x' or 'o'".format(turn))
+
+
+def winner(cells):
+    """
+    Returns X or O if that player has three in a row on the given cells (see decodePosition), otherwise EMPTY
+    """
+
+    for a, b, c in LINES:
+        if cells[a] != EMPTY and cells[a] == cells[b] == cells[c]:
+            return cells[a]
+    return EMPTY
+
+
+def solve():
+    """
+    Enumerates every position reachable from an empty board (with either player moving first) and calculates its
+    minimax value and best moves. Only canonical positions are stored, see the symmetry module.
+    :return: (values, moves), (2, NUMCODES) arrays indexed by [player to move (see playerIndex), canonical code].
+    values holds WIN, DRAW, LOSS or UNREACHABLE and moves holds a 9 bit mask of the best moves on the canonical board
+    (bit n - 1 for move n)
+    """
+
+    values = np.full((2, NUMCODES), UNREACHABLE, dtype=np.int8)
+    moves = np.zeros((2, NUMCODES), dtype=np.uint16)
+
+    def search(player, code):
+        code = canonicalCode(code)[0]
+        if values[player, code] != UNREACHABLE:
+            return values[player, code]
+
+        cells = decodePosition(code)
+        if winner(cells) != EMPTY:
+            # the last move won the game, so whoever moves now has lost
+            values[player, code] = LOSS
+            return LOSS
+
+        piece = X if player == 0 else O
+        best = None
+        bestMoves = 0
+        for space in range(9):
+            if cells[space] == EMPTY:
+                value = -search(1 - player, code + piece * POW3[space])
+                if best is None or value > best:
+                    best = value
+                    bestMoves = 0
+                if value == best:
+                    bestMoves |= 1 << space
+
+        values[player, code] = DRAW if best is None else best
+        moves[player, code] = bestMoves
+        return values[player, code]
+
+    search(0, 0)
+    search(1, 0)
+    return values, moves
+
+
+class _OutOfNodes(Exception):
+    """
+    Raised by TTTMinimax when a search goes over its node budget
+    """
+
+
+class TTTMinimax(object):
+    """
+    Finds moves with an alpha-beta search instead of a lookup table, so it can be handicapped with a depth limit or a
+    node budget. Positions are stored in a transposition table under the smallest code of their rotations and
+    reflections, so symmetric positions are only searched once. Has the same getMove method as TTTNeuralNet and a
+    fitness score, so it can be used as an opponent in calcFitness.
+    """
+
+    # score of a won position, to which the number of empty spaces left is added so that quicker wins are preferred
+    WINSCORE = 100
+    # moves are tried in this order (center, corners then edges) after the best move found by an earlier search
+    MOVEORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, maxDepth=None, maxNodes=None):
+        """
+        Create the search
+        :param maxDepth: How many moves ahead to search. Positions at the depth limit are scored by counting the lines
+        each player can still win on. Defaults to searching to the end of the game
+        :param maxNodes: Largest number of positions to visit for each move. The search deepens one move at a time and
+        the move found by the last search to finish within the budget is played. Defaults to no limit
+        """
+
+        self.maxDepth = maxDepth if maxDepth is not None else 9
+        self.maxNodes = maxNodes
+        self.fitness = 0
+        self.table = {}  # (player, canonical code): (depth, score, bound, canonical best move)
+        self.nodes = 0
+        self.searchTime = 0.0
+        self._budget = None
+
+    def __str__(self):
+        """
+        Returns the search's settings and fitness score
+        """
+
+        return "TTTMinimax(maxDepth={}, maxNodes={}) with fitness {}".format(self.maxDepth, self.maxNodes,
+                                                                           self.fitness)
+
+    def nodesPerSecond(self):
+        """
+        Returns the number of positions visited per second spent searching
+        """
+
+        return self.nodes / self.searchTime if self.searchTime > 0 else 0.0
+
+    def resetStats(self):
+        """
+        Resets the node count and search time
+        """
+
+        self.nodes = 0
+        self.searchTime = 0.0
+
+    def snapshot(self):
+        """
+        Returns a copy of the search with its own transposition table, for TTTrainer.checkpoint
+        """
+
+        search = copy.copy(self)
+        search.table = dict(self.table)
+        return search
+
+    @staticmethod
+    def _evaluate(cells, piece):
+        """
+        Scores a position at the depth limit for the player with piece: the number of lines only it has pieces on minus
+        the number of lines only its opponent has pieces on
+        """
+
+        score = 0
+        for line in LINES:
+            pieces = set(cells[space] for space in line)
+            pieces.discard(EMPTY)
+            if len(pieces) == 1:
+                score += 1 if piece in pieces else -1
+        return score
+
+    def _search(self, cells, code, player, depth, alpha, beta):
+        """
+        Negamax search with alpha-beta pruning. Returns the score of the position for player (see playerIndex) and
+        the best move (space 0-8) or None if none was searched.
+        """
+
+        self.nodes += 1
+        if self._budget is not None and self.nodes > self._budget:
+            raise _OutOfNodes()
+
+        empties = cells.count(EMPTY)
+        if empties == 0:
+            return 0, None
+        depth = min(depth, empties)
+        piece = X if player == 0 else O
+        if depth == 0:
+            return self._evaluate(cells, piece), None
+
+        canonical, symmetry = canonicalCode(code)
+        key = (player, canonical)
+        tableMove = None
+        if key in self.table:
+            entryDepth, score, bound, move = self.table[key]
+            tableMove = restoreMove(move, symmetry)
+            if entryDepth >= depth and (bound == self.EXACT or (bound == self.LOWER and score >= beta) or
+                                        (bound == self.UPPER and score <= alpha)):
+                return score, tableMove
+
+        startAlpha = alpha
+        best = None
+        bestMove = None
+        order = self.MOVEORDER
+        if tableMove is not None:
+            order = (tableMove, ) + tuple(space for space in order if space != tableMove)
+        for space in order:
+            if cells[space] != EMPTY:
+                continue
+            cells[space] = piece
+            if any(cells[a] == cells[b] == cells[c] for a, b, c in SPACELINES[space]):
+                score = self.WINSCORE + empties - 1
+            else:
+                score = -self._search(cells, code + piece * POW3[space], 1 - player, depth - 1, -beta, -alpha)[0]
+            cells[space] = EMPTY
+
+            if best is None or score > best:
+                best = score
+                bestMove = space
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        bound = self.UPPER if best <= startAlpha else self.LOWER if best >= beta else self.EXACT
+        self.table[key] = (depth, best, bound, canonicalMove(bestMove, symmetry))
+        return best, bestMove
+
+    def getMove(self, turn, sBoard):
+        """
+        Searches for the best move for the player whose turn it is and returns it in the 'int' notation (1-9) like
+        TTTNeuralNet.getMove, or None if the game is over (which ends the game in ai.calcFitness).
+        :param turn: x or o for who the current turn it is, or 1 for x and 0 for o like TTTBoard.setPiece
+        :param sBoard: String representation of a tic tac toe board, or a TTTBoard object
+        """
+
+        start = time.time()
+        player = playerIndex(turn)
+        code = positionCode(sBoard)
+        cells = decodePosition(code)
+        empty = [space for space in self.MOVEORDER if cells[space] == EMPTY]
+        if not empty or winner(cells) != EMPTY:
+            return None
+
+        self._budget = self.nodes + self.maxNodes if self.maxNodes is not None else None
+        move = empty[0]
+        try:
+            for depth in range(1, min(self.maxDepth, len(empty)) + 1):
+                score, found = self._search(cells, code, player, depth, -float('inf'), float('inf'))
+                move = found
+                if abs(score) >= self.WINSCORE:
+                    break  # the game has been solved from here, searching deeper won't change the move
+        except _OutOfNodes:
+            logging.debug("Node budget of {} ran out, playing {}".format(self.maxNodes, move + 1))
+        finally:
+            self._budget = None
+            self.searchTime += time.time() - start
+        return move + 1
+
+
+class TTTOracle(object):
+    """
+    Plays perfect tic-tac-toe by looking moves up in the solved game tree.
+    """
+
+    def __init__(self, values, moves):
+        """
+        Create the oracle. Use TTTOracle.load instead of calling this directly.
+        :param values: Table of position values, see solve
+        :param moves: Table of best move masks, see solve
+        """
+
+        self.values = values
+        self.moves = moves
+
+    @classmethod
+    def load(cls, path=GAME_TREE_PATH):
+        """
+        Loads the game tree cached at path, solving the game and saving it there first if the cache is missing or out
+        of date.
+        """
+
+        if os.path.exists(path):
+            with np.load(path) as tree:
+                if int(tree['version']) == GAME_TREE_VERSION:
+                    values = np.full((2, NUMCODES), UNREACHABLE, dtype=np.int8)
+                    moves = np.zeros((2, NUMCODES), dtype=np.uint16)
+                    values[tree['players'], tree['codes']] = tree['values']
+                    moves[tree['players'], tree['codes']] = tree['moves']
+                    return cls(values, moves)
+            logging.info("Game tree at {} is out of date".format(path))
+
+        logging.info("Solving game tree")
+        values, moves = solve()
+        try:
+            # only the reachable positions are saved
+            players, codes = np.nonzero(values != UNREACHABLE)
+            with open(path, 'wb') as f:
+                np.savez(f, version=GAME_TREE_VERSION, players=players.astype(np.int8), codes=codes.astype(np.int16),
+                         values=values[players, codes], moves=moves[players, codes])
+            logging.info("Game tree saved to {}".format(path))
+        except (IOError, OSError), e:
+            logging.warning("Unable to cache game tree at {}: {}".format(path, e))
+        return cls(values, moves)
+
+    def __len__(self):
+        """
+        Returns the number of canonical positions in the table
+        """
+
+        return int(np.count_nonzero(self.values != UNREACHABLE))
+
+    def _lookup(self, turn, board):
+        """
+        Returns the (player index, canonical code) of a position and the symmetry that turns the position into its
+        canonical version, raising a ValueError if it can't come up in a game
+        """
+
+        player = playerIndex(turn)
+        code, symmetry = canonicalCode(positionCode(board))
+        if self.values[player, code] == UNREACHABLE:
+            raise ValueError("Position {} with {} to move can't be reached in a game".format(
+                decodePosition(positionCode(board)), 'xo'[player]))
+        return (player, code), symmetry
+
+    def getValue(self, turn, board):
+        """
+        Returns the value (WIN, DRAW or LOSS) of a position for the player whose turn it is
+        :param turn: x or o for who the current turn it is
+        :param board: TTTBoard object or string representation of a tic tac toe board
+        """
+
+        return int(self.values[self._lookup(turn, board)[0]])
+
+    def getBestMoves(self, turn, board):
+        """
+        Returns a list of every move (in the 'int' notation, 1-9) that gets the best result for the player whose
+        turn it is. The list is empty if the game is over.
+        """
+
+        index, symmetry = self._lookup(turn, board)
+        mask = restoreMask(int(self.moves[index]), symmetry)
+        return [i + 1 for i in range(9) if mask & (1 << i)]
+
+    def getMove(self, turn, sBoard):
+        """
+        Returns the first of the best moves for the player whose turn it is, in the 'int' notation (1-9) like
+        TTTNeuralNet.getMove, or None if the game is over.
+        :param turn: x or o for who the current turn it is
+        :param sBoard: String representation of a tic tac toe board, or a TTTBoard object
+        """
+
+        index, symmetry = self._lookup(turn, sBoard)
+        return FIRSTMOVES[restoreMask(int(self.moves[index]), symmetry)]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Module for coding tic-tac-toe positions and folding together the 8 rotations and reflections of a board, which are all
+the same position as far as the game is concerned. Tables built on top of it (like the game tree in the solver module
+and TTTMinimax's transposition table) only need to store the canonical version of each position, which cuts them down
+by about 8 times.
+
+Positions are coded in base 3, one digit per space going left to right, top to bottom (space n of the 1-9 'int'
+notation is digit n - 1), with 0 for an empty space, 1 for an x and 2 for an o. The canonical code of a position is the
+smallest code of any of its rotations and reflections. Spaces are numbered 0-8 in this module.
+"""
+
+import numpy as np
+
+
+EMPTY = 0
+X = 1
+O = 2
+
+NUMCODES = 3 ** 9
+POW3 = [3 ** i for i in range(9)]
+# sum of POW3 for the spaces set in every 9 bit mask, used to code TTTBitBoards without looking at each space
+BITCODES = [sum(POW3[i] for i in range(9) if bits & (1 << i)) for bits in range(1 << 9)]
+
+# the 8 ways to rotate and reflect a board. A transformed board's space i holds the piece found in space
+# symmetry[i] of the original board
+SYMMETRIES = [(0, 1, 2, 3, 4, 5, 6, 7, 8), (6, 3, 0, 7, 4, 1, 8, 5, 2), (8, 7, 6, 5, 4, 3, 2, 1, 0),
+              (2, 5, 8, 1, 4, 7, 0, 3, 6), (2, 1, 0, 5, 4, 3, 8, 7, 6), (6, 7, 8, 3, 4, 5, 0, 1, 2),
+              (0, 3, 6, 1, 4, 7, 2, 5, 8), (8, 5, 2, 7, 4, 1, 6, 3, 0)]
+# INVERSES[symmetry][space] is the space of the transformed board that holds the piece from space of the original
+INVERSES = [tuple(symmetry.index(space) for space in range(9)) for symmetry in SYMMETRIES]
+
+
+def _transformTable():
+    """
+    Returns a (len(SYMMETRIES), NUMCODES) array holding the code of every position after each symmetry is applied
+    """
+
+    digits = (np.arange(NUMCODES)[:, None] // np.array(POW3)) % 3
+    return np.array([np.dot(digits[:, list(symmetry)], POW3) for symmetry in SYMMETRIES])
+
+
+def _maskTable():
+    """
+    Returns MASKS[symmetry][mask], which maps a 9 bit mask of spaces on a transformed board back to the mask of the
+    same spaces on the original board
+    """
+
+    return [[sum(1 << symmetry[i] for i in range(9) if mask & (1 << i)) for mask in range(1 << 9)]
+            for symmetry in SYMMETRIES]
+
+
+TRANSFORMS = _transformTable()
+MASKS = _maskTable()
+
+
+def positionCode(board):
+    """
+    Returns the base 3 code of a board
+    :param board: TTTBoard (or TTTBitBoard) object, or a string representation of a tic tac toe board
+    """
+
+    if hasattr(board, 'xBits'):
+        return BITCODES[board.xBits] + 2 * BITCODES[board.oBits]
+    if hasattr(board, 'sBoard'):
+        board = board.sBoard
+
+    code = 0
+    for i, piece in enumerate(b for a in board for b in a):
+        if piece == 'x':
+            code += POW3[i]
+        elif piece == 'o':
+            code += 2 * POW3[i]
+    return code
+
+
+def decodePosition(code):
+    """
+    Returns a list of the 9 spaces (EMPTY, X or O) of the position with the given code
+    """
+
+    return [(code // POW3[i]) % 3 for i in range(9)]
+
+
+def transformCode(code, symmetry):
+    """
+    Returns the code of the position after the given symmetry (an index into SYMMETRIES) is applied to it
+    """
+
+    return int(TRANSFORMS[symmetry, code])
+
+
+def canonicalCode(code):
+    """
+    Returns (canonical code, symmetry), where symmetry is the index of the one in SYMMETRIES that turns the position
+    into its canonical version
+    """
+
+    codes = TRANSFORMS[:, code]
+    symmetry = int(np.argmin(codes))
+    return int(codes[symmetry]), symmetry
+
+
+def canonicalKey(board):
+    """
+    Returns the canonical code of a board, which is the same for all of its rotations and reflections
+    :param board: TTTBoard (or TTTBitBoard) object, or a string representation of a tic tac toe board
+    """
+
+    return canonicalCode(positionCode(board))[0]
+
+
+def canonicalMove(space, symmetry):
+    """
+    Maps a space on the original board to the same space on the board transformed by symmetry
+    """
+
+    return INVERSES[symmetry][space]
+
+
+def restoreMove(space, symmetry):
+    """
+    Maps a space on a board transformed by symmetry back to the same space on the original board, undoing
+    canonicalMove
+    """
+
+    return SYMMETRIES[symmetry][space]
+
+
+def restoreMask(mask, symmetry):
+    """
+    Maps a 9 bit mask of spaces on a board transformed by symmetry back to the original board
+    """
+
+    return MASKS[symmetry][mask]
@@ -10,12 +10,14 @@ import logging
 from shutil import copyfile
 import webbrowser
 import threading
-import pygame
+import gui
+import profiling
 from boards import TTTGraphicalBoard
 import ai
 from players import TTTHumanPlayer, TTTAiPlayer, TTTPlayer
 
 
+pygame = gui.load()  # everything in this module is graphical
 _here = os.path.abspath(os.path.dirname(__file__))
 BACKGROUND_PATH = os.path.join(_here, os.path.join(os.path.join('..', 'data'), 'background.jpg'))
 PATH_TO_AI = ai.DEFAULT_AI_PATH
@@ -36,7 +38,8 @@ class TTTGame(object):
     """
 
     def __init__(self, x_first=True, players=(), singleplayer=False,
-                 screen=None, size=(620, 620), board_size=(600, 600), board_offset=(10, 10), lw=10):
+                 screen=None, size=(620, 620), board_size=(600, 600), board_offset=(10, 10), lw=10,
+                 profile_path=None, profile_frames=600):
         """
         Create the game
         :param x_first: If True, then x will go first, otherwise o will.
@@ -49,6 +52,9 @@ class TTTGame(object):
         if singleplayer is false then another human player will be assigned to the x piece.
         :param screen: Pygame screen object to use for the game.
         :param screen, size, board_size, board_offset, lw: options to be passed to the TTTGraphicalBoard.
+        :param profile_path: If given, the first profile_frames frames of each call of main are run under cProfile and
+        the stats are saved to <profile_path>.prof with a text report next to it (see profiling.merge)
+        :param profile_frames: Number of frames to profile
         :return: None
         """
 
@@ -65,6 +71,8 @@ class TTTGame(object):
         self.fps = 60
         self.exit = False
         self.gameOver = False
+        self.profilePath = profile_path
+        self.profileFrames = profile_frames
         self.turn = 'x' if x_first is True else 'o'
 
         self.bs = board_size
@@ -81,17 +89,12 @@ class TTTGame(object):
                         self.players[player.gp] = player
                 else:
                     # this bit of code checks to make sure the getMove() function of the TTTPlayer instance is
-                    # overwritten.
-                    try:
-                        result = player.getMove()
-                        assert result != 'myMove'  # returned by default getMove() func that needs to be overwritten
-                    except TypeError:  # raised when more or less args are passed than expected
-                        pass
-                    except AssertionError:
+                    # overwritten. Calling it isn't possible yet since the player doesn't have a game to play on
+                    if type(player).getMove.__func__ is TTTPlayer.getMove.__func__:
                         raise AttributeError("The getMove method of the player instance with game piece {} was not "
                                              "overwritten!".format(player.gp))
 
-                    self.players[player.gp] == player  # this is unreachable if the assertion fails
+                    self.players[player.gp] = player
             # makes other player a human player if singleplayer is false or it is true and an ai player was given,
             # makes other player an ai player if singleplayer is true and a human player was given
             if len(players) == 1:
@@ -127,6 +130,11 @@ class TTTGame(object):
         logging.info("Starting game")
         self.board.initUI()
         winner = None
+        profiler = None
+        if self.profilePath is not None:
+            profiler = profiling.TTTProfiler(self.profilePath)
+            profiler.start()
+        frames = 0
 
         while not self.exit:
             for event in pygame.event.get():
@@ -151,13 +159,31 @@ class TTTGame(object):
                     elif event.key in [pygame.K_ESCAPE, pygame.K_DELETE, pygame.K_BACKSPACE]:
                         self.exit = True
 
-            pygame.display.flip()
+            with profiling.timed('flip'):
+                pygame.display.flip()
             self.clock.tick(self.fps)
 
+            frames += 1
+            if profiler is not None and frames == self.profileFrames:
+                self._saveProfile(profiler, frames)
+                profiler = None
+
+        if profiler is not None:
+            self._saveProfile(profiler, frames)
+
         self.exit = False
         self.gameOver = False
         self.board.reset()
         return winner
+
+    def _saveProfile(self, profiler, frames):
+        """
+        Stops profiling the game loop and merges the stats into the report at self.profilePath
+        """
+
+        profiler.stop()
+        profiling.merge(self.profilePath)
+        logging.info("Profile of {} frames saved to {}.prof".format(frames, self.profilePath))
         
     
 def checkMenuInstance(func):
@@ -0,0 +1,633 @@
+#!/usr/bin/env python
+"""
+Module containing the persistent worker pool used by TTTrainer. Instead of starting new processes every generation and
+pickling every pair of nets into a queue, the pool's processes are started once per training run and each keeps its own
+copy of both populations' weights. Every generation only the nets that changed are sent to the workers (nets are
+matched to slots by the digest of their weights, so shuffling a population costs nothing), followed by the pairs of
+nets to play. Workers play their pairs with the lockstep engine and send back the fitness changes of each game.
+
+TTTSharedPool goes one step further and keeps both populations in shared memory. The trainer copies the weights into
+the shared arrays, workers are only sent ranges (or pairs) of net indices to play and write the fitness they calculate
+into their own row of a shared fitness array, so no weights are sent between processes at all.
+
+Neither pool gives each worker a fixed share of the games. The games are split into chunks (see splitWork) that are put
+into one queue shared by all of the workers, and each worker takes the next chunk as soon as it is done with the last
+one, so a worker slowed down by a busy core or by longer games plays fewer chunks instead of holding up the others.
+Both pools count the time each worker spends playing, so that the trainer can report how busy each one was.
+
+TTTThreadPool plays the games in threads of the trainer's process instead, so nothing has to be pickled or copied at
+all. Python code only runs in one thread at a time, but numpy lets go of the GIL while it works on whole arrays, which
+is where the lockstep engine spends most of its time when the chunks are large. TTTWorkerPool and TTTThreadPool have
+the same methods (update, play, profile and close) and counters, so the trainer uses them the same way.
+"""
+
+import logging
+import math
+import multiprocessing as mp
+import Queue
+import threading
+import time
+import traceback
+import numpy as np
+import ai
+import matches
+import profiling
+
+
+CHUNKS_PER_WORKER = 4  # chunks each worker takes on average when no chunk size is given
+
+
+def splitWork(count, workers, chunkSize=None):
+    """
+    Splits count games into chunks to be taken from a shared queue by the workers. More chunks balance the workers
+    better, fewer and larger ones cost less to send and let the lockstep engine play more games at once.
+    :param workers: Number of workers taking the chunks
+    :param chunkSize: Number of games in each chunk (the last one can be smaller). Defaults to enough games for each
+    worker to take CHUNKS_PER_WORKER chunks
+    :return: List of arrays of the indices of the games in each chunk
+    """
+
+    if chunkSize is None:
+        chunkSize = int(math.ceil(count / float(max(workers, 1) * CHUNKS_PER_WORKER)))
+    chunkSize = max(int(chunkSize), 1)
+    return [np.arange(start, min(start + chunkSize, count)) for start in range(0, count, chunkSize)]
+
+
+def _playChunks(work, play):
+    """
+    Takes chunks from the shared work queue and calls play with each one until it gets None
+    :return: Seconds spent in play and the number of games it returned
+    """
+
+    busy = 0.0
+    games = 0
+    while True:
+        task = work.get()
+        if task is None:
+            return busy, games
+        start = time.time()
+        games += play(*task)
+        busy += time.time() - start
+
+
+def _collect(pool, results, chunks, deltas, failure):
+    """
+    Reads the results of every chunk and the ('idle', worker, (seconds spent playing, games played)) message of every
+    worker of pool from results. The fitness changes of each chunk are written into its rows of deltas (unless the
+    worker sent None in their place) and the forward passes, playing time and games of the workers are added to the
+    pool's counters.
+    :param failure: Start of the message of the error raised if a worker sends back an error
+    """
+
+    for x in range(len(chunks) + pool.numWorkers):
+        chunk, result, extra = results.get()
+        if chunk == 'error':
+            raise RuntimeError("{}:\n{}".format(failure, result))
+        elif chunk == 'idle':
+            pool.busyTime[result] += extra[0]
+            pool.gamesPlayed[result] += extra[1]
+        else:
+            if result is not None:
+                deltas[chunks[chunk]] = result
+            pool.forwardPasses += extra
+
+
+def _profile(profiler, prefix):
+    """
+    Handles a profile message in a worker: saves the stats of the profiler that was running, if any, and starts a new
+    one saving under prefix, unless prefix is None.
+    :return: The new profiler, or None
+    """
+
+    if profiler is not None:
+        profiler.stop()
+    if prefix is None:
+        return None
+    profiler = profiling.TTTProfiler(prefix)
+    profiler.start()
+    return profiler
+
+
+def _poolWorker(inbox, work, results, seed=None, index=0):
+    """
+    Loop run by each process of a TTTWorkerPool. Reads messages from inbox until it is told to stop:
+    ('update', population, slots, weights, biases) copies the given rows into that population's slots,
+    ('play', ) takes (chunk, pairs) tasks from the shared work queue until it gets None, plays the pairs of slots of
+    each and puts (chunk, fitness changes, forward passes) into results, then puts ('idle', index, (seconds spent
+    playing, games played)) into results, ('profile', prefix) starts profiling under prefix (or stops if it is None,
+    see _profile) and puts ('profiled', None, 0) into results, ('stop', ) ends the loop. seed and index are passed
+    to ai.seedWorker.
+    """
+
+    ai.seedWorker(seed, index)
+    logging.info("Pool worker starting")
+    tensors = [[[], []], [[], []]]
+    total = 0
+    profiler = None
+
+    def play(chunk, pairs):
+        passes = ai.TTTNeuralNet.forwardPasses
+        with profiling.timed('playLockstep'):
+            deltas = matches.playLockstep(tensors[0], tensors[1], pairs)
+        results.put((chunk, deltas.astype(np.int32), ai.TTTNeuralNet.forwardPasses - passes))
+        return len(pairs)
+
+    while True:
+        message = inbox.get()
+        try:
+            if message[0] == 'update':
+                population, slots, weights, biases = message[1:]
+                for arrays, rows in [(tensors[population][0], weights), (tensors[population][1], biases)]:
+                    for layer, layerRows in enumerate(rows):
+                        if layer == len(arrays):
+                            arrays.append(np.empty((0, ) + layerRows.shape[1:]))
+                        if len(slots) > 0 and slots.max() >= len(arrays[layer]):
+                            grown = np.empty((slots.max() + 1, ) + layerRows.shape[1:])
+                            grown[:len(arrays[layer])] = arrays[layer]
+                            arrays[layer] = grown
+                        arrays[layer][slots] = layerRows
+            elif message[0] == 'play':
+                busy, games = _playChunks(work, play)
+                results.put(('idle', index, (busy, games)))
+                total += games
+            elif message[0] == 'profile':
+                profiler = _profile(profiler, message[1])
+                results.put(('profiled', None, 0))
+            else:
+                break
+        except Exception:
+            results.put(('error', traceback.format_exc(), 0))
+    _profile(profiler, None)
+    logging.info("Pool worker ending, {} games played".format(total))
+
+
+class TTTSlotTable(object):
+    """
+    Keeps track of which slot of a worker's copy of a population each net is stored in. Nets are identified by the
+    digest of their weights, so a net keeps its slot for as long as it doesn't change.
+    """
+
+    def __init__(self):
+        """
+        Create the table
+        """
+
+        self.slots = {}  # digest: slot
+        self.size = 0
+
+    def update(self, tensors):
+        """
+        Assigns a slot to every net in tensors, reusing the slots of nets that haven't changed.
+        :param tensors: (weights, biases) of a population, see TTTPopulation.getTensors
+        :return: Array of the slot of each net, and an array of the indices of the nets that need to be sent
+        """
+
+        digests = matches.netDigests(tensors)
+        kept = set(digests)
+        free = sorted(slot for digest, slot in self.slots.items() if digest not in kept)
+        slots = dict((digest, slot) for digest, slot in self.slots.items() if digest in kept)
+
+        netSlots = np.empty(len(digests), dtype=int)
+        changed = []
+        for index, digest in enumerate(digests):
+            if digest not in slots:
+                if free:
+                    slots[digest] = free.pop(0)
+                else:
+                    slots[digest] = self.size
+                    self.size += 1
+                changed.append(index)
+            netSlots[index] = slots[digest]
+
+        self.slots = slots
+        return netSlots, np.array(changed, dtype=int)
+
+
+class TTTWorkerPool(object):
+    """
+    Pool of long lived worker processes that play games between the nets of two populations.
+    """
+
+    def __init__(self, workers=None, seed=None, chunkSize=None):
+        """
+        Create the pool and start its processes.
+        :param workers: Number of worker processes to start. Defaults to one for each cpu
+        :param seed: Seed to give each worker its own random stream from, see ai.seedWorker
+        :param chunkSize: Number of games the workers take from the shared queue at a time, see splitWork
+        """
+
+        self.numWorkers = workers if workers is not None else mp.cpu_count()
+        self.chunkSize = chunkSize
+        self.inboxes = [mp.Queue() for x in range(self.numWorkers)]
+        self.work = mp.Queue()
+        self.results = mp.Queue()
+        self.tables = [TTTSlotTable(), TTTSlotTable()]
+        self.netSlots = [np.empty(0, dtype=int), np.empty(0, dtype=int)]
+        # made or spent by the workers, over every call of play
+        self.forwardPasses = 0
+        self.busyTime = np.zeros(self.numWorkers)  # seconds each worker spent playing
+        self.gamesPlayed = np.zeros(self.numWorkers, dtype=int)  # games played by each worker
+        self.playTime = 0.0  # seconds spent waiting for the workers in play
+        self.processes = []
+        for index, inbox in enumerate(self.inboxes):
+            process = mp.Process(target=_poolWorker, args=(inbox, self.work, self.results, seed, index))
+            process.daemon = True
+            process.start()
+            self.processes.append(process)
+
+    def update(self, tensors1, tensors2):
+        """
+        Sends the nets of both populations that changed since the last update to every worker.
+        :param tensors1: (weights, biases) of the first population, see TTTPopulation.getTensors
+        :param tensors2: (weights, biases) of the second population
+        :return: Number of nets that were sent
+        """
+
+        sent = 0
+        for population, tensors in enumerate([tensors1, tensors2]):
+            self.netSlots[population], changed = self.tables[population].update(tensors)
+            message = ('update', population, self.netSlots[population][changed],
+                       [w[changed] for w in tensors[0]], [b[changed] for b in tensors[1]])
+            for inbox in self.inboxes:
+                inbox.put(message)
+            sent += len(changed)
+        return sent
+
+    def play(self, pairs):
+        """
+        Splits the pairs into chunks for the workers to take and waits for all of the games to be played.
+        :param pairs: (M, 2) array of net indices into the populations given to the last update
+        :return: (M, 2) array of the fitness changes of each game, see matches.playLockstep
+        """
+
+        start = time.time()
+        slotPairs = np.column_stack([self.netSlots[0][pairs[:, 0]], self.netSlots[1][pairs[:, 1]]])
+        chunks = splitWork(len(pairs), self.numWorkers, self.chunkSize)
+        for inbox in self.inboxes:
+            inbox.put(('play', ))
+        for chunk, indices in enumerate(chunks):
+            self.work.put((chunk, slotPairs[indices]))
+        for inbox in self.inboxes:
+            self.work.put(None)  # one for each worker, which goes back to its inbox after taking it
+
+        deltas = np.empty((len(pairs), 2))
+        _collect(self, self.results, chunks, deltas, "A pool worker failed")
+        self.playTime += time.time() - start
+        return deltas
+
+    def profile(self, prefix):
+        """
+        Starts profiling every worker, saving their stats under prefix (see profiling.TTTProfiler), and waits for them
+        all to start. The stats of the last prefix are saved when the workers are given a new one, or None to stop.
+        """
+
+        for inbox in self.inboxes:
+            inbox.put(('profile', prefix))
+        for x in range(self.numWorkers):
+            reply, error, passes = self.results.get()
+            if reply == 'error':
+                raise RuntimeError("A pool worker failed:\n{}".format(error))
+
+    def close(self):
+        """
+        Stops the worker processes and closes the queues.
+        """
+
+        for inbox in self.inboxes:
+            inbox.put(('stop', ))
+        for process in self.processes:
+            process.join()
+        for queue in self.inboxes + [self.work, self.results]:
+            queue.close()
+
+
+def _threadWorker(index, inbox, work, results, tensors):
+    """
+    Loop run by each thread of a TTTThreadPool. Reads messages from inbox until it gets None: ('play', ) takes
+    (chunk, pairs) tasks from the shared work queue until it gets None, plays the pairs of nets of tensors (a list
+    holding the tensors of both populations, see TTTThreadPool.update) and puts (chunk, fitness changes, 0) into
+    results, then puts ('idle', index, (seconds spent playing, games played)) into results. ('profile', prefix) starts
+    profiling the thread under prefix (or stops if it is None, see _profile) and puts ('profiled', None, 0) into
+    results. The forward passes are counted by ai.TTTNeuralNet.forwardPasses, which the threads share with the
+    trainer.
+    """
+
+    profiler = None
+
+    def play(chunk, pairs):
+        with profiling.timed('playLockstep'):
+            deltas = matches.playLockstep(tensors[0], tensors[1], pairs)
+        results.put((chunk, deltas, 0))
+        return len(pairs)
+
+    for message in iter(inbox.get, None):
+        try:
+            if message[0] == 'play':
+                busy, games = _playChunks(work, play)
+                results.put(('idle', index, (busy, games)))
+            elif message[0] == 'profile':
+                profiler = _profile(profiler, message[1])
+                results.put(('profiled', None, 0))
+        except Exception:
+            results.put(('error', traceback.format_exc(), 0))
+    _profile(profiler, None)
+
+
+class TTTThreadPool(object):
+    """
+    Pool of threads that play games between the nets of two populations in this process.
+    """
+
+    def __init__(self, workers=None, chunkSize=None):
+        """
+        Create the pool and start its threads.
+        :param workers: Number of threads to start. Defaults to one for each cpu
+        :param chunkSize: Number of games the threads take from the shared queue at a time, see splitWork. Larger
+        chunks make larger batches, which spend more of their time in numpy with the GIL released
+        """
+
+        self.numWorkers = workers if workers is not None else mp.cpu_count()
+        self.chunkSize = chunkSize
+        self.tensors = [None, None]
+        self.inboxes = [Queue.Queue() for x in range(self.numWorkers)]
+        self.work = Queue.Queue()
+        self.results = Queue.Queue()
+        # spent by the threads, over every call of play. Their forward passes are counted by TTTNeuralNet.forwardPasses
+        self.forwardPasses = 0
+        self.busyTime = np.zeros(self.numWorkers)  # seconds each thread spent playing
+        self.gamesPlayed = np.zeros(self.numWorkers, dtype=int)  # games played by each thread
+        self.playTime = 0.0  # seconds spent waiting for the threads in play
+        self.threads = []
+        for index, inbox in enumerate(self.inboxes):
+            thread = threading.Thread(target=_threadWorker, args=(index, inbox, self.work, self.results, self.tensors),
+                                      name='worker{}'.format(index))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def update(self, tensors1, tensors2):
+        """
+        Gives the threads the nets of both populations to play. They are shared with the threads, not copied.
+        :param tensors1: (weights, biases) of the first population, see TTTPopulation.getTensors
+        :param tensors2: (weights, biases) of the second population
+        :return: Number of nets that were sent, always 0
+        """
+
+        self.tensors[:] = [tensors1, tensors2]
+        return 0
+
+    def play(self, pairs):
+        """
+        Splits the pairs into chunks for the threads to take and waits for all of the games to be played.
+        :param pairs: (M, 2) array of net indices into the populations given to the last update
+        :return: (M, 2) array of the fitness changes of each game, see matches.playLockstep
+        """
+
+        start = time.time()
+        chunks = splitWork(len(pairs), self.numWorkers, self.chunkSize)
+        for inbox in self.inboxes:
+            inbox.put(('play', ))
+        for chunk, indices in enumerate(chunks):
+            self.work.put((chunk, pairs[indices]))
+        for inbox in self.inboxes:
+            self.work.put(None)  # one for each thread, which goes back to its inbox after taking it
+
+        deltas = np.empty((len(pairs), 2))
+        _collect(self, self.results, chunks, deltas, "A pool thread failed")
+        self.playTime += time.time() - start
+        return deltas
+
+    def profile(self, prefix):
+        """
+        Starts profiling every thread, saving their stats under prefix (see profiling.TTTProfiler), and waits for them
+        all to start. The stats of the last prefix are saved when the threads are given a new one, or None to stop.
+        """
+
+        for inbox in self.inboxes:
+            inbox.put(('profile', prefix))
+        for x in range(self.numWorkers):
+            reply, error, passes = self.results.get()
+            if reply == 'error':
+                raise RuntimeError("A pool thread failed:\n{}".format(error))
+
+    def close(self):
+        """
+        Stops the threads.
+        """
+
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+def _sharedArrays(capacity, workers):
+    """
+    Allocates the shared memory for one population of a TTTSharedPool.
+    :return: List of (RawArray, shape) for the weights and biases of each layer, followed by the fitness array which
+    holds one row for each worker
+    """
+
+    shapes = [(capacity, ) + shape for shape in ai.TTTTensorPopulation.SHAPES]
+    shapes += [(capacity, shape[0]) for shape in ai.TTTTensorPopulation.SHAPES]
+    shapes.append((workers, capacity))
+    return [(mp.RawArray('d', int(np.prod(shape))), shape) for shape in shapes]
+
+
+def _sharedViews(arrays):
+    """
+    Wraps the RawArrays made by _sharedArrays in numpy arrays.
+    :return: ((weights, biases), fitness)
+    """
+
+    views = [np.frombuffer(raw, dtype=float).reshape(shape) for raw, shape in arrays]
+    layers = len(ai.TTTTensorPopulation.SHAPES)
+    return (views[:layers], views[layers:layers * 2]), views[-1]
+
+
+def _sharedWorker(index, arrays, tasks, work, done, seed=None):
+    """
+    Loop run by each process of a TTTSharedPool. Reads messages from tasks until it gets None:
+    ('play', deltas) takes (chunk, task) tasks from the shared work queue until it gets None. A task is either
+    ((start1, stop1), (start2, stop2)) ranges, in which case every net in the first range of the first population plays
+    every net in the second range of the second population, or an (M, 2) array of the pairs of nets to play. The
+    fitness the nets earned is added to row index of the shared fitness arrays and (chunk, fitness changes of each
+    game, forward passes) is put into done after each task, with None in place of the fitness changes unless deltas
+    is True, then ('idle', index, (seconds spent playing, games played)) once the worker is done. ('profile', prefix)
+    starts profiling under prefix (or stops if it is None, see _profile) and puts ('profiled', None, 0) into done.
+    seed and index are passed to ai.seedWorker.
+    """
+
+    ai.seedWorker(seed, index)
+    logging.info("Shared pool worker starting")
+    (tensors1, fitness1), (tensors2, fitness2) = [_sharedViews(population) for population in arrays]
+    total = 0
+    profiler = None
+
+    def play(chunk, task, sendDeltas):
+        if isinstance(task, np.ndarray):
+            pairs = task
+        else:
+            (start1, stop1), (start2, stop2) = task
+            pairs = matches.allPairs(stop1 - start1, stop2 - start2) + [start1, start2]
+        passes = ai.TTTNeuralNet.forwardPasses
+        with profiling.timed('playLockstep'):
+            deltas = matches.playLockstep(tensors1, tensors2, pairs)
+        gained1, gained2 = matches.reduceFitness(pairs, deltas, fitness1.shape[1], fitness2.shape[1])
+        fitness1[index] += gained1
+        fitness2[index] += gained2
+        done.put((chunk, deltas.astype(np.int32) if sendDeltas else None, ai.TTTNeuralNet.forwardPasses - passes))
+        return len(pairs)
+
+    for message in iter(tasks.get, None):
+        try:
+            if message[0] == 'play':
+                busy, games = _playChunks(work, lambda chunk, task: play(chunk, task, message[1]))
+                done.put(('idle', index, (busy, games)))
+                total += games
+            elif message[0] == 'profile':
+                profiler = _profile(profiler, message[1])
+                done.put(('profiled', None, 0))
+        except Exception:
+            done.put(('error', traceback.format_exc(), 0))
+    _profile(profiler, None)
+    logging.info("Shared pool worker ending, {} games played".format(total))
+
+
+class TTTSharedPool(object):
+    """
+    Pool of long lived worker processes that play games between two populations kept in shared memory.
+    """
+
+    def __init__(self, capacity, workers=None, seed=None, chunkSize=None):
+        """
+        Create the pool and start its processes.
+        :param capacity: Largest population the shared arrays can hold. Loading a larger one restarts the pool with
+        more room.
+        :param workers: Number of worker processes to start. Defaults to one for each cpu
+        :param seed: Seed to give each worker its own random stream from, see ai.seedWorker
+        :param chunkSize: Number of games the workers take from the shared queue at a time, see splitWork
+        """
+
+        self.numWorkers = workers if workers is not None else mp.cpu_count()
+        self.seed = seed
+        self.chunkSize = chunkSize
+        self.capacity = capacity
+        self.sizes = [0, 0]
+        # made or spent by the workers, over every call of play
+        self.forwardPasses = 0
+        self.busyTime = np.zeros(self.numWorkers)  # seconds each worker spent playing
+        self.gamesPlayed = np.zeros(self.numWorkers, dtype=int)  # games played by each worker
+        self.playTime = 0.0  # seconds spent waiting for the workers in play
+        self.profilePrefix = None  # prefix the workers are profiling under, see profile
+        self._start()
+
+    def _start(self):
+        """
+        Allocates the shared arrays and starts the worker processes.
+        """
+
+        self.arrays = [_sharedArrays(self.capacity, self.numWorkers) for population in range(2)]
+        self.views = [_sharedViews(population) for population in self.arrays]
+        self.tasks = [mp.Queue() for x in range(self.numWorkers)]
+        self.work = mp.Queue()
+        self.done = mp.Queue()
+        self.processes = []
+        for index, tasks in enumerate(self.tasks):
+            process = mp.Process(target=_sharedWorker, args=(index, self.arrays, tasks, self.work, self.done,
+                                                              self.seed))
+            process.daemon = True
+            process.start()
+            self.processes.append(process)
+
+    def load(self, tensors1, tensors2):
+        """
+        Copies the weights and biases of both populations into the shared arrays.
+        :param tensors1: (weights, biases) of the first population, see TTTPopulation.getTensors
+        :param tensors2: (weights, biases) of the second population
+        """
+
+        self.sizes = [len(tensors1[1][0]), len(tensors2[1][0])]
+        if max(self.sizes) > self.capacity:
+            logging.info("Restarting shared pool to make room for {} nets".format(max(self.sizes)))
+            self.close()
+            self.capacity = max(self.sizes) * 2
+            self._start()
+            if self.profilePrefix is not None:
+                self.profile(self.profilePrefix)
+
+        for tensors, ((weights, biases), fitness) in zip([tensors1, tensors2], self.views):
+            for shared, layer in zip(weights + biases, list(tensors[0]) + list(tensors[1])):
+                shared[:len(layer)] = layer
+            fitness[:] = 0
+
+    def play(self, pairs=None, deltas=False):
+        """
+        Splits the games into chunks for the workers to take and waits for them to finish. The fitness gained by each
+        net is written to the shared memory, see fitness.
+        :param pairs: (M, 2) array of net indices into the populations given to the last load. If None, the first
+        population is split into ranges of nets and every net in each range plays every net in the second population
+        :param deltas: If True, the workers also send back the fitness changes of every game, which is only worth it
+        when they are needed one game at a time (to fill a matches.TTTGameCache)
+        :return: (M, 2) array of the fitness changes of each game, in the order of pairs (or matches.allPairs), or
+        None if deltas is False
+        """
+
+        start = time.time()
+        if pairs is None:
+            size1, size2 = self.sizes
+            rowSize = int(math.ceil(self.chunkSize / float(max(size2, 1)))) if self.chunkSize is not None else None
+            ranges = splitWork(size1, self.numWorkers, rowSize)
+            # every net in a range of the first population plays the whole second population, so each range is a
+            # block of rows of matches.allPairs
+            chunks = [np.arange(indices[0] * size2, (indices[-1] + 1) * size2) for indices in ranges]
+            tasks = [((indices[0], indices[-1] + 1), (0, size2)) for indices in ranges]
+        else:
+            pairs = np.asarray(pairs)
+            chunks = splitWork(len(pairs), self.numWorkers, self.chunkSize)
+            tasks = [pairs[indices] for indices in chunks]
+        for queue in self.tasks:
+            queue.put(('play', deltas))
+        for chunk, task in enumerate(tasks):
+            self.work.put((chunk, task))
+        for queue in self.tasks:
+            self.work.put(None)  # one for each worker, which goes back to its tasks after taking it
+
+        results = np.empty((sum(len(chunk) for chunk in chunks), 2)) if deltas else None
+        _collect(self, self.done, chunks, results, "A shared pool worker failed")
+        self.playTime += time.time() - start
+        return results
+
+    def fitness(self):
+        """
+        Returns the fitness gained by the nets of each population since the last load, (fitness1, fitness2)
+        """
+
+        return [fitness[:, :size].sum(axis=0) for (tensors, fitness), size in zip(self.views, self.sizes)]
+
+    def profile(self, prefix):
+        """
+        Starts profiling every worker, saving their stats under prefix (see profiling.TTTProfiler), and waits for them
+        all to start. The stats of the last prefix are saved when the workers are given a new one, or None to stop, and
+        when the pool is restarted.
+        """
+
+        self.profilePrefix = prefix
+        for tasks in self.tasks:
+            tasks.put(('profile', prefix))
+        for x in range(self.numWorkers):
+            reply, error, passes = self.done.get()
+            if reply == 'error':
+                raise RuntimeError("A shared pool worker failed:\n{}".format(error))
+
+    def close(self):
+        """
+        Stops the worker processes and closes the queues.
+        """
+
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+        for queue in self.tasks + [self.work, self.done]:
+            queue.close()